@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 STRAVA_ACTIVITY_TYPES = [
     "AlpineSki",
@@ -96,6 +96,9 @@ STRAVA_SPORT_TYPES = [
 
 STRAVA_ENUM_TYPES = set(STRAVA_ACTIVITY_TYPES) | set(STRAVA_SPORT_TYPES)
 
+# Bump when resolution rules change, so stored types get re-resolved.
+TYPE_RESOLVER_VERSION = 1
+
 DEFAULT_FEATURED_TYPES = list(STRAVA_SPORT_TYPES)
 
 DEFAULT_TYPE_LABELS = {
@@ -311,6 +314,9 @@ def _slug(value: str) -> str:
     return re.sub(r"[^a-z0-9]", "", (value or "").lower())
 
 
+STRAVA_TYPES_BY_SLUG = {_slug(known): known for known in sorted(STRAVA_ENUM_TYPES)}
+
+
 def _capitalize_label_start(label: str) -> str:
     value = str(label or "").strip()
     if not value:
@@ -344,9 +350,9 @@ def canonicalize_activity_type(activity_type: str, source: str = "strava") -> st
         return "Unknown"
 
     # Convert case/spacing variants that already correspond to Strava values.
-    for known in STRAVA_ENUM_TYPES:
-        if _slug(known) == slug:
-            return known
+    known = STRAVA_TYPES_BY_SLUG.get(slug)
+    if known:
+        return known
 
     if source == "garmin":
         garmin_match = GARMIN_TYPE_ALIASES_BY_SLUG.get(slug)
@@ -388,9 +394,19 @@ def normalize_activity_type(
     group_other_types: bool,
     other_bucket: str,
     group_aliases: Dict[str, str],
+) -> str:
+    return _group_activity_type(activity_type, set(featured_types), group_other_types, other_bucket, group_aliases)
+
+
+def _group_activity_type(
+    activity_type: str,
+    featured_set: Set[str],
+    group_other_types: bool,
+    other_bucket: str,
+    group_aliases: Dict[str, str],
 ) -> str:
     value = str(activity_type or "").strip() or other_bucket
-    if value in featured_types:
+    if value in featured_set:
         return value
 
     alias = group_aliases.get(value)
@@ -401,7 +417,6 @@ def normalize_activity_type(
         return value
 
     slug = _slug(value)
-    featured_set = set(featured_types)
 
     # Resolve to a candidate group via slug heuristics or known mappings.
     candidate = None
@@ -422,6 +437,92 @@ def normalize_activity_type(
     return other_bucket
 
 
+class TypeResolver:
+    """Activity type mapping for one `activities` config, memoized per type.
+
+    `source_type` canonicalizes a raw provider type and applies `type_aliases`;
+    `group` folds that into a featured type, a group alias or `other_bucket`;
+    `keeps` applies `include_all_types`/`exclude_types`. Build one per run and
+    share it, so each distinct type is worked out once.
+    """
+
+    def __init__(
+        self,
+        featured_types: Optional[Iterable[str]] = None,
+        group_other_types: bool = True,
+        other_bucket: str = "OtherSports",
+        group_aliases: Optional[Dict[str, str]] = None,
+        type_aliases: Optional[Dict[str, str]] = None,
+        include_all_types: bool = True,
+        exclude_types: Optional[Iterable[str]] = None,
+    ) -> None:
+        self.featured_types = [str(item) for item in (DEFAULT_FEATURED_TYPES if featured_types is None else featured_types)]
+        self.featured_set = set(self.featured_types)
+        self.group_other_types = bool(group_other_types)
+        self.other_bucket = str(other_bucket)
+        self.group_aliases = dict(group_aliases or {})
+        self.type_aliases = dict(type_aliases or {})
+        self.include_all_types = bool(include_all_types)
+        self.exclude_types = {str(item) for item in (exclude_types or [])}
+        self._source_types: Dict[Tuple[str, str], str] = {}
+        self._groups: Dict[str, str] = {}
+
+    @classmethod
+    def from_config(cls, config_activities: Dict) -> "TypeResolver":
+        return cls(
+            featured_types=featured_types_from_config(config_activities),
+            group_other_types=bool(config_activities.get("group_other_types", True)),
+            other_bucket=str(config_activities.get("other_bucket", "OtherSports")),
+            group_aliases=config_activities.get("group_aliases", {}) or {},
+            type_aliases=config_activities.get("type_aliases", {}) or {},
+            include_all_types=bool(config_activities.get("include_all_types", True)),
+            exclude_types=config_activities.get("exclude_types", []) or [],
+        )
+
+    def mapping(self) -> Dict[str, Any]:
+        """The effective mapping; equal mappings resolve every type the same way."""
+        return {
+            "version": TYPE_RESOLVER_VERSION,
+            "featured_types": sorted(self.featured_set),
+            "group_other_types": self.group_other_types,
+            "other_bucket": self.other_bucket,
+            "group_aliases": {str(k): str(v) for k, v in sorted(self.group_aliases.items())},
+            "type_aliases": {str(k): str(v) for k, v in sorted(self.type_aliases.items())},
+            "include_all_types": self.include_all_types,
+            "exclude_types": sorted(self.exclude_types),
+        }
+
+    def source_type(self, raw_type: str, source: str = "strava") -> str:
+        key = (raw_type, source)
+        result = self._source_types.get(key)
+        if result is None:
+            canonical = canonicalize_activity_type(raw_type, source=source)
+            result = self.type_aliases.get(raw_type, self.type_aliases.get(canonical, canonical))
+            self._source_types[key] = result
+        return result
+
+    def group(self, activity_type: str) -> str:
+        result = self._groups.get(activity_type)
+        if result is None:
+            result = _group_activity_type(
+                activity_type,
+                self.featured_set,
+                self.group_other_types,
+                self.other_bucket,
+                self.group_aliases,
+            )
+            self._groups[activity_type] = result
+        return result
+
+    def resolve(self, raw_type: str, source: str = "strava") -> str:
+        return self.group(self.source_type(raw_type, source))
+
+    def keeps(self, activity_type: str) -> bool:
+        if activity_type in self.exclude_types:
+            return False
+        return self.include_all_types or activity_type in self.featured_set
+
+
 def type_label(activity_type: str) -> str:
     if activity_type in DEFAULT_TYPE_LABELS:
         return _capitalize_label_start(DEFAULT_TYPE_LABELS[activity_type])
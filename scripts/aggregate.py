@@ -2,6 +2,7 @@ import argparse
 import os
 from collections import defaultdict
 
+from activity_types import TypeResolver
 from utils import ensure_dir, load_config, read_json, utc_now, write_json
 
 IN_PATH = "data/activities_normalized.json"
@@ -10,10 +11,7 @@ OUT_PATH = "data/daily_aggregates.json"
 
 def aggregate():
     config = load_config()
-    activities_cfg = config.get("activities", {}) or {}
-    include_all_types = bool(activities_cfg.get("include_all_types", True))
-    exclude_types = {str(item) for item in (activities_cfg.get("exclude_types", []) or [])}
-    featured_types = set(activities_cfg.get("types", []) or [])
+    resolver = TypeResolver.from_config(config.get("activities", {}) or {})
 
     items = read_json(IN_PATH) if os.path.exists(IN_PATH) else []
 
@@ -21,9 +19,7 @@ def aggregate():
 
     for item in items:
         activity_type = item.get("type")
-        if activity_type in exclude_types:
-            continue
-        if not include_all_types and featured_types and activity_type not in featured_types:
+        if not resolver.keeps(activity_type):
             continue
         date = item.get("date")
         year = str(item.get("year"))
@@ -0,0 +1,366 @@
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8788
+DEFAULT_ATHLETE = "1001:1000"
+RATE_WINDOW_SECONDS = 900
+# (type, typical distance in m, typical moving time in s)
+ACTIVITY_TYPES = [
+    ("Run", 9000, 2900),
+    ("Ride", 40000, 5400),
+    ("Walk", 4000, 3000),
+    ("Hike", 9000, 10800),
+    ("Swim", 2000, 2400),
+    ("WeightTraining", 0, 3600),
+]
+ERROR_STATUSES = [500, 502, 503]
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+Response = Tuple[int, Dict[str, str], Any]
+
+
+def _parse_pair(value: str) -> Tuple[int, int]:
+    parts = [part.strip() for part in str(value).split(",")]
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"Expected '15-minute,daily' limits, got '{value}'.")
+    return int(parts[0]), int(parts[1])
+
+
+def _parse_athlete(value: str) -> Tuple[int, int]:
+    athlete_id, _, count = str(value).partition(":")
+    try:
+        return int(athlete_id), int(count or 0)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Expected ATHLETE_ID:ACTIVITY_COUNT, got '{value}'.") from exc
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime(ISO_FORMAT)
+
+
+def _start_ts(activity: Dict[str, Any]) -> int:
+    start = datetime.strptime(activity["start_date"], ISO_FORMAT).replace(tzinfo=timezone.utc)
+    return int(start.timestamp())
+
+
+def generate_activities(
+    athlete_id: int, count: int, years: float, now_ts: int, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Deterministic synthetic activities spread over `years`, oldest first."""
+    rng = random.Random(f"{seed}:{athlete_id}")
+    span = max(1, int(years * 365 * 86400))
+    starts = sorted(now_ts - rng.randrange(span) for _ in range(max(0, count)))
+    activities = []
+    for index, start in enumerate(starts):
+        activity_type, distance, moving_time = rng.choice(ACTIVITY_TYPES)
+        scale = rng.uniform(0.5, 1.8)
+        moving = int(moving_time * scale)
+        activities.append(
+            {
+                "id": athlete_id * 10_000_000 + index,
+                "resource_state": 2,
+                "athlete": {"id": athlete_id, "resource_state": 1},
+                "name": f"{activity_type} {index + 1}",
+                "type": activity_type,
+                "sport_type": activity_type,
+                "start_date": _iso(start),
+                "start_date_local": _iso(start).rstrip("Z"),
+                "timezone": "(GMT+00:00) UTC",
+                "distance": round(distance * scale, 1),
+                "moving_time": moving,
+                "elapsed_time": moving + rng.randrange(0, 600),
+                "total_elevation_gain": round(rng.uniform(0, 40) * scale, 1) if distance else 0.0,
+            }
+        )
+    return activities
+
+
+class FakeStrava:
+    """In-memory stand-in for the parts of the Strava API the sync uses.
+
+    Serves `/oauth/token`, `/api/v3/athlete`, `/api/v3/athlete/activities` and
+    `/api/v3/activities/{id}` with Strava's paging and `before`/`after` rules,
+    keeps 15-minute and daily usage the way Strava reports it in
+    `X-RateLimit-*` headers (429 once spent), and can add latency and random
+    429/5xx failures. Refresh token `fake-refresh-<athlete id>` picks the
+    athlete; any other refresh token gets the first one.
+    """
+
+    def __init__(
+        self,
+        athletes: Dict[int, int],
+        years: float = 10.0,
+        seed: int = 0,
+        limits: Tuple[int, int] = (200, 2000),
+        read_limits: Tuple[int, int] = (100, 1000),
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        now_ts: Optional[int] = None,
+    ) -> None:
+        if not athletes:
+            raise ValueError("At least one athlete is required.")
+        now_ts = int(time.time()) if now_ts is None else int(now_ts)
+        self.default_athlete = next(iter(athletes))
+        self.activities: Dict[int, List[Dict[str, Any]]] = {}
+        self.starts: Dict[int, List[int]] = {}
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        for athlete_id, count in athletes.items():
+            activities = generate_activities(athlete_id, count, years, now_ts, seed)
+            self.activities[athlete_id] = activities
+            self.starts[athlete_id] = [_start_ts(item) for item in activities]
+            self.by_id.update({str(item["id"]): item for item in activities})
+        self.limits = limits
+        self.read_limits = read_limits
+        self.throttle_rate = max(0.0, float(throttle_rate))
+        self.error_rate = max(0.0, float(error_rate))
+        self.latency_ms = max(0.0, float(latency_ms))
+        self.jitter_ms = max(0.0, float(jitter_ms))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._day = ""
+        self.usage_15 = 0
+        self.usage_day = 0
+        self.counts: Dict[str, int] = {
+            "requests": 0,
+            "served": 0,
+            "rate_limited": 0,
+            "injected_429": 0,
+            "injected_5xx": 0,
+            "unauthorized": 0,
+        }
+
+    def _reset_windows(self, now: float) -> None:
+        window_start = now - (now % RATE_WINDOW_SECONDS)
+        if window_start != self._window_start:
+            self._window_start = window_start
+            self.usage_15 = 0
+        day = datetime.fromtimestamp(now, tz=timezone.utc).date().isoformat()
+        if day != self._day:
+            self._day = day
+            self.usage_day = 0
+
+    def _rate_headers(self) -> Dict[str, str]:
+        usage = f"{self.usage_15},{self.usage_day}"
+        return {
+            "X-RateLimit-Limit": f"{self.limits[0]},{self.limits[1]}",
+            "X-RateLimit-Usage": usage,
+            "X-ReadRateLimit-Limit": f"{self.read_limits[0]},{self.read_limits[1]}",
+            "X-ReadRateLimit-Usage": usage,
+        }
+
+    def delay_seconds(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def _athlete_for_token(self, authorization: str) -> Optional[int]:
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+        prefix = "fake-access-"
+        if not token.startswith(prefix):
+            return None
+        try:
+            athlete_id = int(token[len(prefix):])
+        except ValueError:
+            return None
+        return athlete_id if athlete_id in self.activities else None
+
+    def _token(self, form: Dict[str, List[str]], now: float) -> Response:
+        refresh_token = (form.get("refresh_token") or [""])[0]
+        athlete_id = self.default_athlete
+        if refresh_token.startswith("fake-refresh-"):
+            try:
+                candidate = int(refresh_token[len("fake-refresh-"):])
+            except ValueError:
+                candidate = None
+            if candidate not in self.activities:
+                return 400, {}, {"message": "Bad Request", "errors": [{"field": "refresh_token"}]}
+            athlete_id = candidate
+        return (
+            200,
+            {},
+            {
+                "token_type": "Bearer",
+                "access_token": f"fake-access-{athlete_id}",
+                "refresh_token": f"fake-refresh-{athlete_id}",
+                "expires_at": int(now) + 21600,
+                "expires_in": 21600,
+                "athlete": {"id": athlete_id},
+            },
+        )
+
+    def _list_activities(self, athlete_id: int, query: Dict[str, List[str]]) -> Response:
+        def _int(name: str, default: Optional[int]) -> Optional[int]:
+            raw = (query.get(name) or [""])[0]
+            return int(raw) if raw.lstrip("-").isdigit() else default
+
+        per_page = min(200, max(1, _int("per_page", 30) or 30))
+        page = max(1, _int("page", 1) or 1)
+        before = _int("before", None)
+        after = _int("after", None)
+        starts = self.starts[athlete_id]
+        low = bisect.bisect_right(starts, after) if after is not None else 0
+        high = bisect.bisect_left(starts, before) if before is not None else len(starts)
+        selected = self.activities[athlete_id][low:high]
+        # Like Strava: `after` alone lists oldest first, otherwise newest first.
+        if before is not None or after is None:
+            selected = selected[::-1]
+        offset = (page - 1) * per_page
+        return 200, {}, selected[offset : offset + per_page]
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, List[str]], headers: Dict[str, str], body: bytes
+    ) -> Response:
+        now = time.time()
+        route = urlparse(path).path.rstrip("/")
+        if method == "GET" and route == "/_fake/stats":
+            return 200, {}, self.stats()
+        if method == "POST" and route == "/oauth/token":
+            return self._token(parse_qs(body.decode("utf-8")), now)
+        if not route.startswith("/api/v3/"):
+            return 404, {}, {"message": "Record Not Found"}
+
+        with self._lock:
+            self.counts["requests"] += 1
+            athlete_id = self._athlete_for_token(headers.get("Authorization", ""))
+            if athlete_id is None:
+                self.counts["unauthorized"] += 1
+                return 401, {}, {"message": "Authorization Error"}
+            self._reset_windows(now)
+            spent = min(self.limits[0], self.read_limits[0]) <= self.usage_15 or min(
+                self.limits[1], self.read_limits[1]
+            ) <= self.usage_day
+            if spent:
+                self.counts["rate_limited"] += 1
+                return 429, self._rate_headers(), {"message": "Rate Limit Exceeded"}
+            self.usage_15 += 1
+            self.usage_day += 1
+            rate_headers = self._rate_headers()
+            roll = self._rng.random()
+            if roll < self.throttle_rate:
+                self.counts["injected_429"] += 1
+                return 429, rate_headers, {"message": "Rate Limit Exceeded"}
+            if roll < self.throttle_rate + self.error_rate:
+                self.counts["injected_5xx"] += 1
+                return self._rng.choice(ERROR_STATUSES), rate_headers, {"message": "Server Error"}
+            self.counts["served"] += 1
+
+        if method == "GET" and route == "/api/v3/athlete":
+            return 200, rate_headers, {"id": athlete_id, "firstname": "Fake", "lastname": str(athlete_id)}
+        if method == "GET" and route == "/api/v3/athlete/activities":
+            status, _headers, payload = self._list_activities(athlete_id, query)
+            return status, rate_headers, payload
+        if method == "GET" and route.startswith("/api/v3/activities/"):
+            activity = self.by_id.get(route.rsplit("/", 1)[-1])
+            if activity is None or activity["athlete"]["id"] != athlete_id:
+                return 404, rate_headers, {"message": "Record Not Found"}
+            return 200, rate_headers, activity
+        return 404, rate_headers, {"message": "Record Not Found"}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counts,
+                "usage_15_min": self.usage_15,
+                "usage_daily": self.usage_day,
+                "activities": {str(key): len(items) for key, items in self.activities.items()},
+            }
+
+
+def make_server(fake: FakeStrava, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    class _Handler(BaseHTTPRequestHandler):
+        def _serve(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            delay = fake.delay_seconds()
+            if delay > 0:
+                time.sleep(delay)
+            status, headers, payload = fake.handle(
+                method,
+                self.path,
+                parse_qs(urlparse(self.path).query),
+                {key: value for key, value in self.headers.items()},
+                body,
+            )
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            self._serve("GET")
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            self._serve("POST")
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return
+
+    return ThreadingHTTPServer((host, port), _Handler)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve a fake Strava API for sync load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--athlete",
+        action="append",
+        type=_parse_athlete,
+        metavar="ID:COUNT",
+        help=f"Synthetic athlete and activity count; repeatable (default {DEFAULT_ATHLETE})",
+    )
+    parser.add_argument("--years", type=float, default=10.0, help="History the activities span")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limits", type=_parse_pair, default=(200, 2000), help="Overall 15-minute,daily")
+    parser.add_argument("--read-limits", type=_parse_pair, default=(100, 1000), help="Read 15-minute,daily")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of API calls answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API calls answered 5xx")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    athletes = dict(args.athlete or [_parse_athlete(DEFAULT_ATHLETE)])
+    fake = FakeStrava(
+        athletes,
+        years=args.years,
+        seed=args.seed,
+        limits=args.limits,
+        read_limits=args.read_limits,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+    )
+    server = make_server(fake, args.host, args.port)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Fake Strava API on {base_url} ({', '.join(f'{k}: {v}' for k, v in athletes.items())} activities)")
+    print(
+        f"Sync against it with: python scripts/sync_strava.py --api-base {base_url} --data-dir DIR "
+        f"(any client_id/secret; refresh_token fake-refresh-<athlete id>). Stats: {base_url}/_fake/stats"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -133,6 +133,7 @@ def _load_activities(
     include_activity_urls: bool = False,
     include_strava_activity_urls: bool = False,
     include_garmin_activity_urls: bool = False,
+    week_start: str = DEFAULT_WEEK_START,
 ) -> List[Dict]:
     if not os.path.exists(ACTIVITIES_PATH):
         return []
@@ -148,10 +149,13 @@ def _load_activities(
         start_date_local = item.get("start_date_local")
         if not date_str or year is None or not activity_type or not subtype or not start_date_local:
             continue
-        try:
-            hour = parse_iso_datetime(start_date_local).hour
-        except Exception:
-            hour = None
+        hour = item.get("hour")
+        if not isinstance(hour, int):
+            # Normalized before derived time fields were stored.
+            try:
+                hour = parse_iso_datetime(start_date_local).hour
+            except Exception:
+                hour = None
         activity = {
             "date": date_str,
             "year": int(year),
@@ -159,6 +163,10 @@ def _load_activities(
             "subtype": str(subtype),
             "hour": hour,
         }
+        week = item.get("week_mon" if week_start == "monday" else "week_sun")
+        if isinstance(item.get("weekday"), int) and isinstance(week, int):
+            activity["weekday"] = item["weekday"]
+            activity["week"] = week
         include_provider_activity_urls = include_activity_urls
         if source == "strava" and include_strava_activity_urls:
             include_provider_activity_urls = True
@@ -454,7 +462,7 @@ def generate(write_svgs: bool = True):
 
     source = normalize_source(config.get("source", "strava"))
     include_activity_urls = _activity_links_enabled_from_config(config, source)
-    load_activities_kwargs = {"source": source}
+    load_activities_kwargs = {"source": source, "week_start": week_start}
     if source == "strava":
         load_activities_kwargs["include_strava_activity_urls"] = include_activity_urls
     elif source == "garmin":
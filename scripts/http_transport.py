@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from utils import ensure_dir, read_json, write_json
+
+DEFAULT_POOL_SIZE = 10
+RECORDED_HEADERS = [
+    "Content-Type",
+    "Retry-After",
+    "X-RateLimit-Limit",
+    "X-RateLimit-Usage",
+    "X-ReadRateLimit-Limit",
+    "X-ReadRateLimit-Usage",
+]
+REDACTED_FIELDS = {"access_token", "refresh_token"}
+REDACTED_VALUE = "redacted"
+STRAVA_BASE_URL = "https://www.strava.com"
+
+
+class MissingRecording(requests.RequestException):
+    """A replayed request that has no usable recording."""
+
+
+class HttpTransport:
+    # Offline transports never reach the real API, so callers should not
+    # persist credentials they return.
+    offline = False
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return None
+
+
+class SessionTransport(HttpTransport):
+    """Keep-alive transport backed by one pooled requests.Session."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self.pool_size = max(1, int(pool_size))
+        self._session: Any = None
+        self._lock = threading.Lock()
+
+    def _get_session(self) -> Any:
+        with self._lock:
+            if self._session is None:
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept-Encoding"] = "gzip, deflate"
+                self._session = session
+            return self._session
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        return self._get_session().request(method, url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class RecordedResponse:
+    def __init__(self, status_code: int, headers: Dict[str, str], body: Any) -> None:
+        self.status_code = int(status_code)
+        self.headers = dict(headers or {})
+        self._body = body
+
+    @property
+    def text(self) -> str:
+        if isinstance(self._body, str):
+            return self._body
+        return json.dumps(self._body)
+
+    def json(self) -> Any:
+        if isinstance(self._body, str):
+            return json.loads(self._body)
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error (replayed)", response=self)
+
+
+def _request_key(method: str, url: str, params: Optional[Dict[str, Any]]) -> str:
+    query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return f"{method.upper()} {url}" + (f"?{query}" if query else "")
+
+
+def _redact(body: Any) -> Any:
+    if not isinstance(body, dict):
+        return body
+    return {
+        key: (REDACTED_VALUE if key in REDACTED_FIELDS and value else value)
+        for key, value in body.items()
+    }
+
+
+class ReplayTransport(HttpTransport):
+    """Record responses from an inner transport to disk, or serve them back.
+
+    Recordings are keyed by method, URL and query params (request bodies and
+    auth headers are ignored), one JSON file per key. Repeated requests replay
+    their recorded responses in order, then keep returning the last one.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        mode: str = "replay",
+        inner: Optional[HttpTransport] = None,
+    ) -> None:
+        if mode not in {"record", "replay"}:
+            raise ValueError(f"Unsupported replay transport mode '{mode}'.")
+        if mode == "record" and inner is None:
+            inner = SessionTransport()
+        self.directory = directory
+        self.mode = mode
+        self.inner = inner
+        self.offline = mode == "replay" or bool(inner is not None and inner.offline)
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode == "record":
+            ensure_dir(directory)
+
+    def _path_for(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        key = _request_key(method, url, kwargs.get("params"))
+        if self.mode == "record":
+            return self._record(key, method, url, **kwargs)
+        return self._replay(key)
+
+    def _record(self, key: str, method: str, url: str, **kwargs: Any) -> Any:
+        assert self.inner is not None
+        resp = self.inner.request(method, url, **kwargs)
+        try:
+            body: Any = resp.json()
+        except ValueError:
+            body = resp.text
+        headers = {}
+        for name in RECORDED_HEADERS:
+            value = resp.headers.get(name)
+            if value is not None:
+                headers[name] = value
+        entry = {
+            "status_code": resp.status_code,
+            "headers": headers,
+            "body": _redact(body),
+        }
+        path = self._path_for(key)
+        with self._lock:
+            payload: Dict[str, Any] = {"request": key, "responses": []}
+            if os.path.exists(path):
+                payload = read_json(path)
+            responses: List[Dict[str, Any]] = payload.setdefault("responses", [])
+            responses.append(entry)
+            write_json(path, payload)
+        return resp
+
+    def _replay(self, key: str) -> RecordedResponse:
+        path = self._path_for(key)
+        if not os.path.exists(path):
+            raise MissingRecording(f"No recorded response for {key} in {self.directory}")
+        with self._lock:
+            responses = read_json(path).get("responses") or []
+            if not responses:
+                raise MissingRecording(f"Recording for {key} has no responses")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        entry = responses[min(index, len(responses) - 1)]
+        return RecordedResponse(
+            entry.get("status_code", 200),
+            entry.get("headers") or {},
+            entry.get("body"),
+        )
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+class RebasedTransport(HttpTransport):
+    """Send Strava requests to another server, e.g. scripts/fake_strava.py.
+
+    Counts as offline: tokens that server hands out are not real credentials.
+    """
+
+    offline = True
+
+    def __init__(self, base_url: str, inner: Optional[HttpTransport] = None) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.inner = inner or SessionTransport()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        if url.startswith(STRAVA_BASE_URL):
+            url = self.base_url + url[len(STRAVA_BASE_URL) :]
+        return self.inner.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def default_transport() -> HttpTransport:
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = SessionTransport()
+        return _default_transport
+
+
+def transport_from_args(
+    record_dir: Optional[str], replay_dir: Optional[str], api_base: Optional[str] = None
+) -> Optional[HttpTransport]:
+    if record_dir and replay_dir:
+        raise ValueError("Use either --record-http or --replay-http, not both.")
+    if replay_dir:
+        if api_base:
+            raise ValueError("--api-base has no effect with --replay-http.")
+        return ReplayTransport(replay_dir, mode="replay")
+    rebased = RebasedTransport(api_base) if api_base else None
+    if record_dir:
+        return ReplayTransport(record_dir, mode="record", inner=rebased)
+    return rebased
@@ -1,16 +1,25 @@
 import argparse
+import hashlib
 import os
-from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
-from activity_types import canonicalize_activity_type, featured_types_from_config, normalize_activity_type
+from activity_types import TypeResolver
 from provider_fields import (
     coalesce as _shared_coalesce,
     get_nested as _shared_get_nested,
     pick_duration_seconds as _shared_pick_duration_seconds,
 )
+from raw_store import content_hash, open_store, raw_store_backend
 from utils import ensure_dir, load_config, normalize_source, parse_iso_datetime, raw_activity_dir, read_json, write_json
 
 OUT_PATH = os.path.join("data", "activities_normalized.json")
+MANIFEST_PATH = os.path.join("data", "normalize_manifest.json")
+MANIFEST_VERSION = 2
+# Below this many changed raw activities, process startup outweighs the parsing.
+PARALLEL_MIN_ACTIVITIES = 2000
+PARALLEL_CHUNK_SIZE = 500
 
 
 def _coalesce(*values: Any) -> Any:
@@ -49,11 +58,30 @@ def _get_nested(payload: Dict[str, Any], keys: List[str]) -> Any:
     return _shared_get_nested(payload, keys)
 
 
-def _resolve_canonical_type(raw_value: str, source: str) -> str:
-    return canonicalize_activity_type(raw_value, source=source)
+def _week_of_year(day: date, week_start: str) -> int:
+    """1-based heatmap week column of `day`; week 1 holds January 1st."""
+    jan1_weekday = date(day.year, 1, 1).weekday()
+    offset = jan1_weekday if week_start == "monday" else (jan1_weekday + 1) % 7
+    return (day.timetuple().tm_yday - 1 + offset) // 7 + 1
 
 
-def _normalize_activity(activity: Dict, type_aliases: Dict[str, str], source: str) -> Dict:
+def _time_fields(dt: datetime) -> Dict[str, int]:
+    """Local-time parts the heatmaps and site would otherwise reparse per activity."""
+    day = dt.date()
+    return {
+        "hour": dt.hour,
+        "weekday": day.isoweekday(),
+        "week_sun": _week_of_year(day, "sunday"),
+        "week_mon": _week_of_year(day, "monday"),
+    }
+
+
+def _normalize_activity(
+    activity: Dict,
+    type_aliases: Dict[str, str],
+    source: str,
+    resolver: Optional[TypeResolver] = None,
+) -> Dict:
     activity_id = _coalesce(activity.get("id"), activity.get("activityId"))
     start_date_local = activity.get("start_date_local") or activity.get("start_date")
     if not activity_id or not start_date_local:
@@ -73,8 +101,8 @@ def _normalize_activity(activity: Dict, type_aliases: Dict[str, str], source: st
         )
     )
     raw_type = str(activity.get("sport_type") or raw_activity_type or "Unknown")
-    canonical_raw_type = _resolve_canonical_type(raw_type, source)
-    activity_type = type_aliases.get(raw_type, type_aliases.get(canonical_raw_type, canonical_raw_type))
+    resolver = resolver or TypeResolver(type_aliases=type_aliases)
+    activity_type = resolver.source_type(raw_type, source)
 
     # Override type to Commute if marked as commute
     if activity.get("commute"):
@@ -102,6 +130,7 @@ def _normalize_activity(activity: Dict, type_aliases: Dict[str, str], source: st
         "moving_time": _safe_float(moving_time),
         "elevation_gain": _safe_float(elevation_gain),
     }
+    normalized.update(_time_fields(dt))
     if activity_name:
         normalized["name"] = activity_name
     return normalized
@@ -125,22 +154,160 @@ def _load_existing() -> Dict[str, Dict]:
     return existing
 
 
+def _type_mapping_fingerprint(source: str, resolver: TypeResolver) -> str:
+    return content_hash({"source": source, "mapping": resolver.mapping()})
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _output_identity() -> Dict[str, Any]:
+    stat = os.stat(OUT_PATH)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_digest(OUT_PATH)}
+
+
+def _output_matches(recorded: Any) -> bool:
+    if not isinstance(recorded, dict):
+        return False
+    try:
+        stat = os.stat(OUT_PATH)
+    except OSError:
+        return False
+    if stat.st_size != recorded.get("size"):
+        return False
+    if stat.st_mtime_ns == recorded.get("mtime_ns"):
+        return True
+    # A checkout (as in CI) resets mtimes, so fall back to the file bytes.
+    return _file_digest(OUT_PATH) == recorded.get("sha256")
+
+
+def _load_manifest(fingerprint: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Raw file entries from the last run, or None when they can't be trusted.
+
+    The manifest only holds while the type mapping is unchanged and the
+    normalized output file is exactly what that run wrote; otherwise every raw
+    file is reprocessed and every stored item re-typed.
+    """
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    try:
+        payload = read_json(MANIFEST_PATH)
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != MANIFEST_VERSION:
+        return None
+    if payload.get("config") != fingerprint or not _output_matches(payload.get("output")):
+        return None
+    files = payload.get("files")
+    return dict(files) if isinstance(files, dict) else None
+
+
+def _iter_changed(store: Any, changed: Dict[str, str], everything: bool) -> Iterator[Tuple[str, Any]]:
+    if everything:
+        # A full pass reads the store in its own (sequential) order.
+        for activity_id, activity in store.iter_activities():
+            if activity_id in changed:
+                yield activity_id, activity
+        return
+    for activity_id in sorted(changed):
+        activity = store.get(activity_id)
+        if activity is not None:
+            yield activity_id, activity
+
+
+def _overlay_record(activity: Dict, source: str, resolver: TypeResolver) -> Dict:
+    """Normalized and typed record for a raw activity; empty when it is dropped."""
+    normalized = _normalize_activity(activity, resolver.type_aliases, source, resolver)
+    if not normalized:
+        return {}
+    normalized["type"] = resolver.group(normalized.get("type"))
+    if not resolver.keeps(normalized["type"]):
+        return {}
+    return normalized
+
+
+_worker_context: Dict[str, Any] = {}
+_worker_stores: Dict[Tuple[str, str], Any] = {}
+
+
+def _init_worker(source: str, resolver: TypeResolver) -> None:
+    _worker_context.update({"source": source, "resolver": resolver})
+
+
+def _normalize_chunk(job: Tuple[str, str, List[str]]) -> List[Tuple[str, Dict]]:
+    directory, backend, activity_ids = job
+    store = _worker_stores.get((directory, backend))
+    if store is None:
+        store = _worker_stores[(directory, backend)] = open_store(directory, backend)
+    results = []
+    for activity_id in activity_ids:
+        activity = store.get(activity_id)
+        if activity is not None:
+            results.append(
+                (activity_id, _overlay_record(activity, _worker_context["source"], _worker_context["resolver"]))
+            )
+    return results
+
+
+def _normalize_workers(config: Dict[str, Any]) -> int:
+    workers = int((config.get("sync", {}) or {}).get("normalize_workers", 0) or 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _normalize_pending(
+    pending: List[Tuple[Any, ...]], source: str, resolver: TypeResolver, workers: int
+) -> Iterator[Tuple[int, str, str, str, Dict]]:
+    """Overlay records for changed raw activities as (dir_index, dir, id, version, record).
+
+    Large batches are parsed in chunks on a process pool; chunk results come
+    back in submission order, and the caller resolves ID clashes by rank
+    rather than arrival order, so the output matches the serial path.
+    """
+    total = sum(len(item[4]) for item in pending)
+    if workers > 1 and total >= PARALLEL_MIN_ACTIVITIES:
+        jobs = []
+        for dir_index, raw_dir, backend, _store, changed, _everything in pending:
+            activity_ids = sorted(changed)
+            for start in range(0, len(activity_ids), PARALLEL_CHUNK_SIZE):
+                jobs.append((dir_index, changed, (raw_dir, backend, activity_ids[start : start + PARALLEL_CHUNK_SIZE])))
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)), initializer=_init_worker, initargs=(source, resolver)
+        ) as pool:
+            results = pool.map(_normalize_chunk, [job for _dir_index, _changed, job in jobs])
+            for (dir_index, changed, job), chunk in zip(jobs, results):
+                for activity_id, normalized in chunk:
+                    yield dir_index, job[0], activity_id, changed[activity_id], normalized
+        return
+    for dir_index, raw_dir, _backend, store, changed, everything in pending:
+        for activity_id, activity in _iter_changed(store, changed, everything):
+            yield dir_index, raw_dir, activity_id, changed[activity_id], _overlay_record(activity, source, resolver)
+
+
 def normalize() -> List[Dict]:
     config = load_config()
     source = normalize_source(config.get("source", "strava"))
     activities_cfg = config.get("activities", {}) or {}
-    type_aliases = activities_cfg.get("type_aliases", {}) or {}
-    featured_types = featured_types_from_config(activities_cfg)
-    include_all_types = bool(activities_cfg.get("include_all_types", True))
-    exclude_types = {str(item) for item in (activities_cfg.get("exclude_types", []) or [])}
-    group_other_types = bool(activities_cfg.get("group_other_types", True))
-    other_bucket = str(activities_cfg.get("other_bucket", "OtherSports"))
-    group_aliases = activities_cfg.get("group_aliases", {}) or {}
-    featured_set = set(featured_types)
+    resolver = TypeResolver.from_config(activities_cfg)
+    other_bucket = resolver.other_bucket
 
     # In CI, activities/raw is ephemeral per run, so keep persisted normalized
     # history and overlay any newly fetched raw activities.
     existing = _load_existing()
+    fingerprint = _type_mapping_fingerprint(source, resolver)
+    # Raw files whose identity matches the manifest were already overlaid into
+    # `existing` by an earlier run, so only added or changed ones are parsed.
+    manifest = _load_manifest(fingerprint)
+    # A trusted manifest also means every stored item is already typed under
+    # this mapping, so only items overlaid now need the re-typing pass.
+    retype_all = manifest is None
+    manifest = manifest or {}
+    files: Dict[str, Dict[str, Any]] = {}
+    overlaid: Set[str] = set()
 
     raw_dirs = [raw_activity_dir(source)]
     # Backward compatibility for old Strava layout (activities/raw/*.json).
@@ -148,32 +315,45 @@ def normalize() -> List[Dict]:
     if source == "strava" and os.path.isdir(legacy_raw_dir):
         raw_dirs.append(legacy_raw_dir)
 
-    for current_raw_dir in raw_dirs:
+    pending = []
+    # A normalized ID produced by more than one raw file goes to the highest
+    # (raw dir, raw ID), so the result doesn't depend on processing order.
+    owners: Dict[str, Tuple[int, str]] = {}
+    for dir_index, current_raw_dir in enumerate(raw_dirs):
         if not os.path.exists(current_raw_dir):
             continue
-        for filename in sorted(os.listdir(current_raw_dir)):
-            if not filename.endswith(".json"):
-                continue
-            path = os.path.join(current_raw_dir, filename)
-            if not os.path.isfile(path):
-                continue
-            activity = read_json(path)
-            normalized = _normalize_activity(activity, type_aliases, source)
-            if not normalized:
-                continue
-            normalized_type = normalize_activity_type(
-                normalized.get("type"),
-                featured_types=featured_types,
-                group_other_types=group_other_types,
-                other_bucket=other_bucket,
-                group_aliases=group_aliases,
+        # The legacy top-level layout predates the segmented store.
+        backend = raw_store_backend(config) if current_raw_dir != legacy_raw_dir else "files"
+        store = open_store(current_raw_dir, backend)
+        versions = store.versions()
+        changed: Dict[str, str] = {}
+        for activity_id, version in sorted(versions.items()):
+            key = os.path.join(current_raw_dir, activity_id)
+            entry = manifest.get(key)
+            if entry and entry.get("version") == version:
+                files[key] = entry
+                if entry.get("id") is not None:
+                    owners[str(entry["id"])] = max(owners.get(str(entry["id"]), (-1, "")), (dir_index, activity_id))
+            else:
+                changed[activity_id] = version
+        if changed:
+            pending.append(
+                (dir_index, current_raw_dir, backend, store, changed, len(changed) == len(versions))
             )
-            normalized["type"] = normalized_type
-            if normalized_type in exclude_types:
-                continue
-            if not include_all_types and normalized_type not in featured_set:
-                continue
-            existing[str(normalized["id"])] = normalized
+
+    for dir_index, current_raw_dir, activity_id, version, normalized in _normalize_pending(
+        pending, source, resolver, _normalize_workers(config)
+    ):
+        key = os.path.join(current_raw_dir, activity_id)
+        files[key] = {"version": version, "id": str(normalized["id"]) if normalized else None}
+        if not normalized:
+            continue
+        rank = (dir_index, activity_id)
+        if owners.get(str(normalized["id"]), rank) > rank:
+            continue
+        owners[str(normalized["id"])] = rank
+        existing[str(normalized["id"])] = normalized
+        overlaid.add(str(normalized["id"]))
 
     items = [
         item
@@ -181,30 +361,38 @@ def normalize() -> List[Dict]:
         if item.get("id") is not None and item.get("date")
     ]
     for item in items:
+        if "weekday" not in item and item.get("start_date_local"):
+            # Stored before derived time fields existed.
+            try:
+                item.update(_time_fields(parse_iso_datetime(str(item["start_date_local"]))))
+            except ValueError:
+                pass
+        if not retype_all and str(item["id"]) not in overlaid:
+            continue
         raw_activity_type = str(item.get("raw_activity_type") or item.get("raw_type") or item.get("type") or other_bucket)
         raw_type = str(item.get("raw_type") or raw_activity_type or other_bucket)
         item["raw_activity_type"] = raw_activity_type
         item["raw_type"] = raw_type
 
         # Preserve commute override: commute is a flag, not a sport type
-        if item.get("is_commute") and "Commute" in featured_set:
+        if item.get("is_commute") and "Commute" in resolver.featured_set:
             item["type"] = "Commute"
             continue
 
-        canonical_raw_type = _resolve_canonical_type(raw_type, source)
-        source_type = type_aliases.get(raw_type, type_aliases.get(canonical_raw_type, canonical_raw_type))
-        item["type"] = normalize_activity_type(
-            source_type,
-            featured_types=featured_types,
-            group_other_types=group_other_types,
-            other_bucket=other_bucket,
-            group_aliases=group_aliases,
-        )
-    if exclude_types:
-        items = [item for item in items if item.get("type") not in exclude_types]
-    if not include_all_types:
-        items = [item for item in items if item.get("type") in featured_set]
+        item["type"] = resolver.resolve(raw_type, source)
+    items = [item for item in items if resolver.keeps(item.get("type"))]
     items.sort(key=lambda x: (x["date"], x["id"]))
+    ensure_dir(os.path.dirname(OUT_PATH))
+    write_json(OUT_PATH, items)
+    write_json(
+        MANIFEST_PATH,
+        {
+            "version": MANIFEST_VERSION,
+            "config": fingerprint,
+            "output": _output_identity(),
+            "files": files,
+        },
+    )
     return items
 
 
@@ -214,7 +402,6 @@ def main() -> int:
 
     ensure_dir("data")
     items = normalize()
-    write_json(OUT_PATH, items)
     print(f"Wrote {len(items)} normalized activities")
     return 0
 
@@ -0,0 +1,590 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from sync_scope import activity_start_ts
+from utils import ensure_dir, load_config, normalize_source, raw_activity_dir, read_json, write_json
+
+RAW_ROOT = os.path.join("activities", "raw")
+# activities/raw is not persisted between CI runs, but data/ is.
+INDEX_ROOT = os.path.join("data", "raw_index")
+INDEX_DIRNAME = "_index"
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+SEGMENTS_DIRNAME = "_segments"
+SEGMENT_INDEX_FILENAME = "index.json"
+SEGMENT_INDEX_VERSION = 1
+SEGMENT_SUFFIX = ".log"
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+# Compact once dead records outweigh live ones (and are worth rewriting).
+COMPACT_MIN_DEAD_BYTES = 1024 * 1024
+RAW_STORE_BACKENDS = {"files", "segments"}
+DEFAULT_RAW_STORE_BACKEND = "files"
+
+
+def content_hash(activity: Any) -> str:
+    payload = json.dumps(activity, ensure_ascii=True, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def raw_store_backend(config: Dict[str, Any]) -> str:
+    backend = str((config.get("sync", {}) or {}).get("raw_store", DEFAULT_RAW_STORE_BACKEND))
+    backend = backend.strip().lower()
+    if backend not in RAW_STORE_BACKENDS:
+        allowed = ", ".join(sorted(RAW_STORE_BACKENDS))
+        raise ValueError(f"Unsupported sync.raw_store '{backend}'. Supported values: {allowed}.")
+    return backend
+
+
+def _index_dir(directory: str, local_dir: str) -> str:
+    """Index location for a store under activities/raw/<name>; others keep theirs in `local_dir`."""
+    relative = os.path.relpath(directory, RAW_ROOT)
+    if relative == os.curdir or relative.startswith(os.pardir) or os.path.isabs(relative):
+        return local_dir
+    return os.path.join(INDEX_ROOT, relative)
+
+
+class RawActivityStore:
+    """One JSON file per activity, fronted by a content-hash manifest.
+
+    The manifest maps activity ID to the canonical hash of the stored payload
+    plus the file's mtime and size. A put whose hash matches an entry whose
+    file is untouched on disk is skipped without reading the file; anything
+    else falls back to comparing against the file contents. A file that is
+    gone while its entry remains (CI keeps the manifest but not the raw
+    files) counts as stored: its normalized record outlives it.
+    """
+
+    backend = "files"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.manifest_path = os.path.join(
+            _index_dir(directory, os.path.join(directory, INDEX_DIRNAME)), MANIFEST_FILENAME
+        )
+        self.changed_ids: Set[str] = set()
+        self._entries: Dict[str, Dict[str, Any]] = self._load_manifest()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            payload = read_json(self.manifest_path)
+        except Exception:
+            return {}
+        if not isinstance(payload, dict) or payload.get("version") != MANIFEST_VERSION:
+            return {}
+        entries = payload.get("activities")
+        return dict(entries) if isinstance(entries, dict) else {}
+
+    def _path(self, activity_id: str) -> str:
+        return os.path.join(self.directory, f"{activity_id}.json")
+
+    @staticmethod
+    def _file_matches(entry: Dict[str, Any], path: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == entry.get("mtime_ns") and stat.st_size == entry.get("size")
+
+    def _record(self, activity_id: str, activity: Any, digest: str, path: str) -> None:
+        stat = os.stat(path)
+        self._entries[activity_id] = {
+            "sha256": digest,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "start_ts": activity_start_ts(activity) if isinstance(activity, dict) else None,
+        }
+        self._dirty = True
+
+    def put(self, activity_id: str, activity: Dict[str, Any]) -> bool:
+        digest = content_hash(activity)
+        path = self._path(activity_id)
+        with self._lock:
+            entry = self._entries.get(activity_id)
+            if entry and self._file_matches(entry, path):
+                if entry.get("sha256") == digest:
+                    return False
+            elif entry and not os.path.exists(path):
+                if entry.get("sha256") == digest:
+                    return False
+            elif os.path.exists(path):
+                try:
+                    existing_digest = content_hash(read_json(path))
+                except Exception:
+                    existing_digest = None
+                if existing_digest == digest:
+                    self._record(activity_id, activity, digest, path)
+                    return False
+            ensure_dir(self.directory)
+            write_json(path, activity)
+            self._record(activity_id, activity, digest, path)
+            self.changed_ids.add(activity_id)
+        return True
+
+    def remove(self, activity_id: str) -> bool:
+        path = self._path(activity_id)
+        with self._lock:
+            if self._entries.pop(activity_id, None) is not None:
+                self._dirty = True
+            if not os.path.exists(path):
+                return False
+            os.remove(path)
+            self.changed_ids.add(activity_id)
+        return True
+
+    def ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            filename[:-5]
+            for filename in os.listdir(self.directory)
+            if filename.endswith(".json") and os.path.isfile(os.path.join(self.directory, filename))
+        )
+
+    def get(self, activity_id: str) -> Optional[Any]:
+        path = self._path(activity_id)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def iter_activities(self) -> Iterator[Tuple[str, Any]]:
+        for activity_id in self.ids():
+            yield activity_id, read_json(self._path(activity_id))
+
+    def versions(self) -> Dict[str, str]:
+        """Cheap identity per stored activity (size and mtime), without reading it."""
+        result: Dict[str, str] = {}
+        for activity_id in self.ids():
+            try:
+                stat = os.stat(self._path(activity_id))
+            except OSError:
+                continue
+            result[activity_id] = f"{stat.st_size}:{stat.st_mtime_ns}"
+        return result
+
+    def start_times(self) -> Dict[str, Optional[int]]:
+        """Start timestamp per stored activity, from the manifest where possible."""
+        result: Dict[str, Optional[int]] = {}
+        for activity_id in self.ids():
+            path = self._path(activity_id)
+            with self._lock:
+                entry = self._entries.get(activity_id)
+                if entry and "start_ts" in entry and self._file_matches(entry, path):
+                    result[activity_id] = entry["start_ts"]
+                    continue
+                try:
+                    activity = read_json(path)
+                except Exception:
+                    result[activity_id] = None
+                    continue
+                self._record(activity_id, activity, content_hash(activity), path)
+                result[activity_id] = self._entries[activity_id]["start_ts"]
+        return result
+
+    def compact(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            ensure_dir(os.path.dirname(self.manifest_path))
+            write_json(
+                self.manifest_path,
+                {"version": MANIFEST_VERSION, "activities": self._entries},
+            )
+            self._dirty = False
+
+
+class SegmentedActivityStore:
+    """Append-only log of compact activity records with an ID offset index.
+
+    Records live in numbered segment files under `_segments/`, one JSON line
+    each: {"id", "sha256", "activity"} for a write or {"id", "deleted"} for a
+    removal. `index.json` maps each live ID to (segment, offset, length,
+    sha256, start_ts) and remembers how far each segment was indexed, so a run that died
+    before flushing only has to rescan the segment tails. When indexed segments
+    are gone (CI keeps the index but not the segments), their hashes are kept as
+    settled so unchanged activities are still not rewritten.
+    """
+
+    backend = "segments"
+
+    def __init__(self, directory: str, max_segment_bytes: int = SEGMENT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.segments_dir = os.path.join(directory, SEGMENTS_DIRNAME)
+        self.index_path = os.path.join(_index_dir(directory, self.segments_dir), SEGMENT_INDEX_FILENAME)
+        self.max_segment_bytes = max(1, int(max_segment_bytes))
+        self.changed_ids: Set[str] = set()
+        self._records: Dict[str, List[Any]] = {}
+        self._settled: Dict[str, str] = {}
+        self._segment_sizes: Dict[str, int] = {}
+        self._dead_bytes = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load_index()
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"{number:06d}{SEGMENT_SUFFIX}"
+
+    @staticmethod
+    def _segment_number(name: str) -> int:
+        return int(name[: -len(SEGMENT_SUFFIX)])
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.segments_dir, name)
+
+    def _segments_on_disk(self) -> List[str]:
+        if not os.path.isdir(self.segments_dir):
+            return []
+        names = []
+        for filename in os.listdir(self.segments_dir):
+            if filename.endswith(SEGMENT_SUFFIX) and filename[: -len(SEGMENT_SUFFIX)].isdigit():
+                names.append(filename)
+        return sorted(names, key=self._segment_number)
+
+    def _load_index(self) -> None:
+        payload: Any = {}
+        if os.path.exists(self.index_path):
+            try:
+                payload = read_json(self.index_path)
+            except Exception:
+                payload = {}
+        if isinstance(payload, dict) and payload.get("version") == SEGMENT_INDEX_VERSION:
+            self._records = dict(payload.get("records") or {})
+            self._segment_sizes = {
+                str(name): int(size) for name, size in (payload.get("segments") or {}).items()
+            }
+            self._dead_bytes = int(payload.get("dead_bytes", 0) or 0)
+            self._settled = dict(payload.get("settled") or {})
+
+        on_disk = self._segments_on_disk()
+        if any(name not in on_disk for name in self._segment_sizes):
+            # An indexed segment went missing; the index can't be trusted.
+            self._settled.update({activity_id: entry[3] for activity_id, entry in self._records.items()})
+            self._records, self._segment_sizes, self._dead_bytes = {}, {}, 0
+            self._dirty = True
+        newest_indexed = max((self._segment_number(name) for name in self._segment_sizes), default=0)
+        for name in on_disk:
+            if name not in self._segment_sizes and self._segment_number(name) < newest_indexed:
+                # Left behind by a compaction that was interrupted after its
+                # new index was written; everything live in it was copied.
+                os.remove(self._segment_path(name))
+                continue
+            indexed_size = self._segment_sizes.get(name, 0)
+            if os.path.getsize(self._segment_path(name)) != indexed_size:
+                self._scan_segment(name, indexed_size)
+
+    def _scan_segment(self, name: str, start: int) -> None:
+        path = self._segment_path(name)
+        offset = start
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(record, name, offset, len(line))
+                offset += len(line)
+        if offset != os.path.getsize(path):
+            # Drop a torn trailing record from a write that never finished.
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self._segment_sizes[name] = offset
+        self._dirty = True
+
+    def _apply(self, record: Dict[str, Any], name: str, offset: int, length: int) -> None:
+        activity_id = str(record.get("id"))
+        previous = self._records.pop(activity_id, None)
+        if previous is not None:
+            self._dead_bytes += int(previous[2])
+        if record.get("deleted"):
+            self._dead_bytes += length
+            return
+        self._records[activity_id] = [
+            name,
+            offset,
+            length,
+            record.get("sha256"),
+            record.get("start_ts"),
+        ]
+
+    def _active_segment(self, incoming: int) -> str:
+        names = sorted(self._segment_sizes, key=self._segment_number)
+        if names:
+            name = names[-1]
+            size = self._segment_sizes[name]
+            if size == 0 or size + incoming <= self.max_segment_bytes:
+                return name
+            number = self._segment_number(name) + 1
+        else:
+            number = 1
+        name = self._segment_name(number)
+        self._segment_sizes[name] = 0
+        return name
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, ensure_ascii=True, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+        ensure_dir(self.segments_dir)
+        name = self._active_segment(len(line))
+        offset = self._segment_sizes[name]
+        with open(self._segment_path(name), "ab") as f:
+            f.write(line)
+        self._segment_sizes[name] = offset + len(line)
+        self._apply(record, name, offset, len(line))
+        self._dirty = True
+
+    def put(self, activity_id: str, activity: Dict[str, Any]) -> bool:
+        digest = content_hash(activity)
+        with self._lock:
+            entry = self._records.get(activity_id)
+            if entry is not None and entry[3] == digest:
+                return False
+            if entry is None and self._settled.get(activity_id) == digest:
+                return False
+            self._settled.pop(activity_id, None)
+            self._append(
+                {
+                    "id": activity_id,
+                    "sha256": digest,
+                    "start_ts": activity_start_ts(activity),
+                    "activity": activity,
+                }
+            )
+            self.changed_ids.add(activity_id)
+        return True
+
+    def remove(self, activity_id: str) -> bool:
+        with self._lock:
+            if self._settled.pop(activity_id, None) is not None:
+                self._dirty = True
+            if activity_id not in self._records:
+                return False
+            self._append({"id": activity_id, "deleted": True})
+            self.changed_ids.add(activity_id)
+        return True
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return sorted(self._records)
+
+    def get(self, activity_id: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._records.get(activity_id)
+        if entry is None:
+            return None
+        name, offset, length = entry[0], int(entry[1]), int(entry[2])
+        with open(self._segment_path(name), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length)).get("activity")
+
+    def iter_activities(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            entries = sorted(
+                self._records.items(),
+                key=lambda item: (self._segment_number(item[1][0]), int(item[1][1])),
+            )
+        handle = None
+        current = None
+        try:
+            # Live records are read in segment/offset order, so each segment is
+            # scanned front to back once.
+            for activity_id, entry in entries:
+                name, offset, length = entry[0], entry[1], entry[2]
+                if name != current:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(self._segment_path(name), "rb")
+                    current = name
+                handle.seek(int(offset))
+                yield activity_id, json.loads(handle.read(int(length))).get("activity")
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def start_times(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            return {activity_id: entry[4] for activity_id, entry in self._records.items()}
+
+    def versions(self) -> Dict[str, str]:
+        with self._lock:
+            return {activity_id: str(entry[3]) for activity_id, entry in self._records.items()}
+
+    def _live_bytes(self) -> int:
+        return sum(int(entry[2]) for entry in self._records.values())
+
+    def compact(self) -> bool:
+        with self._lock:
+            if not self._segment_sizes or self._dead_bytes == 0:
+                return False
+            old_names = sorted(self._segment_sizes, key=self._segment_number)
+            next_number = self._segment_number(old_names[-1]) + 1
+            entries = sorted(
+                self._records.items(),
+                key=lambda item: (self._segment_number(item[1][0]), int(item[1][1])),
+            )
+            records: Dict[str, List[Any]] = {}
+            sizes: Dict[str, int] = {}
+            out = None
+            name = ""
+            try:
+                for activity_id, entry in entries:
+                    with open(self._segment_path(entry[0]), "rb") as f:
+                        f.seek(int(entry[1]))
+                        line = f.read(int(entry[2]))
+                    if out is None or sizes[name] + len(line) > self.max_segment_bytes:
+                        if out is not None:
+                            out.close()
+                        name = self._segment_name(next_number)
+                        next_number += 1
+                        sizes[name] = 0
+                        out = open(self._segment_path(name), "wb")
+                    records[activity_id] = [name, sizes[name], len(line), entry[3], entry[4]]
+                    out.write(line)
+                    sizes[name] += len(line)
+            finally:
+                if out is not None:
+                    out.close()
+            self._records = records
+            self._segment_sizes = sizes
+            self._dead_bytes = 0
+            self._dirty = True
+            self._write_index()
+            for old_name in old_names:
+                os.remove(self._segment_path(old_name))
+        return True
+
+    def _write_index(self) -> None:
+        ensure_dir(os.path.dirname(self.index_path))
+        write_json(
+            self.index_path,
+            {
+                "version": SEGMENT_INDEX_VERSION,
+                "segments": self._segment_sizes,
+                "records": self._records,
+                "dead_bytes": self._dead_bytes,
+                "settled": self._settled,
+            },
+        )
+        self._dirty = False
+
+    def flush(self) -> None:
+        should_compact = False
+        with self._lock:
+            if self._dirty:
+                self._write_index()
+            should_compact = (
+                self._dead_bytes >= COMPACT_MIN_DEAD_BYTES and self._dead_bytes > self._live_bytes()
+            )
+        if should_compact:
+            self.compact()
+
+
+ActivityStore = Union[RawActivityStore, SegmentedActivityStore]
+
+
+def open_store(directory: str, backend: str = DEFAULT_RAW_STORE_BACKEND) -> ActivityStore:
+    if backend == "segments":
+        return SegmentedActivityStore(directory)
+    if backend == "files":
+        return RawActivityStore(directory)
+    raise ValueError(f"Unsupported raw store backend '{backend}'.")
+
+
+def migrate_store(directory: str, backend: str) -> int:
+    """Move every activity in `directory` into `backend`'s layout."""
+    other = "files" if backend == "segments" else "segments"
+    source = open_store(directory, other)
+    source_ids = source.ids()
+    if not source_ids:
+        return 0
+    target = open_store(directory, backend)
+    for activity_id, activity in source.iter_activities():
+        target.put(activity_id, activity)
+    target.flush()
+    for activity_id in source_ids:
+        source.remove(activity_id)
+    source.flush()
+    source.compact()
+    return len(source_ids)
+
+
+_open_stores: Dict[str, ActivityStore] = {}
+_open_lock = threading.Lock()
+
+
+def shared_store(directory: str, backend: Optional[str] = None) -> ActivityStore:
+    """Process-wide store for `directory`, opened (and migrated) on first use.
+
+    Sync runs call this once with the configured backend; later calls without
+    one get the same instance.
+    """
+    with _open_lock:
+        store = _open_stores.get(directory)
+        if store is None:
+            backend = backend or DEFAULT_RAW_STORE_BACKEND
+            migrated = migrate_store(directory, backend)
+            if migrated:
+                print(f"Migrated {migrated} raw activities in {directory} to the {backend} store.")
+            store = open_store(directory, backend)
+            _open_stores[directory] = store
+        return store
+
+
+def close_store(directory: str, flush: bool = True) -> Optional[ActivityStore]:
+    with _open_lock:
+        store = _open_stores.pop(directory, None)
+    if store is not None and flush:
+        store.flush()
+    return store
+
+
+def discard_store(directory: str) -> None:
+    """Drop `directory` and its index without flushing."""
+    close_store(directory, flush=False)
+    for path in (directory, _index_dir(directory, directory)):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain the raw activity store")
+    parser.add_argument("command", choices=["migrate", "compact"])
+    parser.add_argument("--source", help="strava or garmin (defaults to config source)")
+    parser.add_argument(
+        "--to",
+        choices=sorted(RAW_STORE_BACKENDS),
+        help="Target layout for migrate (defaults to sync.raw_store)",
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    source = normalize_source(args.source or config.get("source", "strava"))
+    directory = raw_activity_dir(source)
+    backend = args.to or raw_store_backend(config)
+
+    if args.command == "migrate":
+        migrated = migrate_store(directory, backend)
+        print(f"Migrated {migrated} raw activities in {directory} to the {backend} store.")
+        return 0
+
+    store = open_store(directory, backend)
+    compacted = store.compact()
+    print(f"Compacted {directory}." if compacted else f"Nothing to compact in {directory}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -23,6 +23,7 @@ README_MD = "README.md"
 SOURCE_STATE_PATH = os.path.join("data", "source_state.json")
 RESETTABLE_OUTPUTS = [
     os.path.join("data", "activities_normalized.json"),
+    os.path.join("data", "normalize_manifest.json"),
     os.path.join("data", "daily_aggregates.json"),
     os.path.join("data", "last_sync_summary.json"),
     os.path.join("data", "last_sync_summary.txt"),
@@ -33,6 +34,9 @@ RESETTABLE_STATE_FILES = [
     os.path.join("data", "backfill_state.json"),
     os.path.join("data", "backfill_state_strava.json"),
     os.path.join("data", "backfill_state_garmin.json"),
+    os.path.join("data", "prune_reconcile_strava.json"),
+    os.path.join("data", "garmin_duration_cache.json"),
+    os.path.join("data", "strava_event_cursor.json"),
     os.path.join("data", "athletes.json"),
     os.path.join("data", "athletes_strava.json"),
     os.path.join("data", "athletes_garmin.json"),
@@ -41,6 +45,7 @@ RESETTABLE_RAW_DIRS = [
     os.path.join("activities", "raw"),
     os.path.join("activities", "raw", "strava"),
     os.path.join("activities", "raw", "garmin"),
+    os.path.join("data", "raw_index"),
 ]
 SOURCE_HINT_STRAVA = "strava"
 SOURCE_HINT_GARMIN = "garmin"
@@ -51,11 +56,6 @@ README_LIVE_SITE_RE = re.compile(
 )
 
 
-def _write_normalized(items):
-    ensure_dir("data")
-    write_json(os.path.join("data", "activities_normalized.json"), items)
-
-
 def _write_aggregates(payload):
     ensure_dir("data")
     write_json(os.path.join("data", "daily_aggregates.json"), payload)
@@ -265,8 +265,8 @@ def run_pipeline(
         summary = _sync_for_source(source, dry_run=dry_run, prune_deleted=prune_deleted)
         print(f"Synced ({source}): {summary}")
 
-    items = normalize_func()
-    _write_normalized(items)
+    # normalize writes its own output so its manifest can record the file.
+    normalize_func()
 
     aggregates = aggregate_func()
     _write_aggregates(aggregates)
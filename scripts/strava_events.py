@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils import ensure_dir, load_config, utc_now
+
+DEFAULT_EVENT_LOG_PATH = os.path.join("data", "strava_events.jsonl")
+RECEIVER_OBJECT_TYPE = "receiver"
+
+_append_lock = threading.Lock()
+
+
+def append_event(path: str, event: Dict[str, Any]) -> None:
+    line = json.dumps(event, ensure_ascii=True, sort_keys=True, separators=(",", ":")) + "\n"
+    directory = os.path.dirname(path)
+    if directory:
+        ensure_dir(directory)
+    with _append_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _log_head(path: str) -> Optional[str]:
+    with open(path, "rb") as f:
+        first = f.readline()
+    if not first.endswith(b"\n"):
+        return None
+    return hashlib.sha256(first).hexdigest()
+
+
+def read_events(
+    path: str, cursor: Optional[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, Any], Optional[str]]:
+    """Read complete events after `cursor`.
+
+    Returns (offset after each event, event) pairs, the cursor to save once
+    they are all applied, and why the log can't be trusted to be complete
+    since the last cursor (None when it can). Callers fall back to polling
+    whenever a gap reason is returned.
+    """
+    if not os.path.exists(path):
+        return [], dict(cursor or {}), "event log missing"
+    head = _log_head(path)
+    gap: Optional[str] = None
+    offset = int((cursor or {}).get("offset", 0) or 0)
+    if not cursor:
+        gap = "no event cursor yet"
+        offset = 0
+    elif cursor.get("head") != head or os.path.getsize(path) < offset:
+        gap = "event log was replaced or truncated"
+        offset = 0
+
+    events: List[Tuple[int, Dict[str, Any]]] = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # A receiver is mid-write; pick this one up next time.
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                gap = gap or "unreadable event in log"
+                continue
+            if not isinstance(event, dict):
+                gap = gap or "unreadable event in log"
+                continue
+            if event.get("object_type") == RECEIVER_OBJECT_TYPE:
+                # The receiver restarted; events sent while it was down are lost.
+                gap = gap or "event receiver restarted"
+                continue
+            events.append((offset, event))
+    return events, {"offset": offset, "head": head}, gap
+
+
+def activity_actions(events: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, str]:
+    """Collapse activity events to one action per ID, in first-seen order.
+
+    One fetch after the batch was written reflects every create/update in it,
+    and a deleted activity ID is never reused, so any delete wins.
+    """
+    actions: Dict[str, str] = {}
+    for _offset, event in events:
+        if event.get("object_type") != "activity" or event.get("object_id") is None:
+            continue
+        activity_id = str(event["object_id"])
+        if event.get("aspect_type") == "delete":
+            actions[activity_id] = "delete"
+        elif event.get("aspect_type") in {"create", "update"}:
+            actions.setdefault(activity_id, "fetch")
+    return actions
+
+
+def _make_handler(log_path: str, verify_token: str) -> type:
+    class _Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            # Strava's subscription handshake.
+            query = parse_qs(urlparse(self.path).query)
+            mode = (query.get("hub.mode") or [""])[0]
+            token = (query.get("hub.verify_token") or [""])[0]
+            challenge = (query.get("hub.challenge") or [""])[0]
+            if mode != "subscribe" or not verify_token or token != verify_token:
+                self._reply(403, {"error": "verification failed"})
+                return
+            self._reply(200, {"hub.challenge": challenge})
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                event = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._reply(400, {"error": "invalid JSON"})
+                return
+            if not isinstance(event, dict) or "aspect_type" not in event:
+                self._reply(400, {"error": "not a Strava event"})
+                return
+            append_event(log_path, event)
+            self._reply(200, {"ok": True})
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return
+
+    return _Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Receive Strava webhook events into a local log")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--log", help="Event log path (defaults to sync.event_log)")
+    args = parser.parse_args()
+
+    config = load_config()
+    log_path = args.log or str((config.get("sync", {}) or {}).get("event_log") or DEFAULT_EVENT_LOG_PATH)
+    verify_token = str((config.get("strava", {}) or {}).get("webhook_verify_token") or "")
+    if not verify_token:
+        print("Warning: strava.webhook_verify_token is empty; subscription handshakes will be rejected.")
+
+    # Mark the restart so the next sync knows events may have been missed.
+    append_event(
+        log_path,
+        {"object_type": RECEIVER_OBJECT_TYPE, "aspect_type": "start", "event_time": int(utc_now().timestamp())},
+    )
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(log_path, verify_token))
+    print(f"Listening on http://{args.host}:{args.port}/ and appending events to {log_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
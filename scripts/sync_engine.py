@@ -0,0 +1,225 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from raw_store import close_store, shared_store
+from sync_scope import activity_start_ts
+from sync_telemetry import finish_trace, start_trace
+from utils import utc_now
+
+PrepareActivity = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class SyncProvider:
+    """Source-specific hooks the sync engine pages, commits and prunes through.
+
+    Subclasses set `name` and `raw_dir` and implement `fetch_recent_page`; the
+    other hooks default to raw payloads that already carry `id` and a start
+    time (Strava's shape).
+    """
+
+    name = ""
+    raw_dir = ""
+
+    def normalize(self, activity: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the activity as stored; an empty dict skips it."""
+        return activity
+
+    def is_rate_limited(self, exc: Exception) -> bool:
+        return False
+
+    def fetch_recent_page(
+        self, cursor: Optional[Any], after: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """Fetch one page, newest first, starting at `cursor` (None for the first).
+
+        Returns the page and the cursor of the next one, or None when this
+        page is known to be the last.
+        """
+        raise NotImplementedError
+
+
+def safe_activity_id(activity: Dict[str, Any]) -> Optional[str]:
+    activity_id = str(activity.get("id") or "").strip()
+    if not activity_id or activity_id in {".", ".."}:
+        return None
+    if "/" in activity_id or "\\" in activity_id or ".." in activity_id:
+        return None
+    return activity_id
+
+
+def write_activity(raw_dir: str, activity: Dict[str, Any]) -> bool:
+    activity_id = safe_activity_id(activity)
+    if activity_id is None:
+        return False
+    return shared_store(raw_dir).put(activity_id, activity)
+
+
+class ActivityCommitter:
+    """Normalize, write and count fetched pages for one stream of work.
+
+    Activities starting before `after` are skipped and reported as reaching the
+    boundary (sources whose API filters by date pass None). Not thread-safe;
+    concurrent streams each get their own committer.
+    """
+
+    def __init__(
+        self,
+        provider: SyncProvider,
+        after: Optional[int] = None,
+        dry_run: bool = False,
+        prepare: Optional[PrepareActivity] = None,
+    ) -> None:
+        self.provider = provider
+        self.after = after
+        self.dry_run = dry_run
+        self.prepare = prepare
+        self.fetched = 0
+        self.new_or_updated = 0
+        self.oldest_ts: Optional[int] = None
+        self.newest_ts: Optional[int] = None
+        self.activity_ids: Set[str] = set()
+
+    def commit(self, activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store one page; returns its own oldest/newest start and boundary flag."""
+        page: Dict[str, Any] = {"reached_boundary": False, "oldest_ts": None, "newest_ts": None}
+        for raw_activity in activities:
+            activity = self.provider.normalize(raw_activity)
+            if not activity:
+                continue
+            ts = activity_start_ts(activity)
+            if ts is not None and self.after is not None and ts < self.after:
+                page["reached_boundary"] = True
+                continue
+            self.fetched += 1
+            if ts is not None:
+                page["oldest_ts"] = ts if page["oldest_ts"] is None else min(page["oldest_ts"], ts)
+                page["newest_ts"] = ts if page["newest_ts"] is None else max(page["newest_ts"], ts)
+            if activity.get("id"):
+                self.activity_ids.add(str(activity["id"]))
+            if self.prepare is not None:
+                activity = self.prepare(activity)
+            if not self.dry_run and write_activity(self.provider.raw_dir, activity):
+                self.new_or_updated += 1
+        for key, pick in (("oldest_ts", min), ("newest_ts", max)):
+            if page[key] is not None:
+                current = getattr(self, key)
+                setattr(self, key, page[key] if current is None else pick(current, page[key]))
+        return page
+
+
+def sync_recent(
+    provider: SyncProvider,
+    after: Optional[int],
+    dry_run: bool,
+    prepare: Optional[PrepareActivity] = None,
+) -> Dict[str, Any]:
+    """Page back from the newest activity to `after`; None skips the poll."""
+    committer = ActivityCommitter(provider, after, dry_run, prepare)
+    rate_limited = False
+    rate_limit_message = ""
+    cursor: Optional[Any] = None
+    while after is not None:
+        try:
+            activities, next_cursor = provider.fetch_recent_page(cursor, after)
+        except Exception as exc:
+            if not provider.is_rate_limited(exc):
+                raise
+            rate_limited = True
+            rate_limit_message = str(exc)
+            break
+        if not activities:
+            break
+        page = committer.commit(activities)
+        if page["reached_boundary"] or next_cursor is None:
+            break
+        cursor = next_cursor
+
+    return {
+        "fetched": committer.fetched,
+        "new_or_updated": committer.new_or_updated,
+        "oldest_ts": committer.oldest_ts,
+        "newest_ts": committer.newest_ts,
+        "rate_limited": rate_limited,
+        "rate_limit_message": rate_limit_message,
+        "activity_ids": sorted(committer.activity_ids),
+    }
+
+
+def prune_unseen(raw_dir: str, seen_ids: Set[str]) -> int:
+    """Remove stored activities a full scan did not return."""
+    store = shared_store(raw_dir)
+    deleted = 0
+    for activity_id in store.ids():
+        if activity_id not in seen_ids and store.remove(activity_id):
+            deleted += 1
+    return deleted
+
+
+def final_backfill_state(
+    state: Dict[str, Any],
+    skip_backfill: bool,
+    rate_limited: bool,
+    build_state: Callable[[], Dict[str, Any]],
+    activity_scope: Dict[str, Any],
+    incremental: Dict[str, Any],
+) -> Dict[str, Any]:
+    """State to persist at the end of a run.
+
+    A run that skipped an already finished backfill keeps the stored cursors
+    and only refreshes its bookkeeping; otherwise `build_state` snapshots them.
+    """
+    if skip_backfill and state:
+        state_update = dict(state)
+        state_update["completed"] = True
+        state_update["rate_limited"] = rate_limited
+        state_update["last_run_utc"] = utc_now().isoformat()
+    else:
+        state_update = build_state()
+    state_update["activity_scope"] = activity_scope
+    state_update["incremental"] = incremental
+    return state_update
+
+
+def base_summary(
+    source: str,
+    fetched: int,
+    new_or_updated: int,
+    deleted: int,
+    after: int,
+    rate_limited: bool,
+    completed: bool,
+) -> Dict[str, Any]:
+    return {
+        "source": source,
+        "fetched": fetched,
+        "new_or_updated": new_or_updated,
+        "deleted": deleted,
+        "lookback_start_ts": after,
+        "timestamp_utc": utc_now().isoformat(),
+        "rate_limited": rate_limited,
+        "backfill_completed": completed,
+    }
+
+
+def run_sync(
+    raw_dir: str,
+    sync: Callable[[], Dict[str, Any]],
+    source: str = "",
+    trace_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run a sync and count the raw activities it changed once the store is flushed.
+
+    The IDs themselves stay out of the committed summary: normalize finds
+    them by comparing raw store versions against its own manifest.
+
+    Provider requests made meanwhile are traced (see sync_telemetry) and
+    rolled up under "requests".
+    """
+    trace = start_trace(source, trace_path)
+    try:
+        summary = sync()
+    finally:
+        store = close_store(raw_dir)
+        request_stats = finish_trace(trace)
+    summary["changed"] = len(store.changed_ids) if store else 0
+    summary["requests"] = request_stats
+    return summary
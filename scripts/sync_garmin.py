@@ -3,10 +3,14 @@ import hashlib
 import hmac
 import json
 import os
-import shutil
+import random
 import sys
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from garmin_token_store import (
     decode_token_store_b64,
@@ -18,11 +22,27 @@ from provider_fields import (
     get_nested as _shared_get_nested,
     pick_duration_seconds as _shared_pick_duration_seconds,
 )
+from sync_planner import activities_per_day, build_plan, normalized_start_times
 from sync_scope import (
     activity_scope_from_config,
     activity_start_ts as _shared_activity_start_ts,
+    advance_incremental_state,
+    plan_recent_sync,
     start_after_ts as _shared_start_after_ts,
 )
+from raw_store import discard_store, open_store, raw_store_backend, shared_store
+from sync_engine import (
+    ActivityCommitter,
+    SyncProvider,
+    base_summary,
+    final_backfill_state,
+    prune_unseen,
+    run_sync,
+    sync_recent,
+    write_activity,
+)
+from sync_scheduler import WorkScheduler, budget_reserve_from_config
+from sync_telemetry import active_trace, request_trace_path
 from utils import ensure_dir, load_config, raw_activity_dir, read_json, utc_now, write_json
 
 RAW_DIR = raw_activity_dir("garmin")
@@ -31,6 +51,33 @@ SUMMARY_TXT = os.path.join("data", "last_sync_summary.txt")
 STATE_PATH = os.path.join("data", "backfill_state_garmin.json")
 ATHLETE_PATH = os.path.join("data", "athletes_garmin.json")
 TOKEN_STORE_PATH = ".garmin_token_store"
+DURATION_CACHE_PATH = os.path.join("data", "garmin_duration_cache.json")
+DURATION_METHODS = ["get_activity", "getActivity", "get_activity_details", "getActivityDetails"]
+# Activities whose details held no duration are asked again after this long.
+DURATION_MISS_RETRY_SECONDS = 30 * 86400
+BACKFILL_MODES = {"auto", "windows", "offset"}
+# Garmin Connect launched in 2008; anything older (imports) shares one window.
+FIRST_WINDOW_YEAR = 2008
+# get_activities_by_date pages through a window 20 activities per request.
+DATE_WINDOW_PAGE_SIZE = 20
+GOVERNOR_STATE_PATH = os.path.join("data", "garmin_governor.json")
+# Client calls that hit Garmin's API and so go through the governor.
+# get_activities_by_date pages internally, so the governor paces whole date
+# windows. Windows are yearly until one comes back with a full page; the
+# account is then dense enough that the remaining years are fetched month by
+# month, keeping each call to a few requests and a 429 retry to one month.
+GOVERNED_METHODS = {"get_activities", "getActivities", "get_activities_by_date", *DURATION_METHODS}
+# Requests per second the governor may settle on, and how fast it probes upward
+# again after backing off (added per successful request).
+GOVERNOR_MIN_RATE = 0.05
+GOVERNOR_MAX_RATE = 10.0
+GOVERNOR_RATE_STEP = 0.02
+GOVERNOR_BACKOFF_SECONDS = 10.0
+GOVERNOR_MAX_BACKOFF_SECONDS = 300.0
+# A latency average this many times the fastest one seen counts as the server
+# struggling; the rate is eased off at most once per cooldown.
+GOVERNOR_SLOW_LATENCY_FACTOR = 3.0
+GOVERNOR_LATENCY_COOLDOWN_SECONDS = 30.0
 
 
 def _to_bool(value: Any) -> bool:
@@ -160,49 +207,131 @@ def _normalize_activity(activity: Dict[str, Any]) -> Dict[str, Any]:
     return normalized
 
 
-def _fetch_activity_duration_from_summary(client: Any, activity_id: str) -> Optional[float]:
-    methods = [
-        ("get_activity", (activity_id,), {}),
-        ("getActivity", (activity_id,), {}),
-        ("get_activity_details", (activity_id,), {}),
-        ("getActivityDetails", (activity_id,), {}),
-    ]
-    for method_name, args, kwargs in methods:
+def _fetch_activity_duration_from_summary(
+    client: Any, activity_id: str, preferred: Optional[str] = None
+) -> Tuple[Optional[float], Optional[str], int, bool]:
+    """Return (seconds, method that found them, detail calls made, any call failed)."""
+    methods = list(DURATION_METHODS)
+    if preferred in methods:
+        methods.remove(preferred)
+        methods.insert(0, preferred)
+    calls = 0
+    failed = False
+    for method_name in methods:
         method = getattr(client, method_name, None)
         if not callable(method):
             continue
+        calls += 1
         try:
-            payload = method(*args, **kwargs)
-        except Exception:
+            payload = method(activity_id)
+        except Exception as exc:
+            failed = True
+            if _is_rate_limited_error(exc):
+                break
             continue
         if not isinstance(payload, dict):
             continue
         value = _pick_duration_seconds(*_duration_candidates(payload))
         if value > 0:
-            return value
-    return None
+            return value, method_name, calls, failed
+    return None, None, calls, failed
 
 
-def _enrich_missing_duration(
-    client: Any,
-    normalized: Dict[str, Any],
-    stats: Optional[Dict[str, int]] = None,
-) -> Dict[str, Any]:
-    if _safe_float(normalized.get("moving_time"), 0.0) > 0:
-        return normalized
-    activity_id = str(normalized.get("id") or "").strip()
-    if not activity_id:
-        return normalized
-    resolved = _fetch_activity_duration_from_summary(client, activity_id)
-    if not resolved or resolved <= 0:
-        return normalized
-    enriched = dict(normalized)
-    enriched["moving_time"] = resolved
-    if stats is not None:
-        stats["duration_enriched"] = int(stats.get("duration_enriched", 0)) + 1
+def _needs_duration(activity: Dict[str, Any]) -> bool:
+    return _safe_float(activity.get("moving_time"), 0.0) <= 0 and bool(activity.get("id"))
+
+
+def _with_duration(activity: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+    enriched = dict(activity)
+    enriched["moving_time"] = seconds
     return enriched
 
 
+class DurationEnricher:
+    """Look up missing activity durations on a bounded thread pool.
+
+    Results are cached by activity ID in DURATION_CACHE_PATH together with the
+    client method that found them; the last method that worked is tried first
+    for new activities.
+    """
+
+    def __init__(self, client: Any, workers: int, cache_path: str = DURATION_CACHE_PATH) -> None:
+        self.client = client
+        self.cache_path = cache_path
+        payload: Dict[str, Any] = {}
+        if os.path.exists(cache_path):
+            try:
+                payload = read_json(cache_path) or {}
+            except Exception:
+                payload = {}
+        entries = payload.get("activities") if isinstance(payload, dict) else None
+        self.entries: Dict[str, Dict[str, Any]] = entries if isinstance(entries, dict) else {}
+        self.preferred_method: Optional[str] = (
+            payload.get("preferred_method") if isinstance(payload, dict) else None
+        )
+        self.stats = {"duration_enriched": 0, "duration_cached": 0, "duration_lookups": 0}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)))
+
+    def apply_cached(self, activity: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Fill the duration from the cache; the flag says a lookup is still needed."""
+        if not _needs_duration(activity):
+            return activity, False
+        with self._lock:
+            entry = self.entries.get(str(activity["id"]))
+            if not isinstance(entry, dict):
+                return activity, True
+            seconds = _safe_float(entry.get("seconds"), 0.0)
+            if seconds > 0:
+                self.stats["duration_cached"] += 1
+                return _with_duration(activity, seconds), False
+        checked_ts = _safe_int(entry.get("checked_ts")) or 0
+        return activity, int(utc_now().timestamp()) - checked_ts >= DURATION_MISS_RETRY_SECONDS
+
+    def submit(self, activity: Dict[str, Any]) -> "Future[Optional[Dict[str, Any]]]":
+        return self._pool.submit(self._lookup, activity)
+
+    def _lookup(self, activity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        activity_id = str(activity["id"])
+        seconds, method, calls, failed = _fetch_activity_duration_from_summary(
+            self.client, activity_id, self.preferred_method
+        )
+        with self._lock:
+            self.stats["duration_lookups"] += calls
+            if seconds:
+                self.entries[activity_id] = {"seconds": seconds, "method": method}
+                self.preferred_method = method
+                self.stats["duration_enriched"] += 1
+                self._dirty = True
+            elif not failed:
+                # Only remember a miss Garmin actually answered; errors such as
+                # rate limiting are retried next run.
+                self._dirty = True
+                self.entries[activity_id] = {
+                    "seconds": None,
+                    "method": None,
+                    "checked_ts": int(utc_now().timestamp()),
+                }
+        return _with_duration(activity, seconds) if seconds else None
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "version": 1,
+                "preferred_method": self.preferred_method,
+                "activities": dict(sorted(self.entries.items())),
+            }
+            self._dirty = False
+        ensure_dir(os.path.dirname(self.cache_path) or ".")
+        write_json(self.cache_path, payload)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
 def _activity_start_ts(activity: Dict[str, Any]) -> Optional[int]:
     return _shared_activity_start_ts(activity)
 
@@ -230,6 +359,142 @@ def _save_state(state: Dict[str, Any]) -> None:
     write_json(STATE_PATH, state)
 
 
+def _backfill_state(
+    after: int,
+    next_offset: Optional[int],
+    completed: bool,
+    min_ts: Optional[int],
+    max_ts: Optional[int],
+    rate_limited: bool,
+    activity_scope: Dict[str, Any],
+    incremental: Optional[Dict[str, Any]] = None,
+    windows: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    state = {
+        "after": after,
+        "backfill_mode": "offset" if windows is None else "windows",
+        "next_offset": next_offset,
+        "completed": completed,
+        "oldest_seen_ts": min_ts,
+        "newest_seen_ts": max_ts,
+        "rate_limited": rate_limited,
+        "last_run_utc": utc_now().isoformat(),
+        "activity_scope": activity_scope,
+    }
+    if windows is not None:
+        state["windows"] = windows
+    if incremental is not None:
+        state["incremental"] = incremental
+    return state
+
+
+def _supports_date_windows(client: Any) -> bool:
+    return callable(getattr(client, "get_activities_by_date", None))
+
+
+def _backfill_mode(config: Dict[str, Any], client: Any) -> str:
+    mode = str((config.get("garmin", {}) or {}).get("backfill_mode", "auto") or "auto").strip().lower()
+    if mode not in BACKFILL_MODES:
+        raise ValueError(
+            f"Unsupported garmin.backfill_mode '{mode}' (expected one of: auto, windows, offset)."
+        )
+    if mode == "offset":
+        return mode
+    if _supports_date_windows(client):
+        return "windows"
+    if mode == "windows":
+        print("Garmin client has no get_activities_by_date; falling back to offset paging.")
+    return "offset"
+
+
+def _new_window(label: str, start: date, end: date) -> Dict[str, Any]:
+    return {
+        "label": label,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "completed": False,
+        "fetched": 0,
+    }
+
+
+def _build_backfill_windows(after: int, now_ts: int) -> List[Dict[str, Any]]:
+    """Yearly date windows, newest first, covering `after` up to today."""
+    today = datetime.fromtimestamp(now_ts, tz=timezone.utc).date()
+    earliest = date(1970, 1, 1)
+    if after > 0:
+        # Garmin matches windows on local start dates; starting a day early keeps
+        # activities that are after `after` in UTC but not locally. The
+        # `ts < after` filter drops the extras.
+        earliest = datetime.fromtimestamp(after, tz=timezone.utc).date() - timedelta(days=1)
+    windows = []
+    year = today.year
+    while year >= FIRST_WINDOW_YEAR and date(year, 12, 31) >= earliest:
+        windows.append(
+            _new_window(str(year), max(date(year, 1, 1), earliest), min(date(year, 12, 31), today))
+        )
+        year -= 1
+    if earliest < date(FIRST_WINDOW_YEAR, 1, 1):
+        windows.append(
+            _new_window(f"before-{FIRST_WINDOW_YEAR}", earliest, date(FIRST_WINDOW_YEAR - 1, 12, 31))
+        )
+    return windows
+
+
+def _month_windows(window: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a yearly window into monthly ones, newest first."""
+    start = date.fromisoformat(window["start"])
+    end = date.fromisoformat(window["end"])
+    months = []
+    month = date(end.year, end.month, 1)
+    while True:
+        month_end = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        months.append(_new_window(month.strftime("%Y-%m"), max(month, start), min(month_end, end)))
+        if month <= start:
+            return months
+        month = (month - timedelta(days=1)).replace(day=1)
+
+
+def _windows_from_state(
+    state: Dict[str, Any], after: int, now_ts: int
+) -> Tuple[List[Dict[str, Any]], bool]:
+    saved = {
+        str(item.get("label")): item
+        for item in (state.get("windows") or [])
+        if isinstance(item, dict)
+    }
+
+    def _resume(window: Dict[str, Any]) -> bool:
+        prior = saved.get(window["label"])
+        if prior and prior.get("start") == window["start"] and prior.get("completed"):
+            window["completed"] = True
+            window["fetched"] = int(prior.get("fetched", 0) or 0)
+            return True
+        return False
+
+    windows: List[Dict[str, Any]] = []
+    resumed = False
+    for window in _build_backfill_windows(after, now_ts):
+        if _resume(window):
+            resumed = True
+            windows.append(window)
+            continue
+        if any(label.startswith(f"{window['label']}-") for label in saved):
+            # This year was already being fetched by month.
+            for month in _month_windows(window):
+                resumed = _resume(month) or resumed
+                windows.append(month)
+            continue
+        windows.append(window)
+    return windows, resumed
+
+
+def _fetch_window(client: Any, window: Dict[str, Any]) -> List[Dict[str, Any]]:
+    payload = client.get_activities_by_date(window["start"], window["end"])
+    if not isinstance(payload, list):
+        return []
+    return [item for item in payload if isinstance(item, dict)]
+
+
 def _load_account_fingerprint() -> Optional[str]:
     if not os.path.exists(ATHLETE_PATH):
         return None
@@ -290,16 +555,17 @@ def _has_existing_data() -> bool:
 def _reset_persisted_data() -> None:
     paths = [
         os.path.join("data", "activities_normalized.json"),
+        os.path.join("data", "normalize_manifest.json"),
         os.path.join("data", "daily_aggregates.json"),
         os.path.join("data", "last_sync_summary.json"),
         os.path.join("data", "last_sync_summary.txt"),
+        os.path.join("data", "garmin_duration_cache.json"),
         os.path.join("site", "data.json"),
     ]
     for path in paths:
         if os.path.exists(path):
             os.remove(path)
-    if os.path.exists(RAW_DIR):
-        shutil.rmtree(RAW_DIR)
+    discard_store(RAW_DIR)
 
 
 def _maybe_reset_for_new_account(config: Dict[str, Any]) -> None:
@@ -461,6 +727,8 @@ def _fetch_page(client: Any, start: int, limit: int) -> List[Dict[str, Any]]:
         try:
             payload = method(*args, **kwargs)
         except Exception as exc:
+            if _is_rate_limited_error(exc):
+                raise
             errors.append(f"{method_name}: {exc}")
             continue
         if isinstance(payload, list):
@@ -481,129 +749,432 @@ def _is_rate_limited_error(exc: Exception) -> bool:
     return "toomanyrequests" in name or "429" in text or "rate limit" in text
 
 
-def _write_activity(activity: Dict[str, Any]) -> bool:
-    activity_id = str(activity.get("id") or "").strip()
-    if not activity_id:
-        return False
-    if activity_id in {".", ".."}:
-        return False
-    if "/" in activity_id or "\\" in activity_id or ".." in activity_id:
-        return False
-
-    path = os.path.join(RAW_DIR, f"{activity_id}.json")
-    if os.path.exists(path):
+class RequestGovernor:
+    """Pace Garmin API calls at a rate learned from latencies and 429s.
+
+    Garmin publishes no limits, so the rate is found by AIMD: it starts unpaced
+    (or at the rate persisted by the last run), halves on every 429, eases off
+    when latency climbs well above the fastest seen, and otherwise creeps back
+    up by GOVERNOR_RATE_STEP per success. A 429 pauses all callers for a
+    jittered exponential backoff and the call is retried, up to `max_retries`
+    in a row; after that the error is raised, and so is every later call's.
+    """
+
+    def __init__(self, max_retries: int = 5, state_path: Optional[str] = GOVERNOR_STATE_PATH) -> None:
+        self.max_retries = max(0, int(max_retries))
+        self.state_path = state_path
+        self.rate: Optional[float] = None
+        self.fastest_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.rate_restored = False
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_slowdown = 0.0
+        self._recent_starts: deque = deque(maxlen=20)
+        self._exhausted: Optional[Exception] = None
+
+        self.requests_made = 0
+        self.rate_limit_hits = 0
+        self.retries = 0
+        self.slowdowns = 0
+        self.throttled_seconds = 0.0
+        if state_path:
+            self._load_state()
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
         try:
-            existing = read_json(path)
-            if existing == activity:
-                return False
+            payload = read_json(self.state_path)
         except Exception:
-            pass
-    write_json(path, activity)
-    return True
+            return
+        if not isinstance(payload, dict):
+            return
+        rate = _safe_float(payload.get("rate"), 0.0)
+        if rate > 0:
+            self.rate = min(GOVERNOR_MAX_RATE, max(GOVERNOR_MIN_RATE, rate))
+            self.rate_restored = True
+        fastest = _safe_float(payload.get("fastest_latency"), 0.0)
+        if fastest > 0:
+            self.fastest_latency = fastest
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            payload = {
+                "rate": round(self.rate, 4) if self.rate is not None else None,
+                "fastest_latency": (
+                    round(self.fastest_latency, 4) if self.fastest_latency is not None else None
+                ),
+                "updated_utc": utc_now().isoformat(),
+                "version": 1,
+            }
+        try:
+            ensure_dir(os.path.dirname(self.state_path) or ".")
+            write_json(self.state_path, payload)
+        except OSError as exc:
+            print(f"Warning: unable to persist Garmin request rate ({exc})")
+
+    def _acquire(self) -> float:
+        with self._lock:
+            if self._exhausted is not None:
+                raise self._exhausted
+            now = time.time()
+            slot = max(now, self._next_slot, self._paused_until)
+            if self.rate is not None:
+                self._next_slot = slot + 1.0 / self.rate
+            wait_seconds = slot - now
+            self.throttled_seconds += wait_seconds
+            self._recent_starts.append(slot)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return wait_seconds
+
+    def _observed_rate(self) -> Optional[float]:
+        if len(self._recent_starts) < 2:
+            return None
+        elapsed = self._recent_starts[-1] - self._recent_starts[0]
+        return (len(self._recent_starts) - 1) / elapsed if elapsed > 0 else None
+
+    def _record_success(self, latency: float) -> None:
+        with self._lock:
+            self.requests_made += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.fastest_latency is None or self.latency < self.fastest_latency:
+                self.fastest_latency = self.latency
+            now = time.time()
+            slow = (
+                self.latency > self.fastest_latency * GOVERNOR_SLOW_LATENCY_FACTOR
+                and now - self._last_slowdown >= GOVERNOR_LATENCY_COOLDOWN_SECONDS
+            )
+            if slow:
+                current = self.rate or self._observed_rate()
+                if current:
+                    self.rate = max(GOVERNOR_MIN_RATE, current * 0.85)
+                    self.slowdowns += 1
+                self._last_slowdown = now
+            elif self.rate is not None:
+                self.rate = min(GOVERNOR_MAX_RATE, self.rate + GOVERNOR_RATE_STEP)
+
+    def _record_rate_limited(self, attempt: int, exc: Exception) -> None:
+        with self._lock:
+            self.rate_limit_hits += 1
+            current = self.rate or self._observed_rate() or 1.0
+            self.rate = max(GOVERNOR_MIN_RATE, current * 0.5)
+            if attempt >= self.max_retries:
+                self._exhausted = exc
+                return
+            self.retries += 1
+            backoff = min(GOVERNOR_MAX_BACKOFF_SECONDS, GOVERNOR_BACKOFF_SECONDS * (2 ** attempt))
+            # Jitter keeps parallel workers from all retrying on the same tick.
+            resume_at = time.time() + backoff * random.uniform(0.5, 1.0)
+            self._paused_until = max(self._paused_until, resume_at)
+
+    def call(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        trace = active_trace()
+        attempt = 0
+        while True:
+            wait_seconds = self._acquire()
+            started = time.time()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as exc:
+                if trace is not None:
+                    _trace_call(trace, method, args, started, attempt, wait_seconds, exc=exc)
+                if not _is_rate_limited_error(exc):
+                    raise
+                self._record_rate_limited(attempt, exc)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                continue
+            self._record_success(time.time() - started)
+            if trace is not None:
+                _trace_call(trace, method, args, started, attempt, wait_seconds, result=result)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate_per_second": round(self.rate, 3) if self.rate is not None else None,
+                "rate_restored": self.rate_restored,
+                "requests": self.requests_made,
+                "rate_limit_hits": self.rate_limit_hits,
+                "retries": self.retries,
+                "slowdowns": self.slowdowns,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+
+
+def _trace_call(
+    trace: Any,
+    method: Callable[..., Any],
+    args: Tuple[Any, ...],
+    started: float,
+    attempt: int,
+    wait_seconds: float,
+    result: Any = None,
+    exc: Optional[Exception] = None,
+) -> None:
+    # Garmin clients return parsed JSON, so the size is that of the payload
+    # re-serialized. That costs as much as parsing it, so it is only measured
+    # when the trace is written out. A 429's backoff shows up as the next
+    # attempt's wait.
+    status: Optional[int] = 200
+    if exc is not None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is None and _is_rate_limited_error(exc):
+            status = 429
+    trace.record(
+        f"garmin {getattr(method, '__name__', 'request')}",
+        started=started,
+        latency_seconds=time.time() - started,
+        status=status,
+        attempt=attempt + 1,
+        params={"args": [arg if isinstance(arg, (int, float, str)) else str(arg) for arg in args]},
+        size=len(json.dumps(result, default=str)) if exc is None and trace.path else None,
+        wait_seconds=wait_seconds,
+        error=str(exc) if exc is not None else None,
+    )
+
+
+class _GovernedClient:
+    """Client wrapper that sends GOVERNED_METHODS through a RequestGovernor."""
+
+    def __init__(self, client: Any, governor: RequestGovernor) -> None:
+        self._client = client
+        self._governor = governor
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in GOVERNED_METHODS or not callable(attr):
+            return attr
+
+        def _governed(*args: Any, **kwargs: Any) -> Any:
+            return self._governor.call(attr, *args, **kwargs)
+
+        return _governed
+
+
+def _write_activity(activity: Dict[str, Any]) -> bool:
+    return write_activity(RAW_DIR, activity)
+
+
+class GarminProvider(SyncProvider):
+    """Garmin lists activities by offset, newest first, in its own field names."""
+
+    name = "garmin"
+    raw_dir = RAW_DIR
+
+    def __init__(self, client: Any = None, per_page: int = 200) -> None:
+        self.client = client
+        self.per_page = per_page
+
+    def normalize(self, activity: Dict[str, Any]) -> Dict[str, Any]:
+        return _normalize_activity(activity)
+
+    def is_rate_limited(self, exc: Exception) -> bool:
+        return _is_rate_limited_error(exc)
+
+    def fetch_recent_page(
+        self, cursor: Optional[int], after: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        offset = cursor or 0
+        activities = _fetch_page(self.client, offset, self.per_page)
+        if len(activities) < self.per_page:
+            return activities, None
+        return activities, offset + len(activities)
 
 
 def _sync_recent(
     client: Any,
     per_page: int,
-    recent_days: int,
+    after: Optional[int],
     dry_run: bool,
-    enrich_stats: Optional[Dict[str, int]] = None,
+    prepare_activity: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
-    if recent_days <= 0:
-        return {
-            "fetched": 0,
-            "new_or_updated": 0,
-            "oldest_ts": None,
-            "newest_ts": None,
-            "rate_limited": False,
-            "rate_limit_message": "",
-            "activity_ids": [],
-        }
+    return sync_recent(GarminProvider(client, per_page), after, dry_run, prepare_activity)
 
-    after = int((utc_now() - timedelta(days=recent_days)).timestamp())
-    offset = 0
-    total = 0
-    new_or_updated = 0
-    oldest_ts = None
-    newest_ts = None
-    fetched_ids = set()
-    rate_limited = False
-    rate_limit_message = ""
 
-    while True:
-        try:
-            activities = _fetch_page(client, offset, per_page)
-        except Exception as exc:
-            if _is_rate_limited_error(exc):
-                rate_limited = True
-                rate_limit_message = str(exc)
-                break
-            raise
-        if not activities:
-            break
-
-        reached_boundary = False
-        for raw_activity in activities:
-            activity = _normalize_activity(raw_activity)
-            if not activity:
-                continue
-            activity = _enrich_missing_duration(client, activity, enrich_stats)
-            ts = _activity_start_ts(activity)
-            if ts is not None and ts < after:
-                reached_boundary = True
+def plan_garmin(probe: bool = False) -> Dict[str, Any]:
+    """Estimate the cost of the next sync without syncing (see sync_planner)."""
+    config = load_config()
+    sync_cfg = config.get("sync", {}) or {}
+    per_page = int(sync_cfg.get("per_page", 200))
+    after = _start_after_ts(config)
+    now_ts = int(utc_now().timestamp())
+
+    state = _load_state()
+    if state and (
+        _safe_int(state.get("after")) != after
+        or state.get("activity_scope") != _activity_scope(config)
+    ):
+        state = {"incremental": state.get("incremental")}
+    # Without a client we can't check for date-window support; current clients
+    # have it, so "auto" follows the last run's mode and otherwise assumes it.
+    mode = str((config.get("garmin", {}) or {}).get("backfill_mode", "auto") or "auto").strip().lower()
+    if mode not in {"windows", "offset"}:
+        mode = str(state.get("backfill_mode") or "windows")
+    pending: List[Dict[str, Any]] = []
+    next_offset = _safe_int(state.get("next_offset")) or 0
+    if not state.get("completed") and mode == "windows":
+        windows, _resumed = _windows_from_state(state, after, now_ts)
+        for window in windows:
+            if window["completed"]:
                 continue
-            total += 1
-            if ts is not None:
-                oldest_ts = ts if oldest_ts is None else min(oldest_ts, ts)
-                newest_ts = ts if newest_ts is None else max(newest_ts, ts)
-            fetched_ids.add(str(activity["id"]))
-            if not dry_run and _write_activity(activity):
-                new_or_updated += 1
-
-        if reached_boundary or len(activities) < per_page:
-            break
-        offset += len(activities)
+            start = datetime.strptime(window["start"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            end = datetime.strptime(window["end"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            pending.append(
+                {
+                    "label": window["label"],
+                    "after": int(start.timestamp()),
+                    "before": min(now_ts, int(end.timestamp()) + 86400),
+                    "window": window,
+                }
+            )
+    elif not state.get("completed"):
+        oldest = _safe_int(state.get("oldest_seen_ts")) if next_offset > 0 else None
+        pending.append({"label": "backfill", "after": after, "before": oldest or now_ts})
+
+    recent_plan = plan_recent_sync(config, state.get("incremental") or {}, now_ts)
+    recent_range = None
+    if recent_plan["after"] is not None:
+        recent_range = {"after": recent_plan["after"], "before": now_ts}
+
+    store = open_store(RAW_DIR, raw_store_backend(config))
+    timestamps = max(
+        list(store.start_times().values()),
+        normalized_start_times(os.path.join("data", "activities_normalized.json")),
+        key=len,
+    )
 
-    return {
-        "fetched": total,
-        "new_or_updated": new_or_updated,
-        "oldest_ts": oldest_ts,
-        "newest_ts": newest_ts,
-        "rate_limited": rate_limited,
-        "rate_limit_message": rate_limit_message,
-        "activity_ids": sorted(fetched_ids),
-    }
+    probe_result = None
+    if probe and pending:
+        client = _load_garmin_client(config)
+        if mode == "windows":
+            # A whole window is one query; the newest pending one is counted exactly.
+            raw = _fetch_window(client, pending[0]["window"])
+            probe_label = pending[0]["label"]
+            full = False
+        else:
+            raw = _fetch_page(client, next_offset, per_page)
+            probe_label = "backfill"
+            full = len(raw) >= per_page
+        activities = [_normalize_activity(item) for item in raw]
+        stamps = [ts for ts in (_activity_start_ts(item) for item in activities if item) if ts is not None]
+        probe_result = {
+            "label": probe_label,
+            "count": len(activities),
+            "full": full,
+            "oldest_ts": min(stamps) if stamps else None,
+            "newest_ts": max(stamps) if stamps else None,
+        }
+
+    # Garmin publishes no rate limits, so the ETA is latency-bound and leaves
+    # out per-activity duration lookups.
+    plan = build_plan(
+        "garmin",
+        pending,
+        recent_range,
+        DATE_WINDOW_PAGE_SIZE if mode == "windows" else per_page,
+        activities_per_day(timestamps, now_ts),
+        now_ts,
+        workers=max(1, int(sync_cfg.get("backfill_workers", 4))) if mode == "windows" else 1,
+        probe=probe_result,
+        recent_per_page=per_page,
+    )
+    plan["recent_mode"] = recent_plan["mode"]
+    plan["backfill_mode"] = mode
+    return plan
+
+
+def sync_garmin(
+    dry_run: bool, prune_deleted: bool, trace_path: Optional[str] = None
+) -> Dict[str, Any]:
+    return run_sync(
+        RAW_DIR,
+        lambda: _sync_garmin(dry_run, prune_deleted),
+        "garmin",
+        trace_path or request_trace_path(load_config()),
+    )
 
 
-def sync_garmin(dry_run: bool, prune_deleted: bool) -> Dict[str, Any]:
+def _sync_garmin(dry_run: bool, prune_deleted: bool) -> Dict[str, Any]:
     config = load_config()
     sync_cfg = config.get("sync", {}) or {}
     per_page = int(sync_cfg.get("per_page", 200))
     after = _start_after_ts(config)
     activity_scope = _activity_scope(config)
-    recent_days = int(sync_cfg.get("recent_days", 7))
     resume_backfill = bool(sync_cfg.get("resume_backfill", True))
 
     if not dry_run:
         _maybe_reset_for_new_account(config)
 
-    client = _load_garmin_client(config)
+    garmin_cfg = config.get("garmin", {}) or {}
+    governor = RequestGovernor(
+        max_retries=int(garmin_cfg.get("rate_limit_retries", 5)),
+        state_path=GOVERNOR_STATE_PATH if _to_bool(garmin_cfg.get("persist_rate", True)) else None,
+    )
+    client = _GovernedClient(_load_garmin_client(config), governor)
+    backfill_mode = _backfill_mode(config, client)
+    backfill_workers = max(1, int(sync_cfg.get("backfill_workers", 4)))
     ensure_dir(RAW_DIR)
-
-    enrich_stats: Dict[str, int] = {"duration_enriched": 0}
-    recent_summary = _sync_recent(client, per_page, recent_days, dry_run, enrich_stats)
-
-    total = 0
-    new_or_updated = 0
-    fetched_ids = set(recent_summary.get("activity_ids", []))
+    shared_store(RAW_DIR, raw_store_backend(config))
+
+    enricher = DurationEnricher(client, int(sync_cfg.get("enrichment_workers", 4)))
+    # Garmin publishes no request budget, so the scheduler only orders work:
+    # duration lookups run on the enricher's pool while pages are fetched, and
+    # their results are written once recent activities are in and before each
+    # backfill page's cursor is saved.
+    scheduler = WorkScheduler(budget_reserve_from_config(config))
+
+    def _prepare_activity(activity: Dict[str, Any]) -> Dict[str, Any]:
+        activity, needs_lookup = enricher.apply_cached(activity)
+        if needs_lookup:
+            lookup = enricher.submit(activity)
+
+            def _work() -> None:
+                enriched = lookup.result()
+                if enriched is not None and not dry_run:
+                    _write_activity(enriched)
+
+            scheduler.submit("enrichment", _work)
+        return activity
+
+    now_ts = int(utc_now().timestamp())
+    persisted_state = _load_state()
+    incremental_state = persisted_state.get("incremental") or {}
+    recent_plan = plan_recent_sync(config, incremental_state, now_ts)
+    recent_summary: Dict[str, Any] = {}
+    fetched_ids: set = set()
     min_ts = None
     max_ts = None
     exhausted = False
     skip_backfill = False
-    rate_limited = bool(recent_summary.get("rate_limited"))
-    rate_limit_message = str(recent_summary.get("rate_limit_message", ""))
+    rate_limited = False
+    rate_limit_message = ""
 
-    state = _load_state() if resume_backfill and not dry_run else {}
+    def _recent_work() -> None:
+        nonlocal recent_summary, incremental_state, rate_limited, rate_limit_message
+        recent_summary = _sync_recent(
+            client, per_page, recent_plan["after"], dry_run, _prepare_activity
+        )
+        recent_summary["mode"] = recent_plan["mode"]
+        incremental_state = advance_incremental_state(
+            incremental_state,
+            recent_plan,
+            recent_summary.get("newest_ts"),
+            now_ts,
+            completed=recent_plan["after"] is not None and not recent_summary.get("rate_limited"),
+        )
+        fetched_ids.update(recent_summary.get("activity_ids", []))
+        rate_limited = bool(recent_summary.get("rate_limited"))
+        rate_limit_message = str(recent_summary.get("rate_limit_message", ""))
+
+    state = persisted_state if resume_backfill and not dry_run else {}
     if state:
         state_after = _safe_int(state.get("after"))
         if state_after != after:
@@ -615,12 +1186,103 @@ def sync_garmin(dry_run: bool, prune_deleted: bool) -> Dict[str, Any]:
         elif state.get("completed"):
             skip_backfill = True
 
-    next_offset = _safe_int(state.get("next_offset")) if state else None
-    if next_offset is None:
-        next_offset = 0
+    windows: Optional[List[Dict[str, Any]]] = None
+    next_offset: Optional[int] = 0
+    if backfill_mode == "windows":
+        windows, used_resume_cursor = _windows_from_state(state, after, now_ts)
+        next_offset = None
+    else:
+        next_offset = (_safe_int(state.get("next_offset")) if state else None) or 0
+        used_resume_cursor = next_offset > 0
+    if used_resume_cursor:
+        min_ts = _safe_int(state.get("oldest_seen_ts"))
+        max_ts = _safe_int(state.get("newest_seen_ts"))
+
+    def _checkpoint(cursor: Optional[int]) -> None:
+        if not dry_run:
+            _save_state(
+                _backfill_state(
+                    after,
+                    cursor,
+                    False,
+                    min_ts,
+                    max_ts,
+                    False,
+                    activity_scope,
+                    incremental_state,
+                    windows,
+                )
+            )
 
-    if not rate_limited and not skip_backfill:
+    backfill = ActivityCommitter(GarminProvider(), after, dry_run, _prepare_activity)
+
+    def _store_backfilled(activities: List[Dict[str, Any]]) -> bool:
+        """Write one page or window; True once it reaches back past `after`."""
+        nonlocal min_ts, max_ts
+        page = backfill.commit(activities)
+        fetched_ids.update(backfill.activity_ids)
+        if page["oldest_ts"] is not None:
+            min_ts = page["oldest_ts"] if min_ts is None else min(min_ts, page["oldest_ts"])
+        if page["newest_ts"] is not None:
+            max_ts = page["newest_ts"] if max_ts is None else max(max_ts, page["newest_ts"])
+        return page["reached_boundary"]
+
+    def _backfill_windows_work() -> None:
+        nonlocal exhausted, rate_limited, rate_limit_message
+        if rate_limited or skip_backfill or windows is None:
+            return
+        failure: Optional[Exception] = None
+        queue = deque(window for window in windows if not window["completed"])
+        split_years = False
+        with ThreadPoolExecutor(max_workers=backfill_workers) as pool:
+            futures: Dict[Future, Dict[str, Any]] = {}
+
+            def _submit_next() -> None:
+                while queue and len(futures) < backfill_workers:
+                    window = queue.popleft()
+                    if split_years and window["label"].isdigit():
+                        months = _month_windows(window)
+                        index = windows.index(window)
+                        windows[index : index + 1] = months
+                        queue.extendleft(reversed(months[1:]))
+                        window = months[0]
+                    futures[pool.submit(_fetch_window, client, window)] = window
+
+            _submit_next()
+            while futures:
+                done, _running = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    window = futures.pop(future)
+                    try:
+                        activities = future.result()
+                    except Exception as exc:
+                        if _is_rate_limited_error(exc):
+                            rate_limited = True
+                            rate_limit_message = str(exc)
+                        elif failure is None:
+                            failure = exc
+                        # Let running windows finish but start no new ones.
+                        queue.clear()
+                        continue
+                    if len(activities) >= DATE_WINDOW_PAGE_SIZE:
+                        split_years = True
+                    _store_backfilled(activities)
+                    # A window only counts as done once its duration lookups are written.
+                    scheduler.yield_to("backfill")
+                    window["completed"] = True
+                    window["fetched"] = len(activities)
+                    _checkpoint(None)
+                _submit_next()
+        if failure is not None:
+            raise failure
+        exhausted = all(window["completed"] for window in windows)
+
+    def _backfill_offset_work() -> None:
+        nonlocal exhausted, next_offset, rate_limited, rate_limit_message
+        if rate_limited or skip_backfill or next_offset is None:
+            return
         offset = next_offset
+        unsaved_offset: Optional[int] = None
         while True:
             try:
                 activities = _fetch_page(client, offset, per_page)
@@ -630,50 +1292,53 @@ def sync_garmin(dry_run: bool, prune_deleted: bool) -> Dict[str, Any]:
                     rate_limit_message = str(exc)
                     break
                 raise
+            if unsaved_offset is not None:
+                # The previous page's duration lookups ran alongside this fetch;
+                # its cursor is saved once their results are written.
+                scheduler.yield_to("backfill")
+                _checkpoint(unsaved_offset)
+                unsaved_offset = None
             if not activities:
                 exhausted = True
                 break
 
-            reached_boundary = False
-            for raw_activity in activities:
-                activity = _normalize_activity(raw_activity)
-                if not activity:
-                    continue
-                activity = _enrich_missing_duration(client, activity, enrich_stats)
-                ts = _activity_start_ts(activity)
-                if ts is not None and ts < after:
-                    reached_boundary = True
-                    continue
-                total += 1
-                fetched_ids.add(str(activity["id"]))
-                if ts is not None:
-                    min_ts = ts if min_ts is None else min(min_ts, ts)
-                    max_ts = ts if max_ts is None else max(max_ts, ts)
-                if not dry_run and _write_activity(activity):
-                    new_or_updated += 1
-
+            reached_boundary = _store_backfilled(activities)
             offset += len(activities)
             next_offset = offset
             if reached_boundary or len(activities) < per_page:
                 exhausted = True
                 break
+            if scheduler.pending()["enrichment"]:
+                unsaved_offset = offset
+            else:
+                # Persist the cursor after every committed page so a killed run
+                # resumes with at most one page of re-fetching.
+                _checkpoint(offset)
+
+    scheduler.submit("recent", _recent_work)
+    if backfill_mode == "windows":
+        scheduler.submit("backfill", _backfill_windows_work)
+    else:
+        scheduler.submit("backfill", _backfill_offset_work)
+    try:
+        scheduler.run()
+    finally:
+        enricher.close()
+        if not dry_run:
+            enricher.save()
+            governor.save()
 
     can_prune_deleted = (
         prune_deleted
         and not dry_run
         and not skip_backfill
+        and not used_resume_cursor
         and exhausted
         and not rate_limited
     )
     deleted = 0
     if can_prune_deleted:
-        for filename in os.listdir(RAW_DIR):
-            if not filename.endswith(".json"):
-                continue
-            activity_id = filename[:-5]
-            if activity_id not in fetched_ids:
-                os.remove(os.path.join(RAW_DIR, filename))
-                deleted += 1
+        deleted = prune_unseen(RAW_DIR, fetched_ids)
     elif prune_deleted and not dry_run:
         print(
             "Skipping prune_deleted for Garmin: pruning requires a full backfill scan in this run."
@@ -684,40 +1349,47 @@ def sync_garmin(dry_run: bool, prune_deleted: bool) -> Dict[str, Any]:
         next_offset = None
 
     if not dry_run:
-        if skip_backfill and state:
-            state_update = dict(state)
-            state_update["completed"] = True
-            state_update["rate_limited"] = rate_limited
-            state_update["last_run_utc"] = utc_now().isoformat()
-        else:
-            state_update = {
-                "after": after,
-                "next_offset": next_offset,
-                "completed": completed,
-                "oldest_seen_ts": min_ts,
-                "newest_seen_ts": max_ts,
-                "rate_limited": rate_limited,
-                "last_run_utc": utc_now().isoformat(),
-            }
-        state_update["activity_scope"] = activity_scope
-        _save_state(state_update)
-
-    total_fetched = total + int(recent_summary.get("fetched", 0))
-    total_new_or_updated = new_or_updated + int(recent_summary.get("new_or_updated", 0))
-
-    summary: Dict[str, Any] = {
-        "source": "garmin",
-        "fetched": total_fetched,
-        "new_or_updated": total_new_or_updated,
-        "deleted": deleted,
-        "lookback_start_ts": after,
-        "timestamp_utc": utc_now().isoformat(),
-        "rate_limited": rate_limited,
-        "backfill_completed": completed,
-        "backfill_next_offset": next_offset,
-        "duration_enriched": int(enrich_stats.get("duration_enriched", 0)),
-        "recent_sync": recent_summary,
-    }
+        _save_state(
+            final_backfill_state(
+                state,
+                skip_backfill,
+                rate_limited,
+                lambda: _backfill_state(
+                    after,
+                    next_offset,
+                    completed,
+                    min_ts,
+                    max_ts,
+                    rate_limited,
+                    activity_scope,
+                    windows=windows,
+                ),
+                activity_scope,
+                incremental_state,
+            )
+        )
+
+    total_fetched = backfill.fetched + int(recent_summary.get("fetched", 0))
+    total_new_or_updated = backfill.new_or_updated + int(recent_summary.get("new_or_updated", 0))
+
+    summary = base_summary(
+        "garmin", total_fetched, total_new_or_updated, deleted, after, rate_limited, completed
+    )
+    summary.update(
+        {
+            "backfill_mode": backfill_mode,
+            "backfill_next_offset": next_offset,
+            "backfill_windows_pending": (
+                sum(1 for window in windows if not window["completed"])
+                if windows is not None
+                else None
+            ),
+            "recent_sync": recent_summary,
+            "scheduler": scheduler.stats(),
+            "governor": governor.stats(),
+            **enricher.stats,
+        }
+    )
     if rate_limited:
         summary["rate_limit_message"] = rate_limit_message
     return summary
@@ -731,12 +1403,31 @@ def main() -> int:
         action="store_true",
         help="Remove local raw activities not returned by Garmin",
     )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write one JSONL event per API request to PATH (overrides sync.request_trace)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate remaining pages and ETA without syncing",
+    )
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="With --plan, fetch one page at the backfill cursor to calibrate the estimate",
+    )
     args = parser.parse_args()
 
+    if args.plan:
+        print(json.dumps(plan_garmin(args.probe), indent=2))
+        return 0
+
     config = load_config()
     prune_deleted = args.prune_deleted or bool(config.get("sync", {}).get("prune_deleted", False))
 
-    summary = sync_garmin(args.dry_run, prune_deleted)
+    summary = sync_garmin(args.dry_run, prune_deleted, trace_path=args.trace)
 
     ensure_dir("data")
     if not args.dry_run:
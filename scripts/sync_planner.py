@@ -0,0 +1,224 @@
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils import read_json
+
+SECONDS_PER_DAY = 86400
+RATE_WINDOW_SECONDS = 900
+# Neither Strava (2009) nor Garmin Connect (2008) holds anything older, so
+# unbounded backfill ranges are costed from here rather than from 1970.
+EARLIEST_HISTORY_TS = int(datetime(2008, 1, 1, tzinfo=timezone.utc).timestamp())
+DEFAULT_ACTIVITIES_PER_DAY = 1.0
+DEFAULT_REQUEST_SECONDS = 1.0
+DENSITY_WINDOW_DAYS = 365
+
+
+def activities_per_day(timestamps: Iterable[Optional[int]], now_ts: int) -> Optional[float]:
+    values = sorted(int(ts) for ts in timestamps if ts is not None)
+    if not values:
+        return None
+    # Prefer the last year: it best reflects how often the athlete records now.
+    recent = [ts for ts in values if ts >= now_ts - DENSITY_WINDOW_DAYS * SECONDS_PER_DAY]
+    if len(recent) >= 2:
+        span = max(now_ts - recent[0], SECONDS_PER_DAY)
+        return len(recent) * SECONDS_PER_DAY / span
+    span = max(values[-1] - values[0], SECONDS_PER_DAY)
+    return len(values) * SECONDS_PER_DAY / span
+
+
+def pages_for(activities: int, per_page: int) -> int:
+    # A range ends on the first short (or empty) page.
+    return max(0, int(activities)) // max(1, int(per_page)) + 1
+
+
+def estimate_range(
+    after: int,
+    before: int,
+    density: Optional[float],
+    probe: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    start = max(int(after), EARLIEST_HISTORY_TS)
+    days = max(0, int(before) - start) / SECONDS_PER_DAY
+    if probe is not None:
+        if not probe.get("full"):
+            return {"activities": int(probe.get("count", 0)), "basis": "probe_exact"}
+        oldest, newest = probe.get("oldest_ts"), probe.get("newest_ts")
+        if oldest is not None and newest is not None:
+            span = max(int(newest) - int(oldest), SECONDS_PER_DAY)
+            probe_density = int(probe["count"]) * SECONDS_PER_DAY / span
+            return {
+                "activities": max(int(probe["count"]), int(round(probe_density * days))),
+                "basis": "probe_density",
+            }
+    if density is None:
+        return {"activities": int(round(DEFAULT_ACTIVITIES_PER_DAY * days)), "basis": "default"}
+    return {"activities": int(round(density * days)), "basis": "local_density"}
+
+
+def estimate_eta(
+    requests: int,
+    limits: Optional[Dict[str, int]],
+    usage: Optional[Dict[str, int]],
+    now_ts: int,
+    request_seconds: float = DEFAULT_REQUEST_SECONDS,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Walk `requests` through quarter-hour and UTC-day read budgets."""
+    per_request = max(0.0, float(request_seconds)) / max(1, int(workers))
+    remaining = max(0, int(requests))
+    if not limits:
+        seconds = remaining * per_request
+        return {
+            "eta_seconds": round(seconds),
+            "finishes_utc": _iso(now_ts + seconds),
+            "days_spanned": 1,
+            "fits_remaining_daily_budget": True,
+            "wait_seconds": 0,
+        }
+
+    buffer = int(limits.get("safety_buffer", 0))
+    cap_15 = max(1, int(limits["read_15"]) - buffer)
+    cap_day = max(1, int(limits["read_day"]) - buffer)
+    # Usage past the cap (a ledger from another run, or Strava's own count)
+    # means nothing is left, not a negative budget.
+    used_15 = min(cap_15, max(0, int((usage or {}).get("read_15", 0))))
+    used_day = min(cap_day, max(0, int((usage or {}).get("read_day", 0))))
+    fits_today = remaining <= cap_day - used_day
+    if used_day >= cap_day:
+        wait_seconds = (now_ts // SECONDS_PER_DAY + 1) * SECONDS_PER_DAY - now_ts
+    elif used_15 >= cap_15:
+        wait_seconds = (now_ts // RATE_WINDOW_SECONDS + 1) * RATE_WINDOW_SECONDS - now_ts
+    else:
+        wait_seconds = 0
+
+    t = float(now_ts)
+    day = int(t) // SECONDS_PER_DAY
+    days = 1
+    while remaining > 0:
+        if int(t) // SECONDS_PER_DAY != day:
+            day = int(t) // SECONDS_PER_DAY
+            used_day = 0
+            days += 1
+        if used_day >= cap_day:
+            # Daily budget spent: nothing more until UTC midnight.
+            t = float((day + 1) * SECONDS_PER_DAY)
+            used_15 = 0
+            continue
+        window_end = (int(t) // RATE_WINDOW_SECONDS + 1) * RATE_WINDOW_SECONDS
+        take = min(remaining, cap_15 - used_15, cap_day - used_day)
+        remaining -= take
+        used_15 += take
+        used_day += take
+        t += take * per_request
+        if remaining and used_15 >= cap_15:
+            t = max(t, float(window_end))
+            used_15 = 0
+    return {
+        "eta_seconds": round(t - now_ts),
+        "finishes_utc": _iso(t),
+        "days_spanned": days,
+        "fits_remaining_daily_budget": fits_today,
+        "wait_seconds": int(wait_seconds),
+    }
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat()
+
+
+def normalized_start_times(path: str) -> List[int]:
+    """Day-resolution start times from persisted normalized history.
+
+    In CI the raw store only holds what the current run fetched, while the
+    normalized file keeps the full history, so it is the better density source
+    there.
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        items = read_json(path) or []
+    except Exception:
+        return []
+    result = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get("date"):
+            continue
+        try:
+            day = datetime.strptime(str(item["date"]), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        result.append(int(day.timestamp()))
+    return result
+
+
+def build_plan(
+    source: str,
+    pending_ranges: List[Dict[str, Any]],
+    recent_range: Optional[Dict[str, Any]],
+    per_page: int,
+    density: Optional[float],
+    now_ts: int,
+    overhead_requests: int = 0,
+    limits: Optional[Dict[str, int]] = None,
+    usage: Optional[Dict[str, int]] = None,
+    workers: int = 1,
+    probe: Optional[Dict[str, Any]] = None,
+    recent_per_page: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Cost a sync run: pages per pending range, read requests and ETA.
+
+    `pending_ranges` are {label, after, before} spans still to backfill;
+    `probe`, when given, is one page fetched for the range with the same label.
+    `recent_per_page` prices the recent pass when it pages differently.
+    """
+    ranges = []
+    total_pages = 0
+    for item in pending_ranges:
+        range_probe = probe if probe and probe.get("label") == item["label"] else None
+        estimate = estimate_range(item["after"], item["before"], density, range_probe)
+        pages = pages_for(estimate["activities"], per_page)
+        total_pages += pages
+        ranges.append(
+            {
+                "label": item["label"],
+                "after": int(item["after"]),
+                "before": int(item["before"]),
+                "estimated_activities": estimate["activities"],
+                "estimated_pages": pages,
+                "basis": estimate["basis"],
+            }
+        )
+
+    recent_pages = 0
+    if recent_range is not None:
+        estimate = estimate_range(recent_range["after"], recent_range["before"], density)
+        recent_pages = pages_for(estimate["activities"], recent_per_page or per_page)
+
+    requests = total_pages + recent_pages + int(overhead_requests)
+    plan: Dict[str, Any] = {
+        "source": source,
+        "per_page": per_page,
+        "activities_per_day": round(density, 3) if density is not None else None,
+        "pending_ranges": ranges,
+        "backfill_pages": total_pages,
+        "recent_pages": recent_pages,
+        "overhead_requests": int(overhead_requests),
+        "read_requests": requests,
+        "probe_used": probe is not None,
+    }
+    if limits:
+        buffer = int(limits.get("safety_buffer", 0))
+        used_15 = int((usage or {}).get("read_15", 0))
+        used_day = int((usage or {}).get("read_day", 0))
+        plan["read_budget"] = {
+            "limit_15_min": int(limits["read_15"]),
+            "limit_daily": int(limits["read_day"]),
+            "used_15_min": used_15,
+            "used_daily": used_day,
+            "remaining_15_min": max(0, int(limits["read_15"]) - buffer - used_15),
+            "remaining_daily": max(0, int(limits["read_day"]) - buffer - used_day),
+            "daily_share": round(requests / max(1, int(limits["read_day"]) - buffer), 3),
+        }
+    plan.update(estimate_eta(requests, limits, usage, now_ts, workers=workers))
+    return plan
@@ -0,0 +1,99 @@
+import heapq
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Lower runs first. A run that is cut short should only ever leave the later
+# kinds undone: fresh activities, then missing fields on fetched ones, then
+# history, then checking history for deletions.
+WORK_PRIORITIES = {"recent": 0, "enrichment": 1, "backfill": 2, "reconcile": 3}
+# Share of each request budget (15-minute window and day) a kind must leave
+# untouched, so history and reconciliation can't starve later runs' recent syncs.
+DEFAULT_BUDGET_RESERVE = {"recent": 0.0, "enrichment": 0.0, "backfill": 0.1, "reconcile": 0.25}
+MAX_BUDGET_RESERVE = 0.9
+
+
+def budget_reserve_from_config(config: Dict[str, Any]) -> Dict[str, float]:
+    configured = (config.get("sync", {}) or {}).get("budget_reserve") or {}
+    if not isinstance(configured, dict):
+        raise ValueError("sync.budget_reserve must be a mapping of work kind to fraction.")
+    reserve = dict(DEFAULT_BUDGET_RESERVE)
+    for kind, value in configured.items():
+        if kind not in WORK_PRIORITIES:
+            raise ValueError(
+                f"Unsupported sync.budget_reserve kind '{kind}' "
+                f"(expected one of: {', '.join(WORK_PRIORITIES)})."
+            )
+        try:
+            fraction = float(value)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"sync.budget_reserve.{kind} must be a number.") from exc
+        reserve[kind] = min(MAX_BUDGET_RESERVE, max(0.0, fraction))
+    return reserve
+
+
+class WorkScheduler:
+    """Run queued sync work in priority order.
+
+    Work may queue more work while it runs. Long-running work should call
+    `yield_to` between requests so higher-priority work it queued (e.g.
+    enrichment for the page just fetched) runs first. `set_reserve`, when
+    given, is told the budget share to hold back before each item runs.
+    """
+
+    def __init__(
+        self,
+        reserve: Optional[Dict[str, float]] = None,
+        set_reserve: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.reserve = dict(DEFAULT_BUDGET_RESERVE if reserve is None else reserve)
+        self._set_reserve = set_reserve
+        self._queue: List[Tuple[int, int, str, str, Callable[[], Any]]] = []
+        self._seq = itertools.count()
+        self._running: List[str] = []
+        self.results: Dict[str, Any] = {}
+        self.completed: Dict[str, int] = {kind: 0 for kind in WORK_PRIORITIES}
+
+    def submit(self, kind: str, work: Callable[[], Any], label: str = "") -> None:
+        if kind not in WORK_PRIORITIES:
+            raise ValueError(f"Unknown work kind '{kind}'.")
+        heapq.heappush(self._queue, (WORK_PRIORITIES[kind], next(self._seq), kind, label, work))
+
+    def pending(self) -> Dict[str, int]:
+        counts = {kind: 0 for kind in WORK_PRIORITIES}
+        for _priority, _seq, kind, _label, _work in self._queue:
+            counts[kind] += 1
+        return counts
+
+    def _apply_reserve(self, kind: str) -> None:
+        if self._set_reserve is not None:
+            self._set_reserve(float(self.reserve.get(kind, 0.0)))
+
+    def _run_next(self) -> None:
+        _priority, _seq, kind, label, work = heapq.heappop(self._queue)
+        self._running.append(kind)
+        self._apply_reserve(kind)
+        try:
+            result = work()
+        finally:
+            self._running.pop()
+            if self._running:
+                self._apply_reserve(self._running[-1])
+        self.completed[kind] += 1
+        if label:
+            self.results[label] = result
+
+    def yield_to(self, kind: str) -> None:
+        """Run queued work that outranks `kind` before continuing with it."""
+        while self._queue and self._queue[0][0] < WORK_PRIORITIES[kind]:
+            self._run_next()
+
+    def run(self) -> Dict[str, Any]:
+        while self._queue:
+            self._run_next()
+        return self.results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "completed": {kind: count for kind, count in self.completed.items() if count},
+            "budget_reserve": {kind: share for kind, share in self.reserve.items() if share},
+        }
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from activity_types import featured_types_from_config
+from activity_types import TypeResolver
 
 
 def lookback_after_ts(years: int) -> int:
@@ -27,30 +27,22 @@ def start_after_ts(config: Dict[str, Any]) -> int:
 
 
 def activity_scope_from_config(config: Dict[str, Any]) -> Dict[str, Any]:
-    activities_cfg = config.get("activities", {}) or {}
-    include_all_types = bool(activities_cfg.get("include_all_types", True))
-    exclude_types = sorted({str(item) for item in (activities_cfg.get("exclude_types", []) or [])})
+    resolver = TypeResolver.from_config(config.get("activities", {}) or {})
     scope: Dict[str, Any] = {
-        "include_all_types": include_all_types,
-        "exclude_types": exclude_types,
+        "include_all_types": resolver.include_all_types,
+        "exclude_types": sorted(resolver.exclude_types),
     }
-    if include_all_types:
+    if resolver.include_all_types:
         return scope
 
-    featured_types = sorted({str(item) for item in featured_types_from_config(activities_cfg)})
-    type_aliases = {
-        str(source): str(target)
-        for source, target in (activities_cfg.get("type_aliases", {}) or {}).items()
-    }
-    group_aliases = {
-        str(source): str(target)
-        for source, target in (activities_cfg.get("group_aliases", {}) or {}).items()
-    }
+    featured_types = sorted(resolver.featured_set)
+    type_aliases = {str(source): str(target) for source, target in resolver.type_aliases.items()}
+    group_aliases = {str(source): str(target) for source, target in resolver.group_aliases.items()}
     scope.update(
         {
             "featured_types": featured_types,
-            "group_other_types": bool(activities_cfg.get("group_other_types", True)),
-            "other_bucket": str(activities_cfg.get("other_bucket", "OtherSports")),
+            "group_other_types": resolver.group_other_types,
+            "other_bucket": resolver.other_bucket,
             "type_aliases": dict(sorted(type_aliases.items())),
             "group_aliases": dict(sorted(group_aliases.items())),
         }
@@ -69,3 +61,109 @@ def activity_start_ts(activity: Dict[str, Any]) -> Optional[int]:
         return int(datetime.fromisoformat(value_str).timestamp())
     except ValueError:
         return None
+
+
+DEFAULT_RECONCILE_WINDOWS = [
+    {"days": 7, "every_hours": 24},
+    {"days": 90, "every_hours": 168},
+]
+# Share of a reconcile interval a run may start early and still count as due.
+RECONCILE_SLACK_FRACTION = 0.1
+
+
+def reconcile_windows_from_config(config: Dict[str, Any]) -> List[Dict[str, int]]:
+    sync_cfg = config.get("sync", {}) or {}
+    raw_windows = sync_cfg.get("reconcile_windows")
+    if raw_windows is None:
+        raw_windows = DEFAULT_RECONCILE_WINDOWS
+    windows = []
+    for item in raw_windows or []:
+        if not isinstance(item, dict):
+            continue
+        days = int(item.get("days", 0) or 0)
+        every_hours = int(item.get("every_hours", 0) or 0)
+        if days > 0 and every_hours > 0:
+            windows.append({"days": days, "every_hours": every_hours})
+    return sorted(windows, key=lambda window: window["days"])
+
+
+def _window_label(days: int) -> str:
+    return f"{days}d"
+
+
+def plan_recent_sync(
+    config: Dict[str, Any], incremental_state: Dict[str, Any], now_ts: int
+) -> Dict[str, Any]:
+    """Pick the lower bound for the recent-activity pass.
+
+    Without a watermark (or with incremental sync off) this is the plain
+    recent_days window. Otherwise the widest reconcile window that is due
+    wins; if none is due, only activities after the watermark are fetched.
+    """
+    sync_cfg = config.get("sync", {}) or {}
+    recent_days = int(sync_cfg.get("recent_days", 7))
+    watermark = incremental_state.get("watermark_ts")
+    if not bool(sync_cfg.get("incremental", False)) or watermark is None:
+        if recent_days <= 0:
+            return {"mode": "disabled", "after": None, "reconciled": []}
+        covered = [
+            _window_label(window["days"])
+            for window in reconcile_windows_from_config(config)
+            if window["days"] <= recent_days
+        ]
+        return {
+            "mode": "window",
+            "after": now_ts - recent_days * 86400,
+            "reconciled": covered,
+        }
+
+    reconciled_at = incremental_state.get("reconciled_ts") or {}
+    windows = reconcile_windows_from_config(config)
+    # Scheduled runs do not start at the same second each day (and the
+    # recorded time is when the last pass ended), so a window is due a little
+    # before its interval is up rather than slipping a whole run.
+    due = [
+        window
+        for window in windows
+        if now_ts - int(reconciled_at.get(_window_label(window["days"]), 0) or 0)
+        >= window["every_hours"] * 3600 * (1 - RECONCILE_SLACK_FRACTION)
+    ]
+    if due:
+        widest = due[-1]["days"]
+        # The widest due window also covers every narrower one.
+        covered = [_window_label(window["days"]) for window in windows if window["days"] <= widest]
+        return {
+            "mode": "reconcile",
+            "after": now_ts - widest * 86400,
+            "reconciled": covered,
+        }
+    # Strava's `after` is exclusive; step back one second so an activity that
+    # shares the watermark start time is not skipped.
+    return {"mode": "incremental", "after": int(watermark) - 1, "reconciled": []}
+
+
+def advance_incremental_state(
+    incremental_state: Dict[str, Any],
+    plan: Dict[str, Any],
+    newest_ts: Optional[int],
+    now_ts: int,
+    completed: bool,
+) -> Dict[str, Any]:
+    updated = {
+        "watermark_ts": incremental_state.get("watermark_ts"),
+        "reconciled_ts": dict(incremental_state.get("reconciled_ts") or {}),
+    }
+    # A partial pass may have stopped before reaching the newest activities
+    # (or, for newest-first providers, before the older ones), so neither the
+    # watermark nor the reconcile clocks move unless the pass finished.
+    if not completed:
+        return updated
+    current = updated["watermark_ts"]
+    if newest_ts is not None:
+        updated["watermark_ts"] = newest_ts if current is None else max(int(current), int(newest_ts))
+    elif current is None and plan.get("after") is not None:
+        # Nothing in the window, but everything after its start has been seen.
+        updated["watermark_ts"] = int(plan["after"])
+    for label in plan.get("reconciled", []):
+        updated["reconciled_ts"][label] = now_ts
+    return updated
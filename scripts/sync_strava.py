@@ -3,37 +3,84 @@ import hashlib
 import hmac
 import json
 import os
-import shutil
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
+from http_transport import HttpTransport, default_transport, transport_from_args
+from sync_planner import (
+    EARLIEST_HISTORY_TS,
+    activities_per_day,
+    build_plan,
+    normalized_start_times,
+)
 from sync_scope import (
     activity_scope_from_config,
     activity_start_ts,
+    advance_incremental_state,
+    plan_recent_sync,
     start_after_ts,
 )
-from utils import ensure_dir, load_config, raw_activity_dir, read_json, utc_now, write_json
+from raw_store import close_store, discard_store, open_store, raw_store_backend, shared_store
+from strava_events import activity_actions, read_events
+from sync_engine import (
+    ActivityCommitter,
+    SyncProvider,
+    base_summary,
+    final_backfill_state,
+    prune_unseen,
+    run_sync,
+    sync_recent,
+    write_activity,
+)
+from sync_scheduler import WorkScheduler, budget_reserve_from_config
+from sync_telemetry import active_trace, endpoint_label, request_trace_path, response_size
+from utils import ensure_dir, load_config, raw_activity_dir, read_json, use_data_root, utc_now, write_json
 
 TOKEN_CACHE = ".strava_token.json"
+# Rejected access token -> the one refreshed in its place this process.
+_REFRESHED_TOKENS: Dict[str, str] = {}
+_TOKEN_REFRESH_LOCK = threading.Lock()
 RAW_DIR = raw_activity_dir("strava")
 SUMMARY_JSON = os.path.join("data", "last_sync_summary.json")
 SUMMARY_TXT = os.path.join("data", "last_sync_summary.txt")
 STATE_PATH = os.path.join("data", "backfill_state_strava.json")
 LEGACY_STATE_PATH = os.path.join("data", "backfill_state.json")
 ATHLETE_PATH = os.path.join("data", "athletes_strava.json")
+RATE_LEDGER_PATH = os.path.join("data", "rate_limit_ledger_strava.json")
+# The ledger is rewritten after this many unsaved updates or seconds.
+LEDGER_FLUSH_REQUESTS = 10
+LEDGER_FLUSH_SECONDS = 30.0
+PRUNE_RECONCILE_PATH = os.path.join("data", "prune_reconcile_strava.json")
+EVENT_CURSOR_PATH = os.path.join("data", "strava_event_cursor.json")
 LEGACY_ATHLETE_PATH = os.path.join("data", "athletes.json")
 TRANSIENT_HTTP_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504, 597}
 MAX_REQUEST_ATTEMPTS = 5
+RATE_WINDOW_SECONDS = 900
+PACING_MODES = {"fixed", "adaptive"}
 
 
 class RateLimitExceeded(RuntimeError):
     pass
 
 
+class BudgetReserved(RateLimitExceeded):
+    """The rest of the budget is held back for higher-priority sync work."""
+
+
+def _retry_after_seconds(headers: Any, attempt: int) -> int:
+    retry_after = headers.get("Retry-After") if headers is not None else None
+    if retry_after and retry_after.isdigit():
+        return max(1, int(retry_after))
+    return min(30, 2 ** (attempt - 1))
+
+
 def _request_json_with_retry(
     method: str,
     url: str,
@@ -41,24 +88,39 @@ def _request_json_with_retry(
     limiter: Optional["RateLimiter"],
     request_kind: str,
     timeout: int = 30,
+    transport: Optional[HttpTransport] = None,
     **kwargs,
 ) -> Any:
+    client = transport or default_transport()
+    trace = active_trace()
     last_exc: Optional[Exception] = None
     for attempt in range(1, MAX_REQUEST_ATTEMPTS + 1):
+        wait_seconds = 0.0
         if limiter:
+            wait_started = time.time()
             limiter.before_request(request_kind)
+            wait_seconds = time.time() - wait_started
+        started = time.time()
+        latency = 0.0
+        resp: Any = None
+        error: Optional[str] = None
+        sleep_seconds = 0
         try:
-            resp = requests.request(method, url, timeout=timeout, **kwargs)
+            try:
+                resp = client.request(method, url, timeout=timeout, **kwargs)
+            except BaseException:
+                # No response means no usage to record, whatever failed.
+                if limiter:
+                    limiter.release_request(request_kind)
+                raise
+            finally:
+                latency = time.time() - started
             if limiter:
                 limiter.record_request(request_kind)
                 limiter.apply_headers(resp.headers)
 
             if resp.status_code in TRANSIENT_HTTP_STATUS_CODES and attempt < MAX_REQUEST_ATTEMPTS:
-                retry_after = resp.headers.get("Retry-After")
-                if retry_after and retry_after.isdigit():
-                    sleep_seconds = max(1, int(retry_after))
-                else:
-                    sleep_seconds = min(30, 2 ** (attempt - 1))
+                sleep_seconds = _retry_after_seconds(resp.headers, attempt)
                 print(
                     f"Transient Strava API error ({resp.status_code}) on {url}; "
                     f"retrying in {sleep_seconds}s (attempt {attempt}/{MAX_REQUEST_ATTEMPTS})."
@@ -69,6 +131,7 @@ def _request_json_with_retry(
             resp.raise_for_status()
             return resp.json()
         except requests.HTTPError as exc:
+            error = str(exc)
             status_code = None
             if exc.response is not None:
                 status_code = exc.response.status_code
@@ -78,19 +141,17 @@ def _request_json_with_retry(
             last_exc = exc
             if attempt >= MAX_REQUEST_ATTEMPTS:
                 break
-            retry_after = None
-            if exc.response is not None and exc.response.headers is not None:
-                retry_after = exc.response.headers.get("Retry-After")
-            if retry_after and retry_after.isdigit():
-                sleep_seconds = max(1, int(retry_after))
-            else:
-                sleep_seconds = min(30, 2 ** (attempt - 1))
+            response = exc.response
+            sleep_seconds = _retry_after_seconds(
+                response.headers if response is not None else None, attempt
+            )
             print(
                 f"Transient HTTP error on {url}: {exc}; "
                 f"retrying in {sleep_seconds}s (attempt {attempt}/{MAX_REQUEST_ATTEMPTS})."
             )
             time.sleep(sleep_seconds)
         except requests.RequestException as exc:
+            error = str(exc)
             last_exc = exc
             if attempt >= MAX_REQUEST_ATTEMPTS:
                 break
@@ -100,6 +161,21 @@ def _request_json_with_retry(
                 f"retrying in {sleep_seconds}s (attempt {attempt}/{MAX_REQUEST_ATTEMPTS})."
             )
             time.sleep(sleep_seconds)
+        finally:
+            if trace is not None:
+                trace.record(
+                    endpoint_label(method, url),
+                    started=started,
+                    latency_seconds=latency,
+                    status=resp.status_code if resp is not None else None,
+                    attempt=attempt,
+                    params=kwargs.get("params"),
+                    size=response_size(resp) if resp is not None else None,
+                    wait_seconds=wait_seconds,
+                    retry_sleep_seconds=sleep_seconds,
+                    budget_remaining=limiter.budget_remaining(request_kind) if limiter else None,
+                    error=error,
+                )
 
     if last_exc:
         raise last_exc
@@ -112,6 +188,16 @@ def _http_error_status(exc: Exception) -> Optional[int]:
     return None
 
 
+def _rate_window_start(now: float) -> float:
+    return now - (now % RATE_WINDOW_SECONDS)
+
+
+def _seconds_until_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return (midnight - now).total_seconds()
+
+
 class RateLimiter:
     def __init__(
         self,
@@ -121,6 +207,9 @@ class RateLimiter:
         read_day_limit: int,
         safety_buffer: int,
         min_interval_seconds: float,
+        pacing: str = "fixed",
+        ledger_path: Optional[str] = None,
+        ledger_read_only: bool = False,
     ) -> None:
         self.overall_15_limit = overall_15_limit
         self.overall_day_limit = overall_day_limit
@@ -128,8 +217,11 @@ class RateLimiter:
         self.read_day_limit = read_day_limit
         self.safety_buffer = max(0, safety_buffer)
         self.min_interval_seconds = max(0.0, min_interval_seconds)
+        pacing_mode = str(pacing or "").strip().lower()
+        self.pacing = pacing_mode if pacing_mode in PACING_MODES else "fixed"
 
-        self.window_start = time.time()
+        # Strava's 15-minute windows reset on the quarter hour, not per process.
+        self.window_start = _rate_window_start(time.time())
         self.day_start = datetime.now(timezone.utc).date()
 
         self.overall_15 = 0
@@ -138,10 +230,130 @@ class RateLimiter:
         self.read_day = 0
         self.last_request_at = 0.0
 
+        # Requests that passed before_request but have not been recorded yet.
+        # Counting them keeps concurrent workers from overshooting the budget.
+        self.in_flight_overall = 0
+        self.in_flight_read = 0
+        self._lock = threading.Lock()
+
+        self.requests_made = 0
+        self.throttled_seconds = 0.0
+        self.window_waits = 0
+
+        # Share of every budget the current kind of work must leave unspent
+        # (see sync_scheduler); 0 lets it use everything up to the buffer.
+        self.reserve = 0.0
+
+        # Counters restored from a previous run are estimates until the first
+        # response headers report Strava's actual usage.
+        self.ledger_path = ledger_path
+        # Restore counters without ever writing them back (e.g. --plan).
+        self.ledger_read_only = ledger_read_only
+        self.ledger_restored = False
+        self._needs_reconcile = False
+        # The ledger is written every few requests and at the end of the run
+        # (flush_ledger), outside the counter lock, so workers never queue up
+        # behind disk writes.
+        self._ledger_lock = threading.Lock()
+        self._ledger_unsaved = 0
+        self._ledger_saved_at = time.time()
+        self._ledger_seq = 0
+        self._ledger_written_seq = 0
+        if ledger_path:
+            self._load_ledger()
+
+    def _load_ledger(self) -> None:
+        if not self.ledger_path or not os.path.exists(self.ledger_path):
+            return
+        try:
+            payload = read_json(self.ledger_path)
+        except Exception:
+            return
+        if not isinstance(payload, dict):
+            return
+
+        limits = payload.get("limits")
+        if isinstance(limits, dict):
+            for key in ("overall_15_limit", "overall_day_limit", "read_15_limit", "read_day_limit"):
+                try:
+                    value = int(limits[key])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if value > 0:
+                    setattr(self, key, value)
+
+        def _count(key: str) -> int:
+            try:
+                return max(0, int(payload.get(key) or 0))
+            except (TypeError, ValueError):
+                return 0
+
+        try:
+            window_start = float(payload.get("window_start"))
+        except (TypeError, ValueError):
+            window_start = None
+        if window_start is not None and abs(window_start - self.window_start) < 1:
+            self.overall_15 = _count("overall_15")
+            self.read_15 = _count("read_15")
+            self.ledger_restored = True
+        if payload.get("day") == self.day_start.isoformat():
+            self.overall_day = _count("overall_day")
+            self.read_day = _count("read_day")
+            self.ledger_restored = True
+        self._needs_reconcile = self.ledger_restored
+
+    def _ledger_payload(self) -> Dict[str, Any]:
+        return {
+            "window_start": self.window_start,
+            "day": self.day_start.isoformat(),
+            "overall_15": self.overall_15,
+            "read_15": self.read_15,
+            "overall_day": self.overall_day,
+            "read_day": self.read_day,
+            "limits": {
+                "overall_15_limit": self.overall_15_limit,
+                "overall_day_limit": self.overall_day_limit,
+                "read_15_limit": self.read_15_limit,
+                "read_day_limit": self.read_day_limit,
+            },
+            "updated_utc": utc_now().isoformat(),
+            "version": 1,
+        }
+
+    def _mark_ledger_dirty(self) -> bool:
+        """Note unsaved usage (lock held); True when a flush is due."""
+        if not self.ledger_path or self.ledger_read_only:
+            return False
+        self._ledger_unsaved += 1
+        return (
+            self._ledger_unsaved >= LEDGER_FLUSH_REQUESTS
+            or time.time() - self._ledger_saved_at >= LEDGER_FLUSH_SECONDS
+        )
+
+    def flush_ledger(self) -> None:
+        with self._lock:
+            if not self.ledger_path or not self._ledger_unsaved:
+                return
+            payload = self._ledger_payload()
+            self._ledger_unsaved = 0
+            self._ledger_saved_at = time.time()
+            self._ledger_seq += 1
+            seq = self._ledger_seq
+        with self._ledger_lock:
+            if seq < self._ledger_written_seq:
+                # A newer snapshot already reached disk.
+                return
+            try:
+                ensure_dir(os.path.dirname(self.ledger_path) or ".")
+                write_json(self.ledger_path, payload)
+            except OSError as exc:
+                print(f"Warning: unable to persist rate limit ledger ({exc})")
+            self._ledger_written_seq = seq
+
     def _reset_if_needed(self) -> None:
         now = time.time()
-        if now - self.window_start >= 900:
-            self.window_start = now
+        if now - self.window_start >= RATE_WINDOW_SECONDS:
+            self.window_start = _rate_window_start(now)
             self.overall_15 = 0
             self.read_15 = 0
 
@@ -151,42 +363,143 @@ class RateLimiter:
             self.overall_day = 0
             self.read_day = 0
 
-    def _sleep_until_window_reset(self) -> None:
-        now = time.time()
-        remaining = 900 - (now - self.window_start)
-        if remaining > 0:
-            time.sleep(remaining)
-        self._reset_if_needed()
+    def set_reserve(self, fraction: float) -> None:
+        with self._lock:
+            self.reserve = min(1.0, max(0.0, float(fraction)))
 
-    def before_request(self, kind: str) -> None:
-        self._reset_if_needed()
+    def _usable(self, limit: int) -> int:
+        return limit - self.safety_buffer - int(limit * self.reserve)
+
+    def budget_remaining(self, kind: str) -> Dict[str, int]:
+        """Requests of `kind` still usable in the 15-minute window and today."""
+        with self._lock:
+            window = self._usable(self.overall_15_limit) - self.overall_15
+            day = self._usable(self.overall_day_limit) - self.overall_day
+            if kind == "read":
+                window = min(window, self._usable(self.read_15_limit) - self.read_15)
+                day = min(day, self._usable(self.read_day_limit) - self.read_day)
+        return {"15_min": max(0, window), "daily": max(0, day)}
 
-        if self.min_interval_seconds > 0 and self.last_request_at:
+    def _window_wait_seconds(self) -> float:
+        return max(0.0, RATE_WINDOW_SECONDS - (time.time() - self.window_start))
+
+    def _window_exhausted(self, kind: str) -> bool:
+        if self.overall_15 + self.in_flight_overall >= self._usable(self.overall_15_limit):
+            return True
+        return kind == "read" and self.read_15 + self.in_flight_read >= self._usable(self.read_15_limit)
+
+    def _spread_interval(self, used: int, limit: int, seconds_left: float) -> float:
+        usable = self._usable(limit)
+        remaining = usable - used
+        if usable <= 0 or remaining <= 0:
+            return seconds_left
+        # Spread the remaining budget evenly over the time left, weighted by how
+        # much of it is already spent: ~0 with plenty of headroom (burst), the
+        # full even spacing as usage approaches the safety buffer.
+        pressure = min(1.0, max(0.0, used / usable))
+        return (seconds_left / remaining) * pressure * pressure
+
+    def _adaptive_interval(self, kind: str) -> float:
+        window_left = self._window_wait_seconds()
+        day_left = max(0.0, _seconds_until_utc_midnight())
+        budgets = [
+            (self.overall_15 + self.in_flight_overall, self.overall_15_limit, window_left),
+            (self.overall_day + self.in_flight_overall, self.overall_day_limit, day_left),
+        ]
+        if kind == "read":
+            budgets.extend(
+                [
+                    (self.read_15 + self.in_flight_read, self.read_15_limit, window_left),
+                    (self.read_day + self.in_flight_read, self.read_day_limit, day_left),
+                ]
+            )
+        return max(self._spread_interval(used, limit, left) for used, limit, left in budgets)
+
+    def _wait_seconds(self, kind: str) -> Tuple[float, bool]:
+        if self._window_exhausted(kind):
+            return max(1.0, self._window_wait_seconds()), True
+
+        if self.pacing == "adaptive":
+            interval = self._adaptive_interval(kind)
+        else:
+            interval = self.min_interval_seconds
+        if interval > 0 and self.last_request_at:
             elapsed = time.time() - self.last_request_at
-            if elapsed < self.min_interval_seconds:
-                time.sleep(self.min_interval_seconds - elapsed)
-                self._reset_if_needed()
+            if elapsed < interval:
+                return interval - elapsed, False
+        return 0.0, False
 
-        if self.overall_15 >= self.overall_15_limit - self.safety_buffer:
-            self._sleep_until_window_reset()
+    def before_request(self, kind: str) -> None:
+        while True:
+            with self._lock:
+                self._reset_if_needed()
 
-        if kind == "read" and self.read_15 >= self.read_15_limit - self.safety_buffer:
-            self._sleep_until_window_reset()
+                if self.overall_day + self.in_flight_overall >= self.overall_day_limit - self.safety_buffer:
+                    raise RateLimitExceeded("Overall daily limit reached; try again after UTC midnight.")
 
-        if self.overall_day >= self.overall_day_limit - self.safety_buffer:
-            raise RateLimitExceeded("Overall daily limit reached; try again after UTC midnight.")
+                if (
+                    kind == "read"
+                    and self.read_day + self.in_flight_read >= self.read_day_limit - self.safety_buffer
+                ):
+                    raise RateLimitExceeded("Read daily limit reached; try again after UTC midnight.")
 
-        if kind == "read" and self.read_day >= self.read_day_limit - self.safety_buffer:
-            raise RateLimitExceeded("Read daily limit reached; try again after UTC midnight.")
+                reserved = self.overall_day + self.in_flight_overall >= self._usable(
+                    self.overall_day_limit
+                ) or (
+                    kind == "read"
+                    and self.read_day + self.in_flight_read >= self._usable(self.read_day_limit)
+                )
+                if reserved:
+                    raise BudgetReserved(
+                        f"The last {self.reserve:.0%} of today's budget is reserved for "
+                        "higher-priority sync work."
+                    )
+
+                wait_seconds, window_wait = self._wait_seconds(kind)
+                if wait_seconds <= 0:
+                    self.in_flight_overall += 1
+                    if kind == "read":
+                        self.in_flight_read += 1
+                    self.last_request_at = time.time()
+                    return
+                self.throttled_seconds += wait_seconds
+                if window_wait:
+                    self.window_waits += 1
+            # Sleep outside the lock so in-flight requests can still record usage.
+            time.sleep(wait_seconds)
+
+    def release_request(self, kind: str) -> None:
+        with self._lock:
+            self.in_flight_overall = max(0, self.in_flight_overall - 1)
+            if kind == "read":
+                self.in_flight_read = max(0, self.in_flight_read - 1)
 
     def record_request(self, kind: str) -> None:
-        self._reset_if_needed()
-        self.overall_15 += 1
-        self.overall_day += 1
-        if kind == "read":
-            self.read_15 += 1
-            self.read_day += 1
-        self.last_request_at = time.time()
+        with self._lock:
+            self._reset_if_needed()
+            self.in_flight_overall = max(0, self.in_flight_overall - 1)
+            self.requests_made += 1
+            self.overall_15 += 1
+            self.overall_day += 1
+            if kind == "read":
+                self.in_flight_read = max(0, self.in_flight_read - 1)
+                self.read_15 += 1
+                self.read_day += 1
+            flush = self._mark_ledger_dirty()
+        if flush:
+            self.flush_ledger()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pacing": self.pacing,
+                "ledger_restored": self.ledger_restored,
+                "requests": self.requests_made,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "window_waits": self.window_waits,
+                "usage_15_min": {"overall": self.overall_15, "read": self.read_15},
+                "usage_daily": {"overall": self.overall_day, "read": self.read_day},
+            }
 
     def apply_headers(self, headers: Dict[str, str]) -> None:
         def _parse_pair(value: Optional[str]) -> Optional[Tuple[int, int]]:
@@ -202,23 +515,38 @@ class RateLimiter:
 
         overall_limit = _parse_pair(headers.get("X-RateLimit-Limit"))
         overall_usage = _parse_pair(headers.get("X-RateLimit-Usage"))
-        if overall_limit and overall_usage:
-            limit_15, limit_day = overall_limit
-            usage_15, usage_day = overall_usage
-            self.overall_15_limit = limit_15
-            self.overall_day_limit = limit_day
-            self.overall_15 = max(self.overall_15, usage_15)
-            self.overall_day = max(self.overall_day, usage_day)
-
         read_limit = _parse_pair(headers.get("X-ReadRateLimit-Limit"))
         read_usage = _parse_pair(headers.get("X-ReadRateLimit-Usage"))
-        if read_limit and read_usage:
-            limit_15, limit_day = read_limit
-            usage_15, usage_day = read_usage
-            self.read_15_limit = limit_15
-            self.read_day_limit = limit_day
-            self.read_15 = max(self.read_15, usage_15)
-            self.read_day = max(self.read_day, usage_day)
+
+        flush = False
+        with self._lock:
+            # The first headers after restoring a ledger are authoritative:
+            # they replace the carried-over estimate instead of only raising it.
+            reconcile = self._needs_reconcile and bool(overall_usage or read_usage)
+            merge = (lambda _local, remote: remote) if reconcile else max
+
+            if overall_limit and overall_usage:
+                limit_15, limit_day = overall_limit
+                usage_15, usage_day = overall_usage
+                self.overall_15_limit = limit_15
+                self.overall_day_limit = limit_day
+                self.overall_15 = merge(self.overall_15, usage_15)
+                self.overall_day = merge(self.overall_day, usage_day)
+
+            if read_limit and read_usage:
+                limit_15, limit_day = read_limit
+                usage_15, usage_day = read_usage
+                self.read_15_limit = limit_15
+                self.read_day_limit = limit_day
+                self.read_15 = merge(self.read_15, usage_15)
+                self.read_day = merge(self.read_day, usage_day)
+
+            if reconcile:
+                self._needs_reconcile = False
+            if overall_usage or read_usage:
+                flush = self._mark_ledger_dirty()
+        if flush:
+            self.flush_ledger()
 
 
 def _load_token_cache() -> Dict:
@@ -235,6 +563,8 @@ def _save_token_cache(payload: Dict) -> None:
         "access_token": payload.get("access_token"),
         "expires_at": payload.get("expires_at"),
         "refresh_token": payload.get("refresh_token"),
+        "athlete_id": payload.get("athlete_id"),
+        "identity_fingerprint": payload.get("identity_fingerprint"),
     }
     write_json(TOKEN_CACHE, cache_payload)
     try:
@@ -260,16 +590,27 @@ def _load_athlete_fingerprint() -> Optional[str]:
     return None
 
 
-def _write_athlete_fingerprint(fingerprint: str) -> None:
+def _load_identity_fingerprint() -> Optional[str]:
+    if not os.path.exists(ATHLETE_PATH):
+        return None
+    try:
+        payload = read_json(ATHLETE_PATH)
+    except Exception:
+        return None
+    value = payload.get("identity_fingerprint") if isinstance(payload, dict) else None
+    return value if isinstance(value, str) and value else None
+
+
+def _write_athlete_fingerprint(fingerprint: str, identity_fingerprint: Optional[str] = None) -> None:
     ensure_dir("data")
-    write_json(
-        ATHLETE_PATH,
-        {
-            "fingerprint": fingerprint,
-            "updated_utc": utc_now().isoformat(),
-            "version": 1,
-        },
-    )
+    payload: Dict[str, Any] = {
+        "fingerprint": fingerprint,
+        "updated_utc": utc_now().isoformat(),
+        "version": 1,
+    }
+    if identity_fingerprint:
+        payload["identity_fingerprint"] = identity_fingerprint
+    write_json(ATHLETE_PATH, payload)
 
 
 def _athlete_fingerprint(athlete_id: int, secret: str) -> str:
@@ -278,8 +619,50 @@ def _athlete_fingerprint(athlete_id: int, secret: str) -> str:
     return hmac.new(key, msg, hashlib.sha256).hexdigest()
 
 
+def _identity_secret(config: Dict) -> str:
+    strava = config.get("strava", {}) or {}
+    return str(strava.get("client_secret") or strava.get("refresh_token") or "")
+
+
+def _identity_fingerprint(config: Dict) -> Optional[str]:
+    # A configured refresh token always belongs to the same athlete, so an
+    # identity verified under it stays valid until the token is replaced.
+    refresh_token = (config.get("strava", {}) or {}).get("refresh_token")
+    secret = _identity_secret(config)
+    if not refresh_token or not secret:
+        return None
+    msg = f"refresh_token:{refresh_token}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+
+def _identity_verified(config: Dict) -> bool:
+    identity = _identity_fingerprint(config)
+    return bool(identity and _load_athlete_fingerprint() and _load_identity_fingerprint() == identity)
+
+
+def _cached_athlete_id(config: Dict) -> Optional[int]:
+    cache = _load_token_cache()
+    identity = _identity_fingerprint(config)
+    if not identity or cache.get("identity_fingerprint") != identity:
+        return None
+    try:
+        return int(cache["athlete_id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _cached_access_token(cache: Dict) -> Optional[str]:
+    access_token = cache.get("access_token")
+    if access_token and int(cache.get("expires_at") or 0) - 60 > int(utc_now().timestamp()):
+        return str(access_token)
+    return None
+
+
 def _get_access_token(
-    config: Dict, limiter: Optional[RateLimiter], force_refresh: bool = False
+    config: Dict,
+    limiter: Optional[RateLimiter],
+    force_refresh: bool = False,
+    transport: Optional[HttpTransport] = None,
 ) -> str:
     strava = config.get("strava", {})
     client_id = strava.get("client_id")
@@ -289,12 +672,9 @@ def _get_access_token(
         raise ValueError("Missing Strava credentials in config.yaml/config.local.yaml")
 
     cache = _load_token_cache()
-    now = int(utc_now().timestamp())
-    access_token = cache.get("access_token")
-    expires_at = cache.get("expires_at", 0)
     cached_refresh_token = cache.get("refresh_token")
-
-    if access_token and expires_at - 60 > now and not force_refresh:
+    access_token = None if force_refresh else _cached_access_token(cache)
+    if access_token:
         return access_token
 
     refresh_candidates: List[str] = []
@@ -312,6 +692,7 @@ def _get_access_token(
                 "https://www.strava.com/oauth/token",
                 limiter=limiter,
                 request_kind="overall",
+                transport=transport,
                 data={
                     "client_id": client_id,
                     "client_secret": client_secret,
@@ -329,7 +710,15 @@ def _get_access_token(
             raise last_exc
         raise RuntimeError("Unable to refresh Strava access token.")
 
-    _save_token_cache(payload)
+    if transport is not None and transport.offline:
+        return payload["access_token"]
+    # Bind the athlete to the cached token: from the token response when it
+    # carries one, else carried over while the configured refresh token is
+    # unchanged.
+    athlete_id = (payload.get("athlete") or {}).get("id") or _cached_athlete_id(config)
+    _save_token_cache(
+        dict(payload, athlete_id=athlete_id, identity_fingerprint=_identity_fingerprint(config))
+    )
     returned_refresh_token = payload.get("refresh_token")
     if (
         isinstance(returned_refresh_token, str)
@@ -349,26 +738,39 @@ def _run_with_token_refresh(
     limiter: Optional[RateLimiter],
     request_label: str,
     call: Callable[[str], Any],
+    transport: Optional[HttpTransport] = None,
 ) -> Tuple[Any, str]:
     try:
         return call(token), token
     except requests.HTTPError as exc:
         if _http_error_status(exc) != 401:
             raise
-        print(
-            f"Strava API returned 401 during {request_label}; "
-            "refreshing access token and retrying once."
-        )
-        refreshed_token = _get_access_token(config, limiter, force_refresh=True)
+        # Concurrent workers rejected with the same token refresh it once: a
+        # second grant would spend (and, with rotation, invalidate) the
+        # refresh token the first one just saved.
+        with _TOKEN_REFRESH_LOCK:
+            refreshed_token = _REFRESHED_TOKENS.get(token)
+            if refreshed_token is None:
+                print(
+                    f"Strava API returned 401 during {request_label}; "
+                    "refreshing access token and retrying once."
+                )
+                refreshed_token = _get_access_token(
+                    config, limiter, force_refresh=True, transport=transport
+                )
+                _REFRESHED_TOKENS[token] = refreshed_token
         return call(refreshed_token), refreshed_token
 
 
-def _fetch_athlete(token: str, limiter: Optional[RateLimiter]) -> Dict:
+def _fetch_athlete(
+    token: str, limiter: Optional[RateLimiter], transport: Optional[HttpTransport] = None
+) -> Dict:
     return _request_json_with_retry(
         "GET",
         "https://www.strava.com/api/v3/athlete",
         limiter=limiter,
         request_kind="read",
+        transport=transport,
         headers={"Authorization": f"Bearer {token}"},
     )
 
@@ -393,6 +795,7 @@ def _fetch_page(
     after: int,
     before: Optional[int],
     limiter: Optional[RateLimiter],
+    transport: Optional[HttpTransport] = None,
 ) -> List[Dict]:
     params = {"per_page": per_page, "page": page, "after": after}
     if before is not None:
@@ -402,11 +805,443 @@ def _fetch_page(
         "https://www.strava.com/api/v3/athlete/activities",
         limiter=limiter,
         request_kind="read",
+        transport=transport,
         headers={"Authorization": f"Bearer {token}"},
         params=params,
     )
 
 
+def _iter_backfill_pages(
+    config: Dict,
+    token_ref: List[str],
+    per_page: int,
+    after: int,
+    before: Optional[int],
+    limiter: Optional[RateLimiter],
+    workers: int,
+    transport: Optional[HttpTransport] = None,
+) -> Iterator[Tuple[int, List[Dict]]]:
+    # Pages share one fixed `before` cursor, so they can be fetched ahead of
+    # time and still be yielded strictly in page order. Stops after the first
+    # empty page; errors (including RateLimitExceeded) surface in page order too.
+    def _fetch(page: int) -> List[Dict]:
+        activities, token_ref[0] = _run_with_token_refresh(
+            config,
+            token_ref[0],
+            limiter,
+            "historical backfill sync",
+            lambda access_token: _fetch_page(
+                access_token, per_page, page, after, before, limiter, transport
+            ),
+            transport=transport,
+        )
+        return activities
+
+    workers = max(1, workers)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strava-backfill")
+    pending: deque = deque()
+    next_page = 1
+    try:
+        for _ in range(workers):
+            pending.append((next_page, executor.submit(_fetch, next_page)))
+            next_page += 1
+        while pending:
+            page, future = pending.popleft()
+            activities = future.result()
+            yield page, activities
+            if not activities:
+                return
+            pending.append((next_page, executor.submit(_fetch, next_page)))
+            next_page += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _year_start_ts(year: int) -> int:
+    return int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _build_backfill_shards(after: int, now_ts: int, shard_years: int) -> List[Dict]:
+    # One shard per calendar year for the most recent `shard_years` years, plus
+    # a tail shard for anything older down to `after`. Strava's before/after
+    # filters are exclusive, so each shard's `before` overlaps its newer
+    # neighbour by one second to keep boundary activities.
+    shards: List[Dict] = []
+    upper = now_ts
+    year = datetime.fromtimestamp(now_ts, tz=timezone.utc).year
+    for _ in range(max(1, shard_years)):
+        lower = max(after, _year_start_ts(year))
+        shards.append(_new_shard(str(year), lower, upper))
+        if lower <= after:
+            return shards
+        upper = lower + 1
+        year -= 1
+    shards.append(_new_shard(f"before-{year + 1}", after, upper))
+    return shards
+
+
+def _new_shard(label: str, after: int, before: int) -> Dict:
+    return {
+        "label": label,
+        "after": int(after),
+        "before": int(before),
+        "next_before": None,
+        "completed": False,
+        "fetched": 0,
+        "oldest_seen_ts": None,
+        "newest_seen_ts": None,
+    }
+
+
+def _shards_from_state(
+    state: Dict, after: int, now_ts: int, shard_years: int
+) -> Tuple[List[Dict], bool]:
+    saved = state.get("shards") if state else None
+    if isinstance(saved, list) and saved:
+        shards: List[Dict] = []
+        try:
+            for item in saved:
+                shard = _new_shard(
+                    str(item.get("label") or ""), int(item["after"]), int(item["before"])
+                )
+                shard["completed"] = bool(item.get("completed"))
+                if item.get("next_before") is not None:
+                    shard["next_before"] = int(item["next_before"])
+                    if shard["next_before"] <= shard["after"]:
+                        raise ValueError("cursor must be newer than the shard boundary")
+                shard["fetched"] = int(item.get("fetched") or 0)
+                shard["oldest_seen_ts"] = item.get("oldest_seen_ts")
+                shard["newest_seen_ts"] = item.get("newest_seen_ts")
+                shards.append(shard)
+        except (KeyError, TypeError, ValueError):
+            print("Invalid backfill shard state; restarting from current time.")
+            return _build_backfill_shards(after, now_ts, shard_years), False
+        resumed = any(shard["completed"] or shard["next_before"] is not None for shard in shards)
+        return shards, resumed
+
+    shards = _build_backfill_shards(after, now_ts, shard_years)
+    if not state or state.get("next_before") is None:
+        return shards, False
+
+    # Migrate a single-cursor state: everything newer than next_before is done.
+    try:
+        legacy_before = int(state["next_before"])
+        if legacy_before <= 0:
+            raise ValueError("cursor must be positive epoch seconds")
+    except (TypeError, ValueError):
+        print("Invalid backfill cursor; restarting from current time.")
+        return shards, False
+    for shard in shards:
+        if shard["after"] >= legacy_before:
+            shard["completed"] = True
+        elif shard["before"] > legacy_before:
+            shard["next_before"] = legacy_before
+    return shards, True
+
+
+def _backfill_shard(
+    config: Dict,
+    token_ref: List[str],
+    shard: Dict,
+    per_page: int,
+    limiter: Optional[RateLimiter],
+    workers: int,
+    dry_run: bool,
+    transport: Optional[HttpTransport] = None,
+    checkpoint: Optional[Callable[[Dict, Dict], None]] = None,
+) -> Dict:
+    result: Dict[str, Any] = {
+        "fetched": 0,
+        "new_or_updated": 0,
+        "activity_ids": set(),
+        "rate_limited": False,
+        "rate_limit_message": "",
+        "budget_reserved": False,
+        "budget_reserved_message": "",
+    }
+    commit = checkpoint or (lambda target, update: target.update(update))
+    before = shard["next_before"] if shard.get("next_before") is not None else shard["before"]
+    # The API already bounds each page by the shard's `after`.
+    committer = ActivityCommitter(StravaProvider(), None, dry_run)
+    pages = _iter_backfill_pages(
+        config, token_ref, per_page, shard["after"], before, limiter, workers, transport
+    )
+    try:
+        for _page, activities in pages:
+            if not activities:
+                commit(shard, {"completed": True, "next_before": None})
+                break
+            page = committer.commit(activities)
+            oldest = [ts for ts in (shard.get("oldest_seen_ts"), page["oldest_ts"]) if ts is not None]
+            newest = [ts for ts in (shard.get("newest_seen_ts"), page["newest_ts"]) if ts is not None]
+            # The page is on disk; advance the cursor so a killed run resumes
+            # with at most one page of re-fetching.
+            update: Dict[str, Any] = {
+                "fetched": int(shard.get("fetched") or 0) + len(activities),
+                "oldest_seen_ts": min(oldest) if oldest else None,
+                "newest_seen_ts": max(newest) if newest else None,
+            }
+            if committer.oldest_ts is not None:
+                update["next_before"] = int(committer.oldest_ts + 1)
+            commit(shard, update)
+    except BudgetReserved as exc:
+        result["budget_reserved"] = True
+        result["budget_reserved_message"] = str(exc)
+    except RateLimitExceeded as exc:
+        result["rate_limited"] = True
+        result["rate_limit_message"] = str(exc)
+    finally:
+        pages.close()
+    result["fetched"] = committer.fetched
+    result["new_or_updated"] = committer.new_or_updated
+    result["activity_ids"] = committer.activity_ids
+    return result
+
+
+def _shard_checkpointer(
+    after: int,
+    shards: List[Dict],
+    activity_scope: Dict,
+    persist: bool,
+    incremental: Optional[Dict] = None,
+) -> Callable[[Dict, Dict], None]:
+    lock = threading.Lock()
+
+    def _checkpoint(shard: Dict, update: Dict) -> None:
+        with lock:
+            shard.update(update)
+            if not persist:
+                return
+            state_update = _backfill_state_from_shards(after, shards, rate_limited=False)
+            state_update["activity_scope"] = activity_scope
+            if incremental is not None:
+                state_update["incremental"] = incremental
+            _save_state(state_update)
+
+    return _checkpoint
+
+
+def _run_backfill_shards(
+    config: Dict,
+    token: str,
+    shards: List[Dict],
+    per_page: int,
+    limiter: Optional[RateLimiter],
+    workers: int,
+    dry_run: bool,
+    transport: Optional[HttpTransport] = None,
+    checkpoint: Optional[Callable[[Dict, Dict], None]] = None,
+) -> Tuple[Dict, str]:
+    pending = [shard for shard in shards if not shard.get("completed")]
+    summary: Dict[str, Any] = {
+        "fetched": 0,
+        "new_or_updated": 0,
+        "activity_ids": set(),
+        "exhausted": False,
+        "rate_limited": False,
+        "rate_limit_message": "",
+        "budget_reserved": False,
+        "budget_reserved_message": "",
+    }
+    if not pending:
+        summary["exhausted"] = True
+        return summary, token
+
+    # Shards are independent, so they run side by side; leftover workers go
+    # to page-level prefetch within each shard.
+    token_ref = [token]
+    shard_workers = min(workers, len(pending))
+    page_workers = max(1, workers // shard_workers)
+    errors: List[BaseException] = []
+    with ThreadPoolExecutor(max_workers=shard_workers, thread_name_prefix="strava-shard") as executor:
+        futures = [
+            executor.submit(
+                _backfill_shard,
+                config,
+                token_ref,
+                shard,
+                per_page,
+                limiter,
+                page_workers,
+                dry_run,
+                transport,
+                checkpoint,
+            )
+            for shard in pending
+        ]
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            summary["fetched"] += result["fetched"]
+            summary["new_or_updated"] += result["new_or_updated"]
+            summary["activity_ids"].update(result["activity_ids"])
+            if result["rate_limited"]:
+                summary["rate_limited"] = True
+                summary["rate_limit_message"] = result["rate_limit_message"]
+            if result["budget_reserved"]:
+                summary["budget_reserved"] = True
+                summary["budget_reserved_message"] = result["budget_reserved_message"]
+    if errors:
+        raise errors[0]
+
+    summary["exhausted"] = all(shard.get("completed") for shard in shards)
+    return summary, token_ref[0]
+
+
+def _backfill_state_from_shards(after: int, shards: List[Dict], rate_limited: bool) -> Dict:
+    oldest = [shard["oldest_seen_ts"] for shard in shards if shard.get("oldest_seen_ts") is not None]
+    newest = [shard["newest_seen_ts"] for shard in shards if shard.get("newest_seen_ts") is not None]
+    return {
+        "after": after,
+        "shards": shards,
+        "completed": all(shard.get("completed") for shard in shards),
+        "oldest_seen_ts": min(oldest) if oldest else None,
+        "newest_seen_ts": max(newest) if newest else None,
+        "rate_limited": rate_limited,
+        "last_run_utc": utc_now().isoformat(),
+    }
+
+
+def _prune_cursor(shard: Dict, local_start_times: Dict[str, Optional[int]]) -> Dict:
+    return {
+        "label": shard["label"],
+        "after": shard["after"],
+        "before": shard["before"],
+        "next_before": shard["before"],
+        "remote_ids": [],
+        "local_ids": sorted(
+            activity_id
+            for activity_id, ts in local_start_times.items()
+            if ts is not None and shard["after"] < ts < shard["before"]
+        ),
+    }
+
+
+def _reconcile_prune(
+    config: Dict,
+    token: str,
+    after: int,
+    now_ts: int,
+    shard_years: int,
+    per_page: int,
+    limiter: Optional[RateLimiter],
+    max_requests: int,
+    transport: Optional[HttpTransport] = None,
+) -> Tuple[Dict, str]:
+    # Walk the activity list one time shard at a time keeping only IDs, and
+    # prune local activities a shard's remote ID set no longer contains. The
+    # cursor (shard bounds, a `next_before` time bound, IDs so far) persists
+    # between runs so a full pass can be spread over many runs of
+    # `max_requests` list calls. It is time-based rather than a page number:
+    # a remote deletion between runs shifts later activities onto earlier
+    # pages, and resuming by page would skip them and prune them locally.
+    # Only activities stored when the shard's scan started can be pruned:
+    # anything written since (a late upload, an event, a recent or backfill
+    # page) may sit in a range the scan already passed.
+    saved = read_json(PRUNE_RECONCILE_PATH) if os.path.exists(PRUNE_RECONCILE_PATH) else {}
+    if not isinstance(saved, dict) or saved.get("after") != after:
+        saved = {"after": after}
+    shards = _build_backfill_shards(after, now_ts, shard_years)
+    labels = [shard["label"] for shard in shards]
+    store = shared_store(RAW_DIR)
+    local_start_times: Optional[Dict[str, Optional[int]]] = None
+
+    def _new_cursor(shard: Dict) -> Dict:
+        nonlocal local_start_times
+        if local_start_times is None:
+            local_start_times = store.start_times()
+        return _prune_cursor(shard, local_start_times)
+
+    cursor = saved.get("cursor")
+    if not isinstance(cursor, dict) or cursor.get("label") not in labels:
+        cursor = None
+    elif cursor.get("next_before") is None or cursor.get("local_ids") is None:
+        # Cursor from an older run (page-numbered, or without a local
+        # snapshot): rescan that shard from the top.
+        cursor = _new_cursor(shards[labels.index(cursor["label"])])
+
+    summary: Dict[str, Any] = {
+        "requests": 0,
+        "shards_checked": 0,
+        "shards_mismatched": 0,
+        "deleted": 0,
+        "missing_locally": 0,
+        "pass_completed": False,
+        "rate_limited": False,
+        "budget_reserved": False,
+    }
+    while summary["requests"] < max_requests:
+        if cursor is None:
+            cursor = _new_cursor(shards[0])
+        next_before = int(cursor["next_before"])
+        try:
+            activities, token = _run_with_token_refresh(
+                config,
+                token,
+                limiter,
+                "prune reconciliation",
+                lambda access_token: _fetch_page(
+                    access_token,
+                    per_page,
+                    1,
+                    cursor["after"],
+                    next_before,
+                    limiter,
+                    transport,
+                ),
+                transport=transport,
+            )
+        except BudgetReserved:
+            summary["budget_reserved"] = True
+            break
+        except RateLimitExceeded:
+            summary["rate_limited"] = True
+            break
+        summary["requests"] += 1
+        cursor["remote_ids"].extend(
+            str(activity["id"]) for activity in activities if activity.get("id")
+        )
+        if len(activities) >= per_page:
+            starts = [ts for ts in (activity_start_ts(activity) for activity in activities) if ts is not None]
+            if not starts:
+                # No start times to move the cursor by; never prune from a
+                # scan that may be partial.
+                break
+            # +1 keeps activities sharing the oldest start second on the next
+            # page; the ID set absorbs the repeat.
+            oldest = min(starts)
+            cursor["next_before"] = oldest + 1 if oldest + 1 < next_before else oldest
+            continue
+
+        remote_ids = set(cursor["remote_ids"])
+        local_ids = set(cursor["local_ids"])
+        summary["shards_checked"] += 1
+        if remote_ids != local_ids:
+            summary["shards_mismatched"] += 1
+            summary["missing_locally"] += len(remote_ids - local_ids)
+            for activity_id in sorted(local_ids - remote_ids):
+                if store.remove(activity_id):
+                    summary["deleted"] += 1
+
+        index = labels.index(cursor["label"])
+        if index + 1 >= len(shards):
+            summary["pass_completed"] = True
+            saved["last_pass_completed_utc"] = utc_now().isoformat()
+            cursor = None
+            break
+        cursor = _new_cursor(shards[index + 1])
+
+    saved["cursor"] = cursor
+    saved["last_run_utc"] = utc_now().isoformat()
+    ensure_dir("data")
+    write_json(PRUNE_RECONCILE_PATH, saved)
+    summary["next_shard"] = cursor["label"] if cursor else None
+    return summary, token
+
+
 def _load_existing_activity_ids() -> set:
     path = os.path.join("data", "activities_normalized.json")
     if not os.path.exists(path):
@@ -445,9 +1280,12 @@ def _has_existing_data() -> bool:
 def _reset_persisted_data() -> None:
     paths = [
         os.path.join("data", "activities_normalized.json"),
+        os.path.join("data", "normalize_manifest.json"),
         os.path.join("data", "daily_aggregates.json"),
         os.path.join("data", "backfill_state_strava.json"),
         os.path.join("data", "backfill_state.json"),
+        os.path.join("data", "prune_reconcile_strava.json"),
+        os.path.join("data", "strava_event_cursor.json"),
         os.path.join("data", "last_sync_summary.json"),
         os.path.join("data", "last_sync_summary.txt"),
         os.path.join("data", "athletes_strava.json"),
@@ -458,8 +1296,7 @@ def _reset_persisted_data() -> None:
         if os.path.exists(path):
             os.remove(path)
 
-    if os.path.exists(RAW_DIR):
-        shutil.rmtree(RAW_DIR)
+    discard_store(RAW_DIR)
     legacy_raw_root = os.path.join("activities", "raw")
     if os.path.isdir(legacy_raw_root):
         for filename in os.listdir(legacy_raw_root):
@@ -469,7 +1306,11 @@ def _reset_persisted_data() -> None:
 
 
 def _fetch_recent_activity_ids(
-    config: Dict, token: str, per_page: int, limiter: Optional[RateLimiter]
+    config: Dict,
+    token: str,
+    per_page: int,
+    limiter: Optional[RateLimiter],
+    transport: Optional[HttpTransport] = None,
 ) -> Tuple[Optional[List[str]], str]:
     try:
         activities, token = _run_with_token_refresh(
@@ -478,8 +1319,9 @@ def _fetch_recent_activity_ids(
             limiter,
             "recent activity overlap check",
             lambda access_token: _fetch_page(
-                access_token, min(per_page, 50), 1, 0, None, limiter
+                access_token, min(per_page, 50), 1, 0, None, limiter, transport
             ),
+            transport=transport,
         )
     except Exception:
         return None, token
@@ -492,83 +1334,136 @@ def _fetch_recent_activity_ids(
 
 
 def _maybe_reset_for_new_athlete(
-    config: Dict, token: str, per_page: int, limiter: Optional[RateLimiter]
+    config: Dict,
+    token: str,
+    per_page: int,
+    limiter: Optional[RateLimiter],
+    transport: Optional[HttpTransport] = None,
 ) -> str:
-    strava = config.get("strava", {}) or {}
-    secret = strava.get("client_secret") or strava.get("refresh_token") or ""
+    if transport is not None and transport.offline:
+        # A fake or replayed API's athlete says nothing about whose data is
+        # on disk; never wipe it over one.
+        return token
+
+    secret = _identity_secret(config)
     if not secret:
         return token
 
-    try:
-        athlete, token = _run_with_token_refresh(
-            config,
-            token,
-            limiter,
-            "athlete profile lookup",
-            lambda access_token: _fetch_athlete(access_token, limiter),
-        )
-    except Exception as exc:
-        print(f"Warning: unable to fetch athlete profile; skipping reset ({exc})")
+    if _identity_verified(config):
+        # Already verified under this refresh token; no /athlete lookup needed.
         return token
-    athlete_id = athlete.get("id")
+
+    identity = _identity_fingerprint(config)
+    stored_fingerprint = _load_athlete_fingerprint()
+
+    athlete_id = _cached_athlete_id(config)
     if athlete_id is None:
-        print("Warning: athlete profile missing id; skipping reset")
-        return token
+        try:
+            athlete, token = _run_with_token_refresh(
+                config,
+                token,
+                limiter,
+                "athlete profile lookup",
+                lambda access_token: _fetch_athlete(access_token, limiter, transport),
+                transport=transport,
+            )
+        except Exception as exc:
+            print(f"Warning: unable to fetch athlete profile; skipping reset ({exc})")
+            return token
+        athlete_id = athlete.get("id")
+        if athlete_id is None:
+            print("Warning: athlete profile missing id; skipping reset")
+            return token
+        _remember_athlete_id(config, int(athlete_id), transport)
 
     current_fingerprint = _athlete_fingerprint(int(athlete_id), secret)
-    stored_fingerprint = _load_athlete_fingerprint()
 
     if stored_fingerprint and stored_fingerprint == current_fingerprint:
+        _write_athlete_fingerprint(current_fingerprint, identity)
         return token
 
     if stored_fingerprint and stored_fingerprint != current_fingerprint:
         print("Detected different athlete; resetting persisted data.")
         _reset_persisted_data()
-        _write_athlete_fingerprint(current_fingerprint)
+        _write_athlete_fingerprint(current_fingerprint, identity)
         return token
 
     if not _has_existing_data():
-        _write_athlete_fingerprint(current_fingerprint)
+        _write_athlete_fingerprint(current_fingerprint, identity)
         return token
 
-    recent_ids, token = _fetch_recent_activity_ids(config, token, per_page, limiter)
+    recent_ids, token = _fetch_recent_activity_ids(
+        config, token, per_page, limiter, transport
+    )
     if recent_ids is None:
         print("Warning: unable to verify recent activity overlap; skipping reset")
         return token
 
     existing_ids = _load_existing_activity_ids()
     if recent_ids and any(activity_id in existing_ids for activity_id in recent_ids):
-        _write_athlete_fingerprint(current_fingerprint)
+        _write_athlete_fingerprint(current_fingerprint, identity)
         return token
 
     print("No athlete fingerprint found and data does not match; resetting persisted data.")
     _reset_persisted_data()
-    _write_athlete_fingerprint(current_fingerprint)
+    _write_athlete_fingerprint(current_fingerprint, identity)
     return token
 
 
+def _remember_athlete_id(
+    config: Dict, athlete_id: int, transport: Optional[HttpTransport] = None
+) -> None:
+    if transport is not None and transport.offline:
+        return
+    cache = _load_token_cache()
+    if not cache.get("access_token"):
+        return
+    cache["athlete_id"] = athlete_id
+    cache["identity_fingerprint"] = _identity_fingerprint(config)
+    _save_token_cache(cache)
+
+
 def _write_activity(activity: Dict) -> bool:
-    activity_id = activity.get("id")
-    if not activity_id:
-        return False
-    activity_id_str = str(activity_id).strip()
-    if not activity_id_str:
-        return False
-    if activity_id_str in {".", ".."}:
-        return False
-    if "/" in activity_id_str or "\\" in activity_id_str or ".." in activity_id_str:
-        return False
-
-    path = os.path.join(RAW_DIR, f"{activity_id_str}.json")
-    if os.path.exists(path):
-        try:
-            existing = read_json(path)
-            if existing == activity:
-                return False
-        except Exception:
-            pass
-    write_json(path, activity)
-    return True
+    return write_activity(RAW_DIR, activity)
+
+
+class StravaProvider(SyncProvider):
+    """Strava activities are stored as the API returns them."""
+
+    name = "strava"
+    raw_dir = RAW_DIR
+
+    def __init__(
+        self,
+        config: Optional[Dict] = None,
+        token: str = "",
+        per_page: int = 200,
+        limiter: Optional[RateLimiter] = None,
+        transport: Optional[HttpTransport] = None,
+    ) -> None:
+        self.config = config or {}
+        self.token = token
+        self.per_page = per_page
+        self.limiter = limiter
+        self.transport = transport
+
+    def is_rate_limited(self, exc: Exception) -> bool:
+        return isinstance(exc, RateLimitExceeded)
+
+    def fetch_recent_page(self, cursor: Optional[int], after: int) -> Tuple[List[Dict], int]:
+        page = cursor or 1
+        activities, self.token = _run_with_token_refresh(
+            self.config,
+            self.token,
+            self.limiter,
+            "recent activity sync",
+            lambda access_token: _fetch_page(
+                access_token, self.per_page, page, after, None, self.limiter, self.transport
+            ),
+            transport=self.transport,
+        )
+        # `after` is applied by the API, so only an empty page ends the scan.
+        return activities, page + 1
 
 
 def _load_state() -> Dict:
@@ -593,119 +1488,308 @@ def _sync_recent(
     config: Dict,
     token: str,
     per_page: int,
-    recent_days: int,
+    after: Optional[int],
     limiter: RateLimiter,
     dry_run: bool,
+    transport: Optional[HttpTransport] = None,
 ) -> Tuple[Dict, str]:
-    if recent_days <= 0:
-        return (
-            {
-                "fetched": 0,
-                "new_or_updated": 0,
-                "oldest_ts": None,
-                "newest_ts": None,
-                "rate_limited": False,
-                "rate_limit_message": "",
-            },
-            token,
+    provider = StravaProvider(config, token, per_page, limiter, transport)
+    return sync_recent(provider, after, dry_run), provider.token
+
+
+def _fetch_activity(
+    token: str,
+    activity_id: str,
+    limiter: Optional[RateLimiter],
+    transport: Optional[HttpTransport] = None,
+) -> Optional[Dict]:
+    try:
+        return _request_json_with_retry(
+            "GET",
+            f"https://www.strava.com/api/v3/activities/{activity_id}",
+            limiter=limiter,
+            request_kind="read",
+            transport=transport,
+            headers={"Authorization": f"Bearer {token}"},
         )
+    except requests.HTTPError as exc:
+        # Deleted, or no longer visible to this athlete.
+        if _http_error_status(exc) in {403, 404}:
+            return None
+        raise
+
 
-    after = int((utc_now() - timedelta(days=recent_days)).timestamp())
-    page = 1
-    total = 0
+def _sync_events(
+    config: Dict,
+    token: str,
+    log_path: str,
+    after: int,
+    limiter: RateLimiter,
+    dry_run: bool,
+    transport: Optional[HttpTransport] = None,
+) -> Tuple[Dict, Optional[Dict], str]:
+    """Apply activity create/update/delete events logged since the cursor.
+
+    Returns the summary, the cursor to persist (None to keep the old one) and
+    the possibly refreshed token. The cursor only moves past events whose
+    activity was handled, so a rate-limited run picks up where it stopped.
+    """
+    cursor = read_json(EVENT_CURSOR_PATH) if os.path.exists(EVENT_CURSOR_PATH) else {}
+    events, next_cursor, gap = read_events(log_path, cursor if isinstance(cursor, dict) else {})
+    athlete_id = _cached_athlete_id(config)
+    if athlete_id is not None:
+        events = [
+            (offset, event)
+            for offset, event in events
+            if event.get("owner_id") is None or str(event["owner_id"]) == str(athlete_id)
+        ]
+    actions = activity_actions(events)
+
+    fetched = 0
     new_or_updated = 0
-    oldest_ts = None
+    deleted = 0
     newest_ts = None
     rate_limited = False
     rate_limit_message = ""
-    activity_ids = set()
+    fetched_ids = set()
+    handled = set()
+    store = shared_store(RAW_DIR)
+    for activity_id, action in actions.items():
+        activity = None
+        if action == "fetch":
+            try:
+                activity, token = _run_with_token_refresh(
+                    config,
+                    token,
+                    limiter,
+                    "event activity fetch",
+                    lambda access_token: _fetch_activity(access_token, activity_id, limiter, transport),
+                    transport=transport,
+                )
+            except RateLimitExceeded as exc:
+                rate_limited = True
+                rate_limit_message = str(exc)
+                break
+        handled.add(activity_id)
+        if activity is None:
+            if not dry_run and store.remove(activity_id):
+                deleted += 1
+            continue
+        fetched += 1
+        ts = _activity_start_ts(activity)
+        if ts is not None and ts <= after:
+            # Outside the configured history; polling would not have kept it either.
+            continue
+        if ts is not None:
+            newest_ts = ts if newest_ts is None else max(newest_ts, ts)
+        fetched_ids.add(activity_id)
+        if not dry_run and _write_activity(activity):
+            new_or_updated += 1
 
-    while True:
-        try:
-            activities, token = _run_with_token_refresh(
-                config,
-                token,
-                limiter,
-                "recent activity sync",
-                lambda access_token: _fetch_page(
-                    access_token, per_page, page, after, None, limiter
-                ),
-            )
-        except RateLimitExceeded as exc:
-            rate_limited = True
-            rate_limit_message = str(exc)
-            break
-        if not activities:
-            break
-        for activity in activities:
-            total += 1
-            ts = _activity_start_ts(activity)
-            if ts is not None:
-                oldest_ts = ts if oldest_ts is None else min(oldest_ts, ts)
-                newest_ts = ts if newest_ts is None else max(newest_ts, ts)
-            activity_id = activity.get("id")
-            if activity_id:
-                activity_ids.add(str(activity_id))
-            if dry_run:
-                continue
-            if _write_activity(activity):
-                new_or_updated += 1
-        page += 1
+    save_cursor: Optional[Dict] = next_cursor
+    if rate_limited:
+        save_cursor = None
+        for offset, event in events:
+            activity_id = str(event.get("object_id"))
+            if activity_id in actions and activity_id not in handled:
+                break
+            save_cursor = dict(next_cursor, offset=offset)
 
     return (
         {
-            "fetched": total,
+            "path": log_path,
+            "events": len(events),
+            "activities": len(actions),
+            "fetched": fetched,
             "new_or_updated": new_or_updated,
-            "oldest_ts": oldest_ts,
+            "deleted": deleted,
             "newest_ts": newest_ts,
+            "gap": gap,
             "rate_limited": rate_limited,
             "rate_limit_message": rate_limit_message,
-            "activity_ids": sorted(activity_ids),
+            "activity_ids": sorted(fetched_ids),
         },
+        save_cursor,
         token,
     )
 
 
-def sync_strava(dry_run: bool, prune_deleted: bool) -> Dict:
-    config = load_config()
+def _build_limiter(config: Dict, read_only: bool = False) -> RateLimiter:
     rate_cfg = config.get("rate_limits", {}) or {}
-    limiter = RateLimiter(
+    return RateLimiter(
         overall_15_limit=int(rate_cfg.get("overall_15_min", 200)),
         overall_day_limit=int(rate_cfg.get("overall_daily", 2000)),
         read_15_limit=int(rate_cfg.get("read_15_min", 100)),
         read_day_limit=int(rate_cfg.get("read_daily", 1000)),
         safety_buffer=int(rate_cfg.get("safety_buffer", 2)),
         min_interval_seconds=float(rate_cfg.get("min_interval_seconds", 10)),
+        pacing=str(rate_cfg.get("pacing", "adaptive")),
+        ledger_path=RATE_LEDGER_PATH if bool(rate_cfg.get("persist_ledger", True)) else None,
+        ledger_read_only=read_only,
+    )
+
+
+def _probe_range(
+    config: Dict,
+    target: Dict,
+    per_page: int,
+    limiter: RateLimiter,
+    transport: Optional[HttpTransport] = None,
+) -> Optional[Dict]:
+    # Planning must not refresh the token: that would rewrite the token cache
+    # (and, with rotation, spend the refresh token) just for an estimate.
+    token = _cached_access_token(_load_token_cache())
+    if token is None:
+        print("Skipping plan probe: no unexpired cached access token; run a sync first.")
+        return None
+    try:
+        activities = _fetch_page(
+            token, per_page, 1, target["after"], target["before"], limiter, transport
+        )
+    except RateLimitExceeded as exc:
+        print(f"Skipping plan probe: {exc}")
+        return None
+    timestamps = [ts for ts in (_activity_start_ts(item) for item in activities) if ts is not None]
+    return {
+        "label": target["label"],
+        "count": len(activities),
+        "full": len(activities) >= per_page,
+        "oldest_ts": min(timestamps) if timestamps else None,
+        "newest_ts": max(timestamps) if timestamps else None,
+    }
+
+
+def plan_strava(probe: bool = False, transport: Optional[HttpTransport] = None) -> Dict:
+    """Estimate the cost of the next sync without syncing.
+
+    Uses persisted cursors and local activity density only; with `probe`, one
+    page of the widest pending range is fetched to calibrate it. Nothing is
+    written: the rate limit ledger is only read and the token is never refreshed.
+    """
+    config = load_config()
+    limiter = _build_limiter(config, read_only=True)
+    sync_cfg = config.get("sync", {}) or {}
+    per_page = int(sync_cfg.get("per_page", 200))
+    after = _start_after_ts(config)
+    shard_years = max(1, int(sync_cfg.get("backfill_shard_years", 10)))
+    workers = max(1, int(sync_cfg.get("backfill_workers", 4)))
+    now_ts = int(utc_now().timestamp())
+
+    state = _load_state()
+    if state and (
+        state.get("after") != after or state.get("activity_scope") != _activity_scope(config)
+    ):
+        state = {"incremental": state.get("incremental")}
+    pending: List[Dict] = []
+    if not state.get("completed"):
+        shards, _resumed = _shards_from_state(state, after, now_ts, shard_years)
+        for shard in shards:
+            if shard.get("completed"):
+                continue
+            upper = shard["next_before"] if shard.get("next_before") is not None else shard["before"]
+            pending.append({"label": shard["label"], "after": shard["after"], "before": upper})
+
+    recent_plan = plan_recent_sync(config, state.get("incremental") or {}, now_ts)
+    recent_range = None
+    if recent_plan["after"] is not None:
+        recent_range = {"after": recent_plan["after"], "before": now_ts}
+
+    store = open_store(RAW_DIR, raw_store_backend(config))
+    timestamps = max(
+        list(store.start_times().values()),
+        normalized_start_times(os.path.join("data", "activities_normalized.json")),
+        key=len,
+    )
+    density = activities_per_day(timestamps, now_ts)
+
+    probe_result = None
+    if probe and pending:
+        widest = max(pending, key=lambda item: item["before"] - max(item["after"], EARLIEST_HISTORY_TS))
+        probe_result = _probe_range(config, widest, per_page, limiter, transport)
+
+    limits = {
+        "read_15": min(limiter.read_15_limit, limiter.overall_15_limit),
+        "read_day": min(limiter.read_day_limit, limiter.overall_day_limit),
+        "safety_buffer": limiter.safety_buffer,
+    }
+    usage = {"read_15": limiter.read_15, "read_day": limiter.read_day}
+    plan = build_plan(
+        "strava",
+        pending,
+        recent_range,
+        per_page,
+        density,
+        now_ts,
+        overhead_requests=0 if _identity_verified(config) else 1,  # /athlete lookup
+        limits=limits,
+        usage=usage,
+        workers=workers,
+        probe=probe_result,
     )
+    plan["recent_mode"] = recent_plan["mode"]
+    return plan
+
+
+def sync_strava(
+    dry_run: bool,
+    prune_deleted: bool,
+    transport: Optional[HttpTransport] = None,
+    event_log: Optional[str] = None,
+    trace_path: Optional[str] = None,
+) -> Dict:
+    return run_sync(
+        RAW_DIR,
+        lambda: _sync_strava(dry_run, prune_deleted, transport, event_log),
+        "strava",
+        trace_path or request_trace_path(load_config()),
+    )
+
+
+def _sync_strava(
+    dry_run: bool,
+    prune_deleted: bool,
+    transport: Optional[HttpTransport] = None,
+    event_log: Optional[str] = None,
+) -> Dict:
+    config = load_config()
+    limiter = _build_limiter(config)
+    try:
+        return _run_strava_sync(config, limiter, dry_run, prune_deleted, transport, event_log)
+    finally:
+        limiter.flush_ledger()
+
+
+def _run_strava_sync(
+    config: Dict,
+    limiter: RateLimiter,
+    dry_run: bool,
+    prune_deleted: bool,
+    transport: Optional[HttpTransport],
+    event_log: Optional[str],
+) -> Dict:
     per_page = int(config.get("sync", {}).get("per_page", 200))
     after = _start_after_ts(config)
     activity_scope = _activity_scope(config)
-    recent_days = int(config.get("sync", {}).get("recent_days", 7))
     resume_backfill = bool(config.get("sync", {}).get("resume_backfill", True))
+    backfill_workers = max(1, int(config.get("sync", {}).get("backfill_workers", 4)))
+    shard_years = max(1, int(config.get("sync", {}).get("backfill_shard_years", 10)))
+    reconcile_requests = max(0, int(config.get("sync", {}).get("prune_reconcile_requests", 20)))
+    event_log = event_log or str(config.get("sync", {}).get("event_log") or "")
 
-    token = _get_access_token(config, limiter)
+    token = _get_access_token(config, limiter, transport=transport)
     if not dry_run:
-        token = _maybe_reset_for_new_athlete(config, token, per_page, limiter)
+        token = _maybe_reset_for_new_athlete(config, token, per_page, limiter, transport)
 
     ensure_dir(RAW_DIR)
+    shared_store(RAW_DIR, raw_store_backend(config))
 
-    recent_summary, token = _sync_recent(
-        config, token, per_page, recent_days, limiter, dry_run
-    )
+    now_ts = int(utc_now().timestamp())
+    persisted_state = _load_state()
+    incremental_state = persisted_state.get("incremental") or {}
 
-    page = 1
-    total = 0
-    new_or_updated = 0
-    fetched_ids = set(recent_summary.get("activity_ids", []))
-    min_ts = None
-    max_ts = None
-    exhausted = False
-    before = None
     skip_backfill = False
     used_resume_cursor = False
-
-    state = _load_state() if resume_backfill and not dry_run else {}
-    state_after: Optional[int] = None
+    state = persisted_state if resume_backfill and not dry_run else {}
     if state:
         try:
             state_after = int(state.get("after"))
@@ -714,133 +1798,185 @@ def sync_strava(dry_run: bool, prune_deleted: bool) -> Dict:
         if state_after != after:
             print("Backfill boundary changed; restarting cursor.")
             state = {}
-            state_after = None
     if state and state.get("activity_scope") != activity_scope:
         print("Activity scope changed; restarting backfill cursor.")
         state = {}
-        state_after = None
     if state and state.get("completed"):
         skip_backfill = True
-    elif state and state_after == after and state.get("next_before") is not None:
-        try:
-            before = int(state["next_before"])
-            if before <= 0:
-                raise ValueError("cursor must be positive epoch seconds")
-            used_resume_cursor = True
-        except (TypeError, ValueError):
-            print("Invalid backfill cursor; restarting from current time.")
-            state = {}
-            state_after = None
-            before = None
-
-    if before is None and not skip_backfill:
-        before = int(utc_now().timestamp())
+        shards: List[Dict] = []
+    else:
+        shards, used_resume_cursor = _shards_from_state(state, after, now_ts, shard_years)
 
-    rate_limited = bool(recent_summary.get("rate_limited"))
-    rate_limit_message = recent_summary.get("rate_limit_message", "")
-
-    if not rate_limited and not skip_backfill:
-        while True:
-            try:
-                activities, token = _run_with_token_refresh(
-                    config,
-                    token,
-                    limiter,
-                    "historical backfill sync",
-                    lambda access_token: _fetch_page(
-                        access_token, per_page, page, after, before, limiter
-                    ),
-                )
-            except RateLimitExceeded as exc:
-                rate_limited = True
-                rate_limit_message = str(exc)
-                break
-            if not activities:
-                exhausted = True
-                break
-            for activity in activities:
-                total += 1
-                activity_id = activity.get("id")
-                if activity_id:
-                    fetched_ids.add(str(activity_id))
-                ts = _activity_start_ts(activity)
-                if ts is not None:
-                    min_ts = ts if min_ts is None else min(min_ts, ts)
-                    max_ts = ts if max_ts is None else max(max_ts, ts)
-                if dry_run:
-                    continue
-                if _write_activity(activity):
-                    new_or_updated += 1
-            page += 1
-
-    can_prune_deleted = (
-        prune_deleted
-        and not dry_run
-        and not skip_backfill
-        and not used_resume_cursor
-        and exhausted
-        and not rate_limited
-    )
+    fetched_ids: set = set()
+    rate_limited = False
+    rate_limit_message = ""
+    # Work kinds that stopped at their budget reserve; not a rate limit.
+    budget_reserved: List[str] = []
+    recent_summary: Dict = {}
+    event_summary: Optional[Dict] = None
+    backfill: Dict = {"fetched": 0, "new_or_updated": 0, "exhausted": False}
     deleted = 0
-    if can_prune_deleted:
-        for filename in os.listdir(RAW_DIR):
-            if not filename.endswith(".json"):
-                continue
-            activity_id = filename[:-5]
-            if activity_id not in fetched_ids:
-                os.remove(os.path.join(RAW_DIR, filename))
-                deleted += 1
-    elif prune_deleted and not dry_run:
-        print(
-            "Skipping prune_deleted: pruning requires a full backfill scan in this run "
-            "(no resume cursor, no rate-limit)."
+    prune_reconcile = None
+
+    def _recent_work() -> None:
+        nonlocal token, incremental_state, recent_summary, event_summary
+        nonlocal rate_limited, rate_limit_message
+        recent_plan = plan_recent_sync(config, incremental_state, now_ts)
+        event_cursor = None
+        if event_log:
+            event_summary, event_cursor, token = _sync_events(
+                config, token, event_log, after, limiter, dry_run, transport
+            )
+            if event_summary["gap"]:
+                print(f"Event log gap ({event_summary['gap']}); polling recent activities too.")
+            elif recent_plan["mode"] != "reconcile":
+                # A gap-free log already holds every change since the last run.
+                # The watermark stays put, so the next gap poll still covers this period.
+                recent_plan = {"mode": "events", "after": None, "reconciled": []}
+        event_rate_limited = bool(event_summary and event_summary["rate_limited"])
+        recent_after = None if event_rate_limited else recent_plan["after"]
+        recent_summary, token = _sync_recent(
+            config, token, per_page, recent_after, limiter, dry_run, transport
+        )
+        recent_summary["mode"] = recent_plan["mode"]
+        incremental_state = advance_incremental_state(
+            incremental_state,
+            recent_plan,
+            recent_summary.get("newest_ts"),
+            now_ts,
+            completed=recent_after is not None and not recent_summary.get("rate_limited"),
         )
+        if event_summary is not None:
+            if event_rate_limited:
+                recent_summary["rate_limited"] = True
+                recent_summary["rate_limit_message"] = event_summary["rate_limit_message"]
+            # Only trust a gap once a poll has covered it.
+            gap_covered = not event_summary["gap"] or (
+                recent_after is not None and not recent_summary.get("rate_limited")
+            )
+            if not dry_run and event_cursor is not None and gap_covered:
+                ensure_dir("data")
+                write_json(EVENT_CURSOR_PATH, event_cursor)
+            fetched_ids.update(event_summary["activity_ids"])
+        fetched_ids.update(recent_summary.get("activity_ids", []))
+        rate_limited = bool(recent_summary.get("rate_limited"))
+        rate_limit_message = recent_summary.get("rate_limit_message", "")
+
+    def _backfill_work() -> None:
+        nonlocal token, backfill, rate_limited, rate_limit_message
+        if rate_limited or skip_backfill:
+            return
+        backfill, token = _run_backfill_shards(
+            config,
+            token,
+            shards,
+            per_page,
+            limiter,
+            backfill_workers,
+            dry_run,
+            transport,
+            _shard_checkpointer(
+                after, shards, activity_scope, persist=not dry_run, incremental=incremental_state
+            ),
+        )
+        fetched_ids.update(backfill["activity_ids"])
+        if backfill["rate_limited"]:
+            rate_limited = True
+            rate_limit_message = backfill["rate_limit_message"]
+        if backfill["budget_reserved"]:
+            budget_reserved.append("backfill")
+            print(f"Backfill paused: {backfill['budget_reserved_message']}")
+
+    def _backfill_completed() -> bool:
+        return True if skip_backfill else all(shard.get("completed") for shard in shards)
+
+    def _reconcile_work() -> None:
+        nonlocal token, deleted, prune_reconcile
+        if not prune_deleted or dry_run:
+            return
+        if (
+            not skip_backfill
+            and not used_resume_cursor
+            and backfill["exhausted"]
+            and not rate_limited
+        ):
+            deleted += prune_unseen(RAW_DIR, fetched_ids)
+        elif _backfill_completed() and not rate_limited and reconcile_requests > 0:
+            prune_reconcile, token = _reconcile_prune(
+                config,
+                token,
+                after,
+                now_ts,
+                shard_years,
+                per_page,
+                limiter,
+                reconcile_requests,
+                transport,
+            )
+            deleted += int(prune_reconcile["deleted"])
+            if prune_reconcile["budget_reserved"]:
+                budget_reserved.append("reconcile")
+                print("Prune reconciliation paused: its budget reserve was reached.")
+        else:
+            print(
+                "Skipping prune_deleted: pruning requires a full backfill scan in this run "
+                "(no resume cursor, no rate-limit) or a completed backfill for ID reconciliation."
+            )
+
+    scheduler = WorkScheduler(budget_reserve_from_config(config), limiter.set_reserve)
+    scheduler.submit("recent", _recent_work)
+    scheduler.submit("backfill", _backfill_work)
+    scheduler.submit("reconcile", _reconcile_work)
+    scheduler.run()
 
-    completed = True if skip_backfill else (exhausted and not rate_limited)
-    next_before = None
-    if not completed and min_ts is not None:
-        next_before = int(min_ts + 1)
+    total = int(backfill["fetched"])
+    new_or_updated = int(backfill["new_or_updated"])
+    completed = _backfill_completed()
+    if event_summary is not None:
+        deleted += int(event_summary["deleted"])
+
+    pending_shards = [shard for shard in shards if not shard.get("completed")]
 
     if not dry_run:
-        if skip_backfill and state:
-            state_update = dict(state)
-            state_update["completed"] = True
-            state_update["rate_limited"] = rate_limited
-            state_update["last_run_utc"] = utc_now().isoformat()
-        elif rate_limited and min_ts is None and state:
-            state_update = dict(state)
-            state_update["rate_limited"] = True
-            state_update["last_run_utc"] = utc_now().isoformat()
-        else:
-            state_update = {
-                "after": after,
-                "next_before": next_before,
-                "completed": completed,
-                "oldest_seen_ts": min_ts,
-                "newest_seen_ts": max_ts,
-                "rate_limited": rate_limited,
-                "last_run_utc": utc_now().isoformat(),
-            }
-        state_update["activity_scope"] = activity_scope
-        _save_state(state_update)
+        _save_state(
+            final_backfill_state(
+                state,
+                skip_backfill,
+                rate_limited,
+                lambda: _backfill_state_from_shards(after, shards, rate_limited),
+                activity_scope,
+                incremental_state,
+            )
+        )
 
     total_fetched = total + int(recent_summary.get("fetched", 0))
     total_new_or_updated = new_or_updated + int(recent_summary.get("new_or_updated", 0))
+    if event_summary is not None:
+        total_fetched += int(event_summary["fetched"])
+        total_new_or_updated += int(event_summary["new_or_updated"])
 
-    summary = {
-        "source": "strava",
-        "fetched": total_fetched,
-        "new_or_updated": total_new_or_updated,
-        "deleted": deleted,
-        "lookback_start_ts": after,
-        "timestamp_utc": utc_now().isoformat(),
-        "rate_limited": rate_limited,
-        "backfill_completed": completed,
-        "backfill_next_before": next_before,
-        "recent_sync": recent_summary,
-    }
+    summary = base_summary(
+        "strava", total_fetched, total_new_or_updated, deleted, after, rate_limited, completed
+    )
+    summary.update(
+        {
+            "backfill_shards_total": len(shards),
+            "backfill_shards_pending": len(pending_shards),
+            "recent_sync": recent_summary,
+            "rate_limiter": limiter.stats(),
+            "scheduler": scheduler.stats(),
+        }
+    )
+    if event_summary is not None:
+        summary["event_log"] = {
+            key: value for key, value in event_summary.items() if key != "activity_ids"
+        }
+    if prune_reconcile is not None:
+        summary["prune_reconcile"] = prune_reconcile
     if rate_limited:
         summary["rate_limit_message"] = rate_limit_message
+    if budget_reserved:
+        summary["budget_reserved"] = budget_reserved
     return summary
 
 
@@ -852,14 +1988,77 @@ def main() -> int:
         action="store_true",
         help="Remove local raw activities not returned by Strava",
     )
+    parser.add_argument(
+        "--record-http",
+        metavar="DIR",
+        help="Record Strava API responses (tokens redacted) into DIR while syncing",
+    )
+    parser.add_argument(
+        "--replay-http",
+        metavar="DIR",
+        help="Serve Strava API responses from a --record-http directory instead of the network",
+    )
+    parser.add_argument(
+        "--api-base",
+        metavar="URL",
+        help="Send Strava API requests to this server instead, e.g. a local scripts/fake_strava.py",
+    )
+    parser.add_argument(
+        "--data-dir",
+        metavar="DIR",
+        help="Keep data/, activities/ and caches under DIR (required with --api-base)",
+    )
+    parser.add_argument(
+        "--event-log",
+        metavar="PATH",
+        help="Apply Strava webhook events from this JSONL log (overrides sync.event_log)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write one JSONL event per API request to PATH (overrides sync.request_trace)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate remaining pages, read budget and ETA without syncing",
+    )
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="With --plan, spend one read request to calibrate the estimate",
+    )
     args = parser.parse_args()
+    if args.api_base and not args.data_dir:
+        parser.error("--api-base needs --data-dir so another server's data stays out of data/ and activities/")
+    if args.data_dir:
+        if os.path.realpath(args.data_dir) == os.path.realpath(os.getcwd()):
+            parser.error("--data-dir must not be the current directory")
+        for name in ("record_http", "replay_http", "event_log", "trace"):
+            if getattr(args, name):
+                setattr(args, name, os.path.abspath(getattr(args, name)))
+        use_data_root(args.data_dir)
 
     config = load_config()
     prune_deleted = args.prune_deleted or bool(
         config.get("sync", {}).get("prune_deleted", False)
     )
 
-    summary = sync_strava(args.dry_run, prune_deleted)
+    transport = transport_from_args(args.record_http, args.replay_http, args.api_base)
+    try:
+        if args.plan:
+            print(json.dumps(plan_strava(args.probe, transport=transport), indent=2))
+            return 0
+        summary = sync_strava(
+            args.dry_run,
+            prune_deleted,
+            transport=transport,
+            event_log=args.event_log,
+            trace_path=args.trace,
+        )
+    finally:
+        if transport is not None:
+            transport.close()
 
     ensure_dir("data")
     if not args.dry_run:
@@ -876,6 +2075,8 @@ def main() -> int:
         )
         if summary.get("rate_limited"):
             message += " [rate limited]"
+        if summary.get("budget_reserved"):
+            message += f" [budget reserved for {', '.join(summary['budget_reserved'])}]"
         with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
             f.write(message + "\n")
 
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils import ensure_dir
+
+SLOWEST_REQUESTS = 5
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(method: str, url: str) -> str:
+    """`GET /api/v3/activities/{id}`: path without host or query, IDs folded."""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?", 1)[0]
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+def response_size(resp: Any) -> Optional[int]:
+    content = getattr(resp, "content", None)
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    length = (getattr(resp, "headers", None) or {}).get("Content-Length")
+    return int(length) if str(length or "").isdigit() else None
+
+
+def request_trace_path(config: Dict[str, Any]) -> Optional[str]:
+    return str((config.get("sync", {}) or {}).get("request_trace") or "") or None
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest rank, so every reported value is one that was observed.
+    index = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _latency_stats(latencies: List[float]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "p50_ms": _percentile(ordered, 50),
+        "p90_ms": _percentile(ordered, 90),
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": ordered[-1],
+    }
+
+
+class RequestTrace:
+    """One structured event per provider API request attempt.
+
+    Events are kept for the run's rollup and, when `path` is set, written to
+    it as JSONL (the file is replaced each run). Fields: ts, source, endpoint,
+    params, attempt, status (None when no response arrived), error,
+    latency_ms, bytes, wait_seconds (pacing sleep before the attempt),
+    retry_sleep_seconds (backoff after it) and budget_remaining.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None) -> None:
+        self.source = source
+        self.path = path
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            ensure_dir(os.path.dirname(path) or ".")
+            self._file = open(path, "w", encoding="utf-8")
+
+    def record(
+        self,
+        endpoint: str,
+        *,
+        started: float,
+        latency_seconds: float,
+        status: Optional[int] = None,
+        attempt: int = 1,
+        params: Optional[Dict[str, Any]] = None,
+        size: Optional[int] = None,
+        wait_seconds: float = 0.0,
+        retry_sleep_seconds: float = 0.0,
+        budget_remaining: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        event = {
+            "ts": round(started, 3),
+            "source": self.source,
+            "endpoint": endpoint,
+            "params": params or {},
+            "attempt": attempt,
+            "status": status,
+            "error": error,
+            "latency_ms": round(latency_seconds * 1000.0, 1),
+            "bytes": size,
+            "wait_seconds": round(wait_seconds, 3),
+            "retry_sleep_seconds": round(retry_sleep_seconds, 3),
+            "budget_remaining": budget_remaining,
+        }
+        with self._lock:
+            self.events.append(event)
+            if self._file is not None:
+                self._file.write(json.dumps(event, sort_keys=True, separators=(",", ":")) + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+        by_endpoint: Dict[str, List[float]] = {}
+        statuses: Dict[str, int] = {}
+        for event in events:
+            by_endpoint.setdefault(event["endpoint"], []).append(event["latency_ms"])
+            key = str(event["status"]) if event["status"] is not None else "error"
+            statuses[key] = statuses.get(key, 0) + 1
+        slowest = sorted(events, key=lambda event: event["latency_ms"], reverse=True)
+        return {
+            "attempts": len(events),
+            "retries": sum(1 for event in events if event["attempt"] > 1),
+            "statuses": dict(sorted(statuses.items())),
+            "bytes": sum(event["bytes"] or 0 for event in events),
+            "wait_seconds": round(sum(event["wait_seconds"] for event in events), 3),
+            "retry_sleep_seconds": round(sum(event["retry_sleep_seconds"] for event in events), 3),
+            "latency": _latency_stats([event["latency_ms"] for event in events]),
+            "endpoints": {
+                endpoint: _latency_stats(latencies)
+                for endpoint, latencies in sorted(by_endpoint.items())
+            },
+            "slowest": [
+                {key: event[key] for key in ("endpoint", "params", "status", "latency_ms")}
+                for event in slowest[:SLOWEST_REQUESTS]
+            ],
+            "trace_path": self.path,
+        }
+
+
+_active_trace: Optional[RequestTrace] = None
+_active_lock = threading.Lock()
+
+
+def start_trace(source: str, path: Optional[str] = None) -> RequestTrace:
+    global _active_trace
+    trace = RequestTrace(source, path)
+    with _active_lock:
+        _active_trace = trace
+    return trace
+
+
+def active_trace() -> Optional[RequestTrace]:
+    """The trace of the sync running in this process, if any."""
+    return _active_trace
+
+
+def finish_trace(trace: RequestTrace) -> Dict[str, Any]:
+    global _active_trace
+    with _active_lock:
+        if _active_trace is trace:
+            _active_trace = None
+    trace.close()
+    return trace.stats()
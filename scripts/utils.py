@@ -53,6 +53,15 @@ def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+def use_data_root(path: str) -> None:
+    """Keep data/, activities/ and caches under path; config still comes from here."""
+    global CONFIG_PATH, CONFIG_LOCAL_PATH
+    CONFIG_PATH = os.path.abspath(CONFIG_PATH)
+    CONFIG_LOCAL_PATH = os.path.abspath(CONFIG_LOCAL_PATH)
+    ensure_dir(path)
+    os.chdir(path)
+
+
 def read_json(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
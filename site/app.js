@@ -1397,6 +1397,28 @@ function weekOfYear(date, weekStart = WEEK_START_SUNDAY) {
   return weekIndexFromSundayStart(date, start) + 1;
 }
 
+function activityWeekdayRow(activity, date, weekStart) {
+  // Normalize stores the ISO weekday (Monday=1..Sunday=7); older payloads lack it.
+  const isoWeekday = Number(activity.weekday);
+  if (Number.isInteger(isoWeekday) && isoWeekday >= 1 && isoWeekday <= 7) {
+    return weekdayRowFromStart(isoWeekday % 7, weekStart);
+  }
+  return weekdayRowFromStart(date.getDay(), weekStart);
+}
+
+function activityWeekOfYear(activity, date, weekStart, payloadWeekStart) {
+  // The stored week follows the week start the payload was built with.
+  const week = Number(activity.week);
+  if (
+    normalizeWeekStart(weekStart) === normalizeWeekStart(payloadWeekStart)
+    && Number.isInteger(week)
+    && week >= 1
+  ) {
+    return week;
+  }
+  return weekOfYear(date, weekStart);
+}
+
 function utcDateFromParts(year, monthIndex, dayOfMonth) {
   return new Date(Date.UTC(year, monthIndex, dayOfMonth));
 }
@@ -3884,9 +3906,9 @@ function buildStatsOverview(payload, types, years, color, options = {}) {
         type: activity.type,
         subtype: getActivitySubtypeLabel(activity),
         year,
-        dayIndex: weekdayRowFromStart(date.getDay(), weekStart),
+        dayIndex: activityWeekdayRow(activity, date, weekStart),
         monthIndex: date.getMonth(),
-        weekIndex: weekOfYear(date, weekStart),
+        weekIndex: activityWeekOfYear(activity, date, weekStart, payload.week_start || payload.weekStart),
         hour: hasHour ? hourValue : null,
         active_days: 1,
         distance: perActivityMetricValue("distance"),
@@ -1,6 +1,7 @@
 import os
 import sys
 import unittest
+from unittest import mock
 
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -75,6 +76,38 @@ class ActivityTypesTests(unittest.TestCase):
         self.assertIn("label", meta["OtherSports"])
         self.assertIn("accent", meta["OtherSports"])
 
+    def test_type_resolver_matches_free_functions_and_memoizes(self) -> None:
+        config = {
+            "types": ["Run", "Ride", "Walk"],
+            "group_aliases": {"Kitesurf": "Ride"},
+            "type_aliases": {"Workout": "WeightTraining"},
+            "include_all_types": False,
+            "exclude_types": ["Walk"],
+        }
+        resolver = activity_types.TypeResolver.from_config(config)
+        raw_types = ["trail running", "Workout", "Kitesurf", "VirtualRow", "Soccer", "", "Yoga"]
+        raw_types += list(activity_types.GARMIN_TYPE_ALIASES_BY_SLUG)
+
+        for source in ("strava", "garmin"):
+            for raw_type in raw_types:
+                canonical = activity_types.canonicalize_activity_type(raw_type, source=source)
+                expected = activity_types.normalize_activity_type(
+                    config["type_aliases"].get(raw_type, config["type_aliases"].get(canonical, canonical)),
+                    featured_types=config["types"],
+                    group_other_types=True,
+                    other_bucket="OtherSports",
+                    group_aliases=config["group_aliases"],
+                )
+                self.assertEqual(resolver.resolve(raw_type, source), expected, (raw_type, source))
+
+        with mock.patch("activity_types.canonicalize_activity_type", wraps=activity_types.canonicalize_activity_type) as canonical_mock:
+            for _ in range(3):
+                resolver.resolve("Morning Jog", "strava")
+        self.assertEqual(canonical_mock.call_count, 1)
+        self.assertFalse(resolver.keeps("Walk"))
+        self.assertFalse(resolver.keeps("OtherSports"))
+        self.assertTrue(resolver.keeps("Ride"))
+
 
 if __name__ == "__main__":
     unittest.main()
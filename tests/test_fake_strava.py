@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+import fake_strava  # noqa: E402
+
+NOW_TS = 1_760_000_000
+AUTH = {"Authorization": "Bearer fake-access-7"}
+
+
+def _list(fake, **params):
+    query = {key: [str(value)] for key, value in params.items()}
+    return fake.handle("GET", "/api/v3/athlete/activities", query, AUTH, b"")
+
+
+class FakeStravaTests(unittest.TestCase):
+    def test_activity_listing_follows_strava_paging_and_ordering(self) -> None:
+        fake = fake_strava.FakeStrava({7: 120}, years=1, now_ts=NOW_TS)
+        starts = fake.starts[7]
+
+        status, headers, newest = _list(fake, per_page=50, page=1)
+        _status, _headers, last = _list(fake, per_page=50, page=3)
+        _status, _headers, window = _list(fake, before=starts[60], after=starts[9], per_page=200)
+        _status, _headers, ascending = _list(fake, after=starts[99], per_page=200)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(newest), 50)
+        self.assertEqual(newest[0]["id"], fake.activities[7][-1]["id"])
+        self.assertEqual(len(last), 20)
+        self.assertEqual(len(window), 50)
+        self.assertGreater(window[0]["start_date"], window[-1]["start_date"])
+        self.assertEqual([item["id"] for item in ascending], [item["id"] for item in fake.activities[7][100:]])
+        self.assertEqual(headers["X-ReadRateLimit-Usage"], "1,1")
+
+    def test_spent_budget_and_bad_tokens_are_rejected(self) -> None:
+        fake = fake_strava.FakeStrava({7: 3}, now_ts=NOW_TS, read_limits=(2, 10))
+        self.assertEqual(_list(fake)[0], 200)
+        self.assertEqual(_list(fake)[0], 200)
+        status, headers, _body = _list(fake)
+        unauthorized = fake.handle(
+            "GET", "/api/v3/athlete", {}, {"Authorization": "Bearer nope"}, b""
+        )
+
+        self.assertEqual(status, 429)
+        self.assertEqual(headers["X-ReadRateLimit-Limit"], "2,10")
+        self.assertEqual(unauthorized[0], 401)
+        self.assertEqual(fake.stats()["rate_limited"], 1)
+
+    def test_injected_failures_follow_configured_rates(self) -> None:
+        fake = fake_strava.FakeStrava(
+            {7: 1},
+            now_ts=NOW_TS,
+            limits=(10**6, 10**6),
+            read_limits=(10**6, 10**6),
+            throttle_rate=0.2,
+            error_rate=0.1,
+            seed=3,
+        )
+        statuses = [fake.handle("GET", "/api/v3/athlete", {}, AUTH, b"")[0] for _ in range(2000)]
+
+        self.assertAlmostEqual(statuses.count(429) / 2000, 0.2, delta=0.04)
+        self.assertAlmostEqual(sum(status >= 500 for status in statuses) / 2000, 0.1, delta=0.03)
+
+    def test_server_issues_tokens_and_serves_activities_over_http(self) -> None:
+        fake = fake_strava.FakeStrava({7: 5, 8: 2}, now_ts=NOW_TS)
+        server = fake_strava.make_server(fake, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            form = urlencode({"refresh_token": "fake-refresh-8", "grant_type": "refresh_token"})
+            with urlopen(Request(f"{base_url}/oauth/token", data=form.encode("utf-8"))) as resp:
+                token = json.loads(resp.read())
+            request = Request(
+                f"{base_url}/api/v3/athlete/activities?per_page=10",
+                headers={"Authorization": f"Bearer {token['access_token']}"},
+            )
+            with urlopen(request) as resp:
+                activities = json.loads(resp.read())
+                usage = resp.headers["X-RateLimit-Usage"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(token["athlete"], {"id": 8})
+        self.assertEqual(len(activities), 2)
+        self.assertEqual(usage, "1,1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -98,6 +98,39 @@ class FrequencyLayoutContractTests(unittest.TestCase):
             self.app_js,
         )
 
+    def test_stored_activity_week_is_only_used_for_the_payload_week_start(self) -> None:
+        names = [
+            "normalizeWeekStart",
+            "localDayNumber",
+            "weekIndexFromSundayStart",
+            "weekStartOnOrBeforeLocal",
+            "weekOfYear",
+            "weekdayRowFromStart",
+            "activityWeekOfYear",
+        ]
+        sources = []
+        for name in names:
+            match = re.search(rf"function {name}\([^)]*\)\s*{{[\s\S]*?\n}}\n", self.app_js)
+            self.assertIsNotNone(match, name)
+            sources.append(match.group(0))
+        script = (
+            'const WEEK_START_SUNDAY = "sunday";\n'
+            'const WEEK_START_MONDAY = "monday";\n'
+            "const MS_PER_DAY = 86400000;\n"
+            + "".join(sources)
+            + "const date = new Date(2026, 0, 4);\n"
+            "const activity = { week: 2 };\n"
+            "process.stdout.write(JSON.stringify([\n"
+            '  activityWeekOfYear(activity, date, "sunday", "sunday"),\n'
+            '  activityWeekOfYear(activity, date, "monday", "sunday"),\n'
+            '  activityWeekOfYear({}, date, "monday", "monday"),\n'
+            "]));\n"
+        )
+        completed = subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True)
+
+        # 2026-01-04 is a Sunday: week 2 from Sunday, still week 1 from Monday.
+        self.assertEqual(json.loads(completed.stdout), [2, 1, 1])
+
     def test_frequency_card_builder_receives_setup_week_start(self) -> None:
         matches = re.findall(
             r"buildStatsOverview\(payload,\s*(?:types|\[type\]),\s*cardYears,\s*frequencyCardColor,\s*{\s*units: currentUnits,\s*weekStart: setupWeekStart,",
@@ -146,6 +146,37 @@ class GenerateHeatmapsRenderContractTests(unittest.TestCase):
         self.assertIsNone(activities[1]["hour"])
         self.assertNotIn("url", activities[0])
 
+    def test_load_activities_uses_stored_time_fields_for_week_start(self) -> None:
+        rows = [
+            {
+                "id": "1",
+                "date": "2026-02-15",
+                "year": 2026,
+                "type": "Run",
+                "raw_type": "Run",
+                "start_date_local": "2026-02-15T06:30:00",
+                "hour": 6,
+                "weekday": 7,
+                "week_sun": 8,
+                "week_mon": 7,
+            },
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            activities_path = os.path.join(tmpdir, "activities_normalized.json")
+            with open(activities_path, "w", encoding="utf-8") as handle:
+                json.dump(rows, handle)
+
+            with (
+                mock.patch("generate_heatmaps.ACTIVITIES_PATH", activities_path),
+                mock.patch("generate_heatmaps.parse_iso_datetime") as parse_mock,
+            ):
+                sunday = generate_heatmaps._load_activities()
+                monday = generate_heatmaps._load_activities(week_start="monday")
+
+        parse_mock.assert_not_called()
+        self.assertEqual((sunday[0]["hour"], sunday[0]["weekday"], sunday[0]["week"]), (6, 7, 8))
+        self.assertEqual(monday[0]["week"], 7)
+
     def test_load_activities_includes_strava_urls_when_enabled(self) -> None:
         rows = [
             {
@@ -331,7 +362,7 @@ class GenerateHeatmapsRenderContractTests(unittest.TestCase):
             {
                 "source": "strava",
                 "include_strava_activity_urls": True,
-                "extra_kwargs": {},
+                "extra_kwargs": {"week_start": "sunday"},
             },
         )
 
@@ -416,7 +447,7 @@ class GenerateHeatmapsRenderContractTests(unittest.TestCase):
             {
                 "source": "garmin",
                 "include_garmin_activity_urls": True,
-                "extra_kwargs": {},
+                "extra_kwargs": {"week_start": "sunday"},
             },
         )
 
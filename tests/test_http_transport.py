@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+
+requests_stub = types.ModuleType("requests")
+
+
+class _RequestException(Exception):
+    pass
+
+
+class _HTTPError(_RequestException):
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+requests_stub.RequestException = _RequestException
+requests_stub.HTTPError = _HTTPError
+sys.modules.setdefault("requests", requests_stub)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import http_transport  # noqa: E402
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, payload, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+
+class HttpTransportTests(unittest.TestCase):
+    def test_replay_serves_recorded_responses_in_order(self) -> None:
+        inner = mock.Mock()
+        inner.request.side_effect = [
+            _FakeResponse(429, {"message": "slow down"}, {"Retry-After": "1"}),
+            _FakeResponse(
+                200,
+                [{"id": 1}],
+                {"X-ReadRateLimit-Usage": "5,50", "Set-Cookie": "secret"},
+            ),
+        ]
+        url = "https://www.strava.com/api/v3/athlete/activities"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recorder = http_transport.ReplayTransport(tmpdir, mode="record", inner=inner)
+            for _ in range(2):
+                recorder.request("GET", url, params={"page": 1, "per_page": 50}, timeout=30)
+
+            replay = http_transport.ReplayTransport(tmpdir, mode="replay")
+            first = replay.request("GET", url, params={"per_page": 50, "page": 1})
+            second = replay.request("GET", url, params={"per_page": 50, "page": 1})
+            third = replay.request("GET", url, params={"per_page": 50, "page": 1})
+
+            with self.assertRaises(http_transport.requests.RequestException) as missing:
+                replay.request("GET", url, params={"page": 2})
+        self.assertIsInstance(missing.exception, http_transport.MissingRecording)
+
+        self.assertTrue(replay.offline)
+        self.assertEqual(first.status_code, 429)
+        with self.assertRaises(http_transport.requests.HTTPError):
+            first.raise_for_status()
+        self.assertEqual(second.json(), [{"id": 1}])
+        self.assertEqual(second.headers, {"X-ReadRateLimit-Usage": "5,50"})
+        self.assertEqual(third.json(), [{"id": 1}])
+
+    def test_record_redacts_oauth_tokens(self) -> None:
+        inner = mock.Mock()
+        inner.request.return_value = _FakeResponse(
+            200,
+            {"access_token": "live-access", "refresh_token": "live-refresh", "expires_at": 10},
+        )
+        url = "https://www.strava.com/oauth/token"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recorder = http_transport.ReplayTransport(tmpdir, mode="record", inner=inner)
+            live = recorder.request("POST", url, data={"refresh_token": "secret"})
+            replayed = http_transport.ReplayTransport(tmpdir).request("POST", url)
+
+        self.assertEqual(live.json()["access_token"], "live-access")
+        self.assertEqual(
+            replayed.json(),
+            {"access_token": "redacted", "refresh_token": "redacted", "expires_at": 10},
+        )
+
+    def test_transport_from_args_rejects_both_modes(self) -> None:
+        self.assertIsNone(http_transport.transport_from_args(None, None))
+        with self.assertRaises(ValueError):
+            http_transport.transport_from_args("a", "b")
+
+    def test_api_base_rebases_strava_urls_and_counts_as_offline(self) -> None:
+        inner = mock.Mock()
+        transport = http_transport.RebasedTransport("http://127.0.0.1:8788/", inner=inner)
+        transport.request("GET", "https://www.strava.com/api/v3/athlete", params={"a": 1})
+
+        inner.request.assert_called_once_with("GET", "http://127.0.0.1:8788/api/v3/athlete", params={"a": 1})
+        self.assertTrue(transport.offline)
+        with self.assertRaises(ValueError):
+            http_transport.transport_from_args(None, "replay", "http://127.0.0.1:8788")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recording = http_transport.transport_from_args(tmpdir, None, "http://127.0.0.1:8788")
+        self.assertTrue(recording.offline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import json
 import os
 import sys
+import tempfile
 import types
 import unittest
 from datetime import datetime, timezone
@@ -17,6 +19,7 @@ sys.modules.setdefault("yaml", yaml_stub)
 
 import aggregate  # noqa: E402
 import normalize  # noqa: E402
+import raw_store  # noqa: E402
 
 
 class NormalizeAndAggregateTests(unittest.TestCase):
@@ -49,11 +52,199 @@ class NormalizeAndAggregateTests(unittest.TestCase):
         self.assertEqual(normalized["elevation_gain"], 50.0)
         self.assertEqual(normalized["name"], "Morning Session")
 
+    def test_normalize_activity_stores_derived_time_fields(self) -> None:
+        activity = {
+            "id": 9,
+            "start_date_local": "2026-02-15T06:30:00",
+            "start_date": "2026-02-15 14:30:00",
+            "sport_type": "Run",
+        }
+
+        normalized = normalize._normalize_activity(activity, {}, "garmin")
+
+        self.assertEqual(normalized["hour"], 6)
+        self.assertEqual(normalized["weekday"], 7)
+        self.assertEqual(normalized["week_sun"], 8)
+        self.assertEqual(normalized["week_mon"], 7)
+
     def test_normalize_activity_returns_empty_when_missing_required_fields(self) -> None:
         self.assertEqual(normalize._normalize_activity({}, {}, "strava"), {})
         self.assertEqual(normalize._normalize_activity({"id": "x"}, {}, "strava"), {})
         self.assertEqual(normalize._normalize_activity({"start_date_local": "2026-01-01T00:00:00Z"}, {}, "strava"), {})
 
+    def test_normalize_reads_activities_from_segmented_store(self) -> None:
+        config = {"source": "strava", "sync": {"raw_store": "segments"}}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = raw_store.SegmentedActivityStore(normalize.raw_activity_dir("strava"))
+                for activity_id, day in [(2, "02"), (1, "01")]:
+                    store.put(
+                        str(activity_id),
+                        {
+                            "id": activity_id,
+                            "start_date_local": f"2026-02-{day}T08:00:00Z",
+                            "sport_type": "Run",
+                            "distance": 1000,
+                            "moving_time": 300,
+                        },
+                    )
+                store.flush()
+                with mock.patch("normalize.load_config", return_value=config):
+                    items = normalize.normalize()
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual([item["id"] for item in items], ["1", "2"])
+        self.assertEqual(items[0]["date"], "2026-02-01")
+
+    def test_normalize_reprocesses_only_changed_raw_files(self) -> None:
+        config = {"source": "strava"}
+
+        def run():
+            with (
+                mock.patch("normalize.load_config", return_value=config),
+                mock.patch("normalize._normalize_activity", wraps=normalize._normalize_activity) as parse_mock,
+            ):
+                items = normalize.normalize()
+            return items, sorted(call.args[0]["id"] for call in parse_mock.call_args_list)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = raw_store.RawActivityStore(normalize.raw_activity_dir("strava"))
+                for activity_id in (1, 2, 3):
+                    store.put(
+                        str(activity_id),
+                        {"id": activity_id, "start_date_local": f"2026-02-0{activity_id}T08:00:00Z", "sport_type": "Run"},
+                    )
+                _items, first = run()
+                _items, unchanged = run()
+                store.put("2", {"id": 2, "start_date_local": "2026-02-02T08:00:00Z", "sport_type": "Ride"})
+                os.remove(os.path.join(normalize.raw_activity_dir("strava"), "3.json"))
+                items, changed = run()
+                config["activities"] = {"group_other_types": False, "type_aliases": {"Ride": "Spin"}}
+                retyped, rebuilt = run()
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(first, [1, 2, 3])
+        self.assertEqual(unchanged, [])
+        self.assertEqual(changed, [2])
+        # Removed raw files keep their normalized history, as before.
+        self.assertEqual([(item["id"], item["type"]) for item in items], [("1", "Run"), ("2", "Ride"), ("3", "Run")])
+        self.assertEqual(rebuilt, [1, 2])
+        self.assertEqual(retyped[1]["type"], "Spin")
+
+    def test_normalize_manifest_tracks_the_output_file_not_its_mtime(self) -> None:
+        config = {"source": "strava"}
+
+        def run():
+            with (
+                mock.patch("normalize.load_config", return_value=config),
+                mock.patch("normalize._normalize_activity", wraps=normalize._normalize_activity) as parse_mock,
+            ):
+                normalize.normalize()
+            return sorted(call.args[0]["id"] for call in parse_mock.call_args_list)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = raw_store.RawActivityStore(normalize.raw_activity_dir("strava"))
+                for activity_id in (1, 2):
+                    store.put(
+                        str(activity_id),
+                        {"id": activity_id, "start_date_local": f"2026-02-0{activity_id}T08:00:00Z", "sport_type": "Run"},
+                    )
+                run()
+                # A checkout rewrites the same bytes with a new mtime.
+                with open(normalize.OUT_PATH, "rb") as handle:
+                    content = handle.read()
+                os.utime(normalize.OUT_PATH, ns=(1, 1))
+                restored = run()
+                with open(normalize.OUT_PATH, "wb") as handle:
+                    handle.write(content.replace(b'"Run"', b'"Ran"', 1))
+                edited = run()
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(restored, [])
+        self.assertEqual(edited, [1, 2])
+
+    def test_retyping_pass_only_covers_new_items_while_mapping_is_unchanged(self) -> None:
+        config = {"source": "strava", "activities": {"types": ["Run", "Ride"]}}
+        resolve = normalize.TypeResolver.resolve
+
+        def run():
+            with (
+                mock.patch("normalize.load_config", return_value=config),
+                mock.patch.object(normalize.TypeResolver, "resolve", autospec=True, side_effect=resolve) as resolve_mock,
+            ):
+                items = normalize.normalize()
+            return items, sorted(call.args[1] for call in resolve_mock.call_args_list)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = raw_store.RawActivityStore(normalize.raw_activity_dir("strava"))
+                store.put("1", {"id": 1, "start_date_local": "2026-02-01T08:00:00Z", "sport_type": "Run"})
+                store.put("2", {"id": 2, "start_date_local": "2026-02-02T08:00:00Z", "sport_type": "Hike"})
+                _items, first = run()
+                store.put("3", {"id": 3, "start_date_local": "2026-02-03T08:00:00Z", "sport_type": "GravelRide"})
+                _items, incremental = run()
+                with mock.patch("activity_types.TYPE_RESOLVER_VERSION", 99):
+                    items, bumped = run()
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(first, ["Hike", "Run"])
+        self.assertEqual(incremental, ["GravelRide"])
+        self.assertEqual(bumped, ["GravelRide", "Hike", "Run"])
+        self.assertEqual([item["type"] for item in items], ["Run", "OtherSports", "Ride"])
+
+    def test_parallel_normalize_matches_serial_output(self) -> None:
+        def run(workers, backend):
+            config = {"source": "strava", "sync": {"normalize_workers": workers, "raw_store": backend}}
+            with tempfile.TemporaryDirectory() as tmpdir:
+                old_cwd = os.getcwd()
+                os.chdir(tmpdir)
+                try:
+                    store = raw_store.open_store(normalize.raw_activity_dir("strava"), backend)
+                    for index in range(23):
+                        store.put(
+                            str(1000 + index),
+                            {
+                                "id": 1000 + index,
+                                "start_date_local": f"2025-0{index % 9 + 1}-1{index % 7}T0{index % 10}:00:00Z",
+                                "sport_type": ["Run", "Ride", "Workout", "Kitesurf"][index % 4],
+                                "distance": index * 100.5,
+                                "moving_time": index * 60,
+                            },
+                        )
+                    store.flush()
+                    with (
+                        mock.patch("normalize.load_config", return_value=config),
+                        mock.patch("normalize.PARALLEL_MIN_ACTIVITIES", 10),
+                        mock.patch("normalize.PARALLEL_CHUNK_SIZE", 4),
+                        mock.patch("normalize.ProcessPoolExecutor", wraps=normalize.ProcessPoolExecutor) as pool_mock,
+                    ):
+                        items = normalize.normalize()
+                finally:
+                    os.chdir(old_cwd)
+            return json.dumps(items, sort_keys=True), pool_mock.called
+
+        for backend in ("files", "segments"):
+            serial, serial_pooled = run(1, backend)
+            parallel, parallel_pooled = run(2, backend)
+            self.assertFalse(serial_pooled)
+            self.assertTrue(parallel_pooled)
+            self.assertEqual(parallel, serial)
+            self.assertEqual(len(json.loads(parallel)), 23)
+
     def test_aggregate_groups_by_day_and_filters_types(self) -> None:
         config = {
             "activities": {
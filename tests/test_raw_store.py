@@ -0,0 +1,187 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import raw_store  # noqa: E402
+
+
+class RawActivityStoreTests(unittest.TestCase):
+    def test_unchanged_put_skips_file_read_when_manifest_matches(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.RawActivityStore(tmpdir)
+            self.assertTrue(store.put("1", {"id": 1, "name": "Run"}))
+            store.flush()
+
+            reopened = raw_store.RawActivityStore(tmpdir)
+            with mock.patch("raw_store.read_json", side_effect=AssertionError("read")):
+                self.assertFalse(reopened.put("1", {"name": "Run", "id": 1}))
+            self.assertEqual(reopened.changed_ids, set())
+
+            self.assertTrue(reopened.put("1", {"id": 1, "name": "Ride"}))
+            self.assertEqual(reopened.changed_ids, {"1"})
+
+    def test_missing_manifest_entry_falls_back_to_content_compare(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            raw_store.write_json(os.path.join(tmpdir, "7.json"), {"id": 7})
+            store = raw_store.RawActivityStore(tmpdir)
+
+            self.assertFalse(store.put("7", {"id": 7}))
+            store.flush()
+
+            manifest = raw_store.read_json(store.manifest_path)
+            self.assertEqual(
+                manifest["activities"]["7"]["sha256"], raw_store.content_hash({"id": 7})
+            )
+
+    def test_external_edit_invalidates_manifest_entry(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.RawActivityStore(tmpdir)
+            store.put("3", {"id": 3})
+            path = os.path.join(tmpdir, "3.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"id": 3, "edited": true}\n')
+
+            self.assertTrue(store.put("3", {"id": 3}))
+            self.assertEqual(raw_store.read_json(path), {"id": 3})
+
+    def test_remove_drops_file_and_manifest_entry(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.RawActivityStore(tmpdir)
+            store.put("5", {"id": 5})
+            self.assertTrue(store.remove("5"))
+            self.assertFalse(store.remove("5"))
+            store.flush()
+
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, "5.json")))
+            self.assertEqual(raw_store.read_json(store.manifest_path)["activities"], {})
+
+    def test_start_times_fill_in_entries_missing_from_manifest(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            raw_store.write_json(
+                os.path.join(tmpdir, "9.json"), {"id": 9, "start_date": "2026-01-02T00:00:00Z"}
+            )
+            store = raw_store.RawActivityStore(tmpdir)
+            store.put("8", {"id": 8})
+
+            self.assertEqual(store.start_times(), {"8": None, "9": 1767312000})
+            with mock.patch("raw_store.read_json", side_effect=AssertionError("read")):
+                self.assertEqual(store.start_times()["9"], 1767312000)
+
+
+class SegmentedActivityStoreTests(unittest.TestCase):
+    def test_put_remove_and_reopen_from_index(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.SegmentedActivityStore(tmpdir)
+            self.assertTrue(store.put("1", {"id": 1}))
+            self.assertTrue(store.put("2", {"id": 2}))
+            self.assertFalse(store.put("1", {"id": 1}))
+            self.assertTrue(store.put("1", {"id": 1, "name": "Edited"}))
+            self.assertTrue(store.remove("2"))
+            self.assertFalse(store.remove("2"))
+            store.flush()
+
+            reopened = raw_store.SegmentedActivityStore(tmpdir)
+            self.assertEqual(reopened.ids(), ["1"])
+            self.assertEqual(reopened.get("1"), {"id": 1, "name": "Edited"})
+            self.assertEqual(list(reopened.iter_activities()), [("1", {"id": 1, "name": "Edited"})])
+            self.assertFalse(reopened.put("1", {"name": "Edited", "id": 1}))
+
+    def test_unflushed_tail_is_rescanned_and_torn_record_dropped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.SegmentedActivityStore(tmpdir)
+            store.put("1", {"id": 1})
+            store.flush()
+            store.put("2", {"id": 2})
+            segment = os.path.join(store.segments_dir, "000001.log")
+            with open(segment, "ab") as f:
+                f.write(b'{"id": "3", "activ')
+
+            reopened = raw_store.SegmentedActivityStore(tmpdir)
+            self.assertEqual(reopened.ids(), ["1", "2"])
+            self.assertTrue(reopened.put("3", {"id": 3}))
+            self.assertEqual(reopened.get("3"), {"id": 3})
+
+    def test_segments_rotate_and_compaction_drops_dead_records(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = raw_store.SegmentedActivityStore(tmpdir, max_segment_bytes=120)
+            for activity_id in range(6):
+                store.put(str(activity_id), {"id": activity_id, "pad": "x" * 20})
+            for activity_id in range(4):
+                store.remove(str(activity_id))
+            self.assertGreater(len(store._segments_on_disk()), 1)
+
+            self.assertTrue(store.compact())
+            self.assertFalse(store.compact())
+            self.assertEqual(store.ids(), ["4", "5"])
+            self.assertEqual(store.get("5"), {"id": 5, "pad": "x" * 20})
+
+            reopened = raw_store.SegmentedActivityStore(tmpdir)
+            self.assertEqual(reopened.ids(), ["4", "5"])
+            self.assertEqual(dict(reopened.iter_activities())["4"], {"id": 4, "pad": "x" * 20})
+
+    def test_migrate_store_converts_files_to_segments_and_back(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = raw_store.RawActivityStore(tmpdir)
+            files.put("10", {"id": 10})
+            files.put("11", {"id": 11})
+            files.flush()
+
+            self.assertEqual(raw_store.migrate_store(tmpdir, "segments"), 2)
+            self.assertEqual(raw_store.RawActivityStore(tmpdir).ids(), [])
+            segments = raw_store.SegmentedActivityStore(tmpdir)
+            self.assertEqual(dict(segments.iter_activities()), {"10": {"id": 10}, "11": {"id": 11}})
+            self.assertEqual(raw_store.migrate_store(tmpdir, "segments"), 0)
+
+            self.assertEqual(raw_store.migrate_store(tmpdir, "files"), 2)
+            self.assertEqual(raw_store.SegmentedActivityStore(tmpdir).ids(), [])
+            self.assertEqual(raw_store.read_json(os.path.join(tmpdir, "11.json")), {"id": 11})
+
+    def test_index_lives_in_data_and_outlasts_the_raw_directory(self) -> None:
+        for backend in ("files", "segments"):
+            with self.subTest(backend=backend), tempfile.TemporaryDirectory() as tmpdir:
+                old_cwd = os.getcwd()
+                os.chdir(tmpdir)
+                try:
+                    directory = os.path.join("activities", "raw", "strava")
+                    store = raw_store.open_store(directory, backend)
+                    store.put("1", {"id": 1})
+                    store.put("2", {"id": 2})
+                    store.flush()
+                    # CI persists data/ but starts every run without activities/raw.
+                    raw_store.shutil.rmtree(os.path.join("activities", "raw"))
+
+                    reopened = raw_store.open_store(directory, backend)
+                    self.assertFalse(reopened.put("1", {"id": 1}))
+                    self.assertTrue(reopened.put("2", {"id": 2, "name": "Edited"}))
+                    self.assertEqual(reopened.changed_ids, {"2"})
+                    reopened.flush()
+                    self.assertFalse(raw_store.open_store(directory, backend).put("1", {"id": 1}))
+
+                    raw_store.discard_store(directory)
+                    self.assertFalse(os.path.exists(os.path.join("data", "raw_index", "strava")))
+                    self.assertTrue(raw_store.open_store(directory, backend).put("1", {"id": 1}))
+                finally:
+                    os.chdir(old_cwd)
+
+    def test_raw_store_backend_validates_config(self) -> None:
+        self.assertEqual(raw_store.raw_store_backend({}), "files")
+        self.assertEqual(raw_store.raw_store_backend({"sync": {"raw_store": "Segments"}}), "segments")
+        with self.assertRaises(ValueError):
+            raw_store.raw_store_backend({"sync": {"raw_store": "sqlite"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -49,7 +49,6 @@ class RunPipelineSourceSwitchTests(unittest.TestCase):
             mock.patch("run_pipeline._reset_for_source_switch") as reset_mock,
             mock.patch("run_pipeline._sync_for_source", return_value={"ok": True}),
             mock.patch("run_pipeline.normalize_func", return_value=[]),
-            mock.patch("run_pipeline._write_normalized"),
             mock.patch("run_pipeline.aggregate_func", return_value={}),
             mock.patch("run_pipeline._write_aggregates"),
             mock.patch("run_pipeline.generate_heatmaps"),
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import strava_events  # noqa: E402
+
+
+def _event(object_id, aspect="create", object_type="activity"):
+    return {"object_type": object_type, "object_id": object_id, "aspect_type": aspect, "owner_id": 7}
+
+
+class StravaEventLogTests(unittest.TestCase):
+    def test_read_events_resumes_from_cursor_without_gap(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "events.jsonl")
+            strava_events.append_event(path, _event(1))
+            first, cursor, gap = strava_events.read_events(path, None)
+            strava_events.append_event(path, _event(2, "update"))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(_event(3)))  # still being written
+            second, next_cursor, second_gap = strava_events.read_events(path, cursor)
+
+        self.assertEqual(gap, "no event cursor yet")
+        self.assertEqual([event["object_id"] for _offset, event in first], [1])
+        self.assertIsNone(second_gap)
+        self.assertEqual([event["object_id"] for _offset, event in second], [2])
+        self.assertEqual(next_cursor["offset"], second[-1][0])
+        self.assertEqual(next_cursor["head"], cursor["head"])
+
+    def test_read_events_reports_replaced_log_and_receiver_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "events.jsonl")
+            strava_events.append_event(path, _event(1))
+            _events, cursor, _gap = strava_events.read_events(path, None)
+
+            os.remove(path)
+            strava_events.append_event(path, _event(5))
+            replaced, _cursor, replaced_gap = strava_events.read_events(path, cursor)
+
+            _events, cursor, _gap = strava_events.read_events(path, None)
+            strava_events.append_event(path, {"object_type": "receiver", "aspect_type": "start"})
+            strava_events.append_event(path, _event(6))
+            restarted, _cursor, restart_gap = strava_events.read_events(path, cursor)
+
+        self.assertEqual(replaced_gap, "event log was replaced or truncated")
+        self.assertEqual([event["object_id"] for _offset, event in replaced], [5])
+        self.assertEqual(restart_gap, "event receiver restarted")
+        self.assertEqual([event["object_id"] for _offset, event in restarted], [6])
+
+    def test_activity_actions_fetch_once_and_let_delete_win(self) -> None:
+        events = [
+            (10, _event(1)),
+            (20, _event(2)),
+            (30, _event(1, "update")),
+            (40, _event(9, "update", object_type="athlete")),
+            (50, _event(2, "delete")),
+        ]
+        self.assertEqual(strava_events.activity_actions(events), {"1": "fetch", "2": "delete"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from datetime import datetime, timezone
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_engine  # noqa: E402
+
+
+class _Throttled(Exception):
+    pass
+
+
+class _FakeProvider(sync_engine.SyncProvider):
+    """Serves `count` activities a day apart, newest first, `per_page` at a time."""
+
+    name = "fake"
+
+    def __init__(self, raw_dir, count, per_page, throttle_at=None):
+        self.raw_dir = raw_dir
+        self.per_page = per_page
+        self.throttle_at = throttle_at
+        self.calls = []
+        newest = 1_700_000_000
+        self.activities = [
+            {"activityId": index, "start": newest - index * 86400} for index in range(count)
+        ]
+
+    def normalize(self, activity):
+        start = datetime.fromtimestamp(activity["start"], tz=timezone.utc)
+        return {"id": str(activity["activityId"]), "start_date": start.isoformat()}
+
+    def is_rate_limited(self, exc):
+        return isinstance(exc, _Throttled)
+
+    def fetch_recent_page(self, cursor, after):
+        offset = cursor or 0
+        self.calls.append(offset)
+        if offset == self.throttle_at:
+            raise _Throttled("slow down")
+        page = self.activities[offset : offset + self.per_page]
+        return page, offset + len(page) if len(page) == self.per_page else None
+
+
+class SyncEngineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.raw_dir = os.path.join(self._tmp.name, "raw")
+
+    def tearDown(self) -> None:
+        sync_engine.close_store(self.raw_dir, flush=False)
+        self._tmp.cleanup()
+
+    def test_sync_recent_pages_to_boundary_and_commits_each_activity_once(self) -> None:
+        provider = _FakeProvider(self.raw_dir, count=500, per_page=50)
+        after = provider.activities[119]["start"]
+        summary = sync_engine.run_sync(
+            self.raw_dir, lambda: sync_engine.sync_recent(provider, after, dry_run=False)
+        )
+
+        self.assertEqual(provider.calls, [0, 50, 100])
+        self.assertEqual(summary["fetched"], 120)
+        self.assertEqual(summary["new_or_updated"], 120)
+        self.assertEqual(summary["oldest_ts"], after)
+        self.assertEqual(summary["changed"], 120)
+        self.assertNotIn("changed_ids", summary)
+        self.assertFalse(summary["rate_limited"])
+
+    def test_rate_limit_stops_paging_and_prune_removes_unseen(self) -> None:
+        provider = _FakeProvider(self.raw_dir, count=10, per_page=4, throttle_at=4)
+        sync_engine.write_activity(self.raw_dir, {"id": "stale"})
+        self.assertFalse(sync_engine.write_activity(self.raw_dir, {"id": "../escape"}))
+        summary = sync_engine.sync_recent(provider, 0, dry_run=False)
+        deleted = sync_engine.prune_unseen(self.raw_dir, set(summary["activity_ids"]))
+
+        self.assertTrue(summary["rate_limited"])
+        self.assertEqual(summary["rate_limit_message"], "slow down")
+        self.assertEqual(summary["activity_ids"], ["0", "1", "2", "3"])
+        self.assertEqual(deleted, 1)
+        self.assertEqual(sorted(sync_engine.shared_store(self.raw_dir).ids()), ["0", "1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,265 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_garmin  # noqa: E402
+
+
+def _garmin_activity(activity_id: int, day: int) -> dict:
+    return {
+        "activityId": activity_id,
+        "startTimeLocal": f"2025-01-{day:02d} 08:00:00",
+        "startTimeGMT": f"2025-01-{day:02d} 08:00:00",
+        "activityType": {"typeKey": "running"},
+        "duration": 600,
+        "distance": 1000,
+    }
+
+
+class _PagedClient:
+    def __init__(self, pages, fail_at_offset=None):
+        self.pages = pages
+        self.fail_at_offset = fail_at_offset
+        self.calls = []
+
+    def get_activities(self, start, limit):
+        self.calls.append(start)
+        if start == self.fail_at_offset:
+            raise RuntimeError("500 Server Error")
+        return self.pages.get(start, [])
+
+
+class SyncGarminBackfillTests(unittest.TestCase):
+    def _run_sync(self, tmpdir: str, client: _PagedClient, enrichment_workers: int = 4) -> dict:
+        config = {
+            "sync": {"per_page": 2, "recent_days": 0, "enrichment_workers": enrichment_workers}
+        }
+        old_cwd = os.getcwd()
+        os.chdir(tmpdir)
+        try:
+            with (
+                mock.patch("sync_garmin.load_config", return_value=config),
+                mock.patch("sync_garmin._load_garmin_client", return_value=client),
+                mock.patch("sync_garmin._maybe_reset_for_new_account"),
+            ):
+                return sync_garmin.sync_garmin(dry_run=False, prune_deleted=False)
+        finally:
+            os.chdir(old_cwd)
+
+    def test_backfill_checkpoints_cursor_after_each_page(self) -> None:
+        pages = {
+            0: [_garmin_activity(1, 20), _garmin_activity(2, 19)],
+            2: [_garmin_activity(3, 18), _garmin_activity(4, 17)],
+            4: [_garmin_activity(5, 16)],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(RuntimeError):
+                self._run_sync(tmpdir, _PagedClient(pages, fail_at_offset=4))
+
+            state = sync_garmin.read_json(os.path.join(tmpdir, sync_garmin.STATE_PATH))
+            self.assertEqual(state["next_offset"], 4)
+            self.assertFalse(state["completed"])
+
+            resumed_client = _PagedClient(pages)
+            summary = self._run_sync(tmpdir, resumed_client)
+            state = sync_garmin.read_json(os.path.join(tmpdir, sync_garmin.STATE_PATH))
+
+        self.assertEqual(resumed_client.calls, [4])
+        self.assertTrue(summary["backfill_completed"])
+        self.assertTrue(state["completed"])
+        self.assertIsNone(state["next_offset"])
+        self.assertIsNotNone(state["newest_seen_ts"])
+        self.assertLess(state["oldest_seen_ts"], state["newest_seen_ts"])
+        self.assertEqual(summary["recent_sync"]["mode"], "disabled")
+        self.assertEqual(summary["changed"], 1)
+        self.assertEqual(state["incremental"], {"watermark_ts": None, "reconciled_ts": {}})
+
+    def test_duration_lookups_are_cached_with_the_method_that_worked(self) -> None:
+        first = _garmin_activity(1, 20)
+        second = _garmin_activity(3, 18)
+        first["duration"] = 0
+        second["duration"] = 0
+        pages = {0: [first, _garmin_activity(2, 19)], 2: [second]}
+
+        class _EnrichingClient(_PagedClient):
+            def get_activity(self, activity_id):
+                self.calls.append(f"get_activity:{activity_id}")
+                return {}
+
+            def get_activity_details(self, activity_id):
+                self.calls.append(f"get_activity_details:{activity_id}")
+                return {"summaryDTO": {"movingDuration": 900}}
+
+        client = _EnrichingClient(pages)
+        rerun_client = _EnrichingClient(pages)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            summary = self._run_sync(tmpdir, client, enrichment_workers=1)
+            stored = sync_garmin.read_json(os.path.join(tmpdir, sync_garmin.RAW_DIR, "3.json"))
+            cache = sync_garmin.read_json(os.path.join(tmpdir, sync_garmin.DURATION_CACHE_PATH))
+            os.remove(os.path.join(tmpdir, sync_garmin.STATE_PATH))
+            rerun = self._run_sync(tmpdir, rerun_client)
+
+        lookups = [call for call in client.calls if isinstance(call, str)]
+        # The second lookup goes straight to the method that worked for the first.
+        self.assertEqual(
+            lookups, ["get_activity:1", "get_activity_details:1", "get_activity_details:3"]
+        )
+        self.assertEqual(summary["duration_enriched"], 2)
+        self.assertEqual(summary["duration_lookups"], 3)
+        self.assertEqual(stored["moving_time"], 900)
+        self.assertEqual(cache["preferred_method"], "get_activity_details")
+        self.assertEqual(cache["activities"]["3"], {"seconds": 900, "method": "get_activity_details"})
+        self.assertEqual(rerun_client.calls, [0, 2])
+        self.assertEqual(rerun["duration_cached"], 2)
+        self.assertEqual(rerun["duration_lookups"], 0)
+    def test_build_backfill_windows_are_yearly_and_start_a_day_early(self) -> None:
+        after = int(datetime(2024, 6, 1, tzinfo=timezone.utc).timestamp())
+        now_ts = int(datetime(2026, 3, 1, tzinfo=timezone.utc).timestamp())
+
+        windows = sync_garmin._build_backfill_windows(after, now_ts)
+        unbounded = sync_garmin._build_backfill_windows(0, now_ts)
+
+        self.assertEqual(
+            [(w["label"], w["start"], w["end"]) for w in windows],
+            [
+                ("2026", "2026-01-01", "2026-03-01"),
+                ("2025", "2025-01-01", "2025-12-31"),
+                ("2024", "2024-05-31", "2024-12-31"),
+            ],
+        )
+        self.assertEqual(unbounded[-1]["label"], "before-2008")
+        self.assertEqual(unbounded[-1]["end"], "2007-12-31")
+
+    def test_window_backfill_resumes_only_unfinished_windows(self) -> None:
+        now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+        class _WindowClient(_PagedClient):
+            def __init__(self, fail_year=None):
+                super().__init__({})
+                self.fail_year = fail_year
+
+            def get_activities_by_date(self, start, end):
+                self.calls.append(start[:4])
+                if start.startswith(str(self.fail_year)):
+                    raise RuntimeError("429 Too Many Requests")
+                activity = _garmin_activity(int(start[:4]), 10)
+                activity["startTimeLocal"] = activity["startTimeGMT"] = f"{end} 06:00:00"
+                return [activity]
+
+        config = {
+            "sync": {"per_page": 2, "recent_days": 0, "start_date": "2024-06-01", "backfill_workers": 1}
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                with (
+                    mock.patch("sync_garmin.load_config", return_value=config),
+                    mock.patch("sync_garmin._maybe_reset_for_new_account"),
+                    mock.patch("sync_garmin.utc_now", return_value=now),
+                    mock.patch("sync_garmin.time.sleep"),
+                ):
+                    with mock.patch("sync_garmin._load_garmin_client", return_value=_WindowClient(2025)):
+                        first = sync_garmin.sync_garmin(dry_run=False, prune_deleted=False)
+                    state = sync_garmin.read_json(sync_garmin.STATE_PATH)
+                    resumed_client = _WindowClient()
+                    with mock.patch("sync_garmin._load_garmin_client", return_value=resumed_client):
+                        second = sync_garmin.sync_garmin(dry_run=False, prune_deleted=True)
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(first["backfill_mode"], "windows")
+        self.assertTrue(first["rate_limited"])
+        # Once the governor gives up on 2025, the windows after it fail fast too.
+        self.assertEqual(first["backfill_windows_pending"], 2)
+        self.assertEqual(first["governor"]["rate_limit_hits"], 6)
+        self.assertEqual(
+            {w["label"]: w["completed"] for w in state["windows"]},
+            {"2026": True, "2025": False, "2024": False},
+        )
+        self.assertEqual(resumed_client.calls, ["2025", "2024"])
+        self.assertTrue(second["backfill_completed"])
+        # Resumed windows were not re-listed, so nothing may be pruned.
+        self.assertEqual(second["deleted"], 0)
+        self.assertEqual(first["changed"], 1)
+        self.assertEqual(second["changed"], 2)
+
+    def test_window_backfill_splits_remaining_years_by_month_after_a_full_page(self) -> None:
+        now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+        class _DenseClient(_PagedClient):
+            def __init__(self):
+                super().__init__({})
+
+            def get_activities_by_date(self, start, end):
+                self.calls.append(start)
+                count = sync_garmin.DATE_WINDOW_PAGE_SIZE if start.startswith("2026") else 1
+                activities = []
+                for index in range(count):
+                    activity = _garmin_activity(int(start.replace("-", "")) * 100 + index, 10)
+                    activity["startTimeLocal"] = activity["startTimeGMT"] = f"{end} 06:00:00"
+                    activities.append(activity)
+                return activities
+
+        config = {
+            "sync": {"per_page": 2, "recent_days": 0, "start_date": "2025-11-01", "backfill_workers": 1}
+        }
+        client = _DenseClient()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                with (
+                    mock.patch("sync_garmin.load_config", return_value=config),
+                    mock.patch("sync_garmin._maybe_reset_for_new_account"),
+                    mock.patch("sync_garmin.utc_now", return_value=now),
+                    mock.patch("sync_garmin._load_garmin_client", return_value=client),
+                ):
+                    summary = sync_garmin.sync_garmin(dry_run=False, prune_deleted=False)
+                state = sync_garmin.read_json(sync_garmin.STATE_PATH)
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertTrue(summary["backfill_completed"])
+        self.assertEqual(client.calls, ["2026-01-01", "2025-12-01", "2025-11-01", "2025-10-31"])
+        self.assertEqual(
+            [(w["label"], w["completed"]) for w in state["windows"]],
+            [("2026", True), ("2025-12", True), ("2025-11", True), ("2025-10", True)],
+        )
+
+    def test_windows_from_state_resume_a_year_split_by_month(self) -> None:
+        after = int(datetime(2025, 11, 1, tzinfo=timezone.utc).timestamp())
+        now_ts = int(datetime(2026, 3, 1, tzinfo=timezone.utc).timestamp())
+        state = {
+            "windows": [
+                {"label": "2026", "start": "2026-01-01", "end": "2026-02-20", "completed": True},
+                {"label": "2025-12", "start": "2025-12-01", "end": "2025-12-31", "completed": True},
+                {"label": "2025-11", "start": "2025-11-01", "end": "2025-11-30", "completed": False},
+            ]
+        }
+
+        windows, resumed = sync_garmin._windows_from_state(state, after, now_ts)
+
+        self.assertTrue(resumed)
+        self.assertEqual(
+            [(w["label"], w["completed"]) for w in windows],
+            [("2026", True), ("2025-12", True), ("2025-11", False), ("2025-10", False)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_garmin  # noqa: E402
+import sync_telemetry  # noqa: E402
+
+
+class _TooManyRequests(Exception):
+    pass
+
+
+class _FlakyClient:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def get_activities(self, start, limit):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise _TooManyRequests("429 Too Many Requests")
+        return [{"activityId": start}]
+
+
+class RequestGovernorTests(unittest.TestCase):
+    def test_rate_limited_call_backs_off_with_jitter_and_resumes(self) -> None:
+        governor = sync_garmin.RequestGovernor(max_retries=3, state_path=None)
+        client = sync_garmin._GovernedClient(_FlakyClient(failures=2), governor)
+
+        trace = sync_telemetry.start_trace("garmin")
+        try:
+            with (
+                mock.patch("sync_garmin.time.sleep") as sleep_mock,
+                mock.patch("sync_garmin.random.uniform", return_value=1.0) as jitter_mock,
+            ):
+                page = sync_garmin._fetch_page(client, 0, 1)
+        finally:
+            sync_telemetry.finish_trace(trace)
+
+        self.assertEqual(page, [{"activityId": 0}])
+        self.assertEqual(jitter_mock.call_count, 2)
+        waits = [call.args[0] for call in sleep_mock.call_args_list]
+        self.assertEqual(len(waits), 2)
+        self.assertAlmostEqual(waits[0], sync_garmin.GOVERNOR_BACKOFF_SECONDS, delta=1)
+        self.assertAlmostEqual(waits[1], sync_garmin.GOVERNOR_BACKOFF_SECONDS * 2, delta=1)
+        stats = governor.stats()
+        self.assertEqual(stats["rate_limit_hits"], 2)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["requests"], 1)
+        # Halved twice from the unpaced default, then one additive step back up.
+        self.assertAlmostEqual(governor.rate, 0.25 + sync_garmin.GOVERNOR_RATE_STEP)
+        self.assertEqual([event["status"] for event in trace.events], [429, 429, 200])
+        self.assertEqual([event["attempt"] for event in trace.events], [1, 2, 3])
+        self.assertEqual(trace.events[-1]["endpoint"], "garmin get_activities")
+        self.assertEqual(trace.events[-1]["params"], {"args": [0, 1]})
+        # The backoff after the first 429 is the second attempt's wait.
+        self.assertAlmostEqual(trace.events[1]["wait_seconds"], waits[0], delta=0.01)
+
+    def test_response_size_is_only_measured_for_a_written_trace(self) -> None:
+        def _fetch(trace_path):
+            governor = sync_garmin.RequestGovernor(max_retries=0, state_path=None)
+            client = sync_garmin._GovernedClient(_FlakyClient(failures=0), governor)
+            trace = sync_telemetry.start_trace("garmin", trace_path)
+            try:
+                with mock.patch("sync_garmin.json.dumps", wraps=sync_garmin.json.dumps) as dumps_mock:
+                    sync_garmin._fetch_page(client, 0, 1)
+            finally:
+                sync_telemetry.finish_trace(trace)
+            return trace.events[-1]["bytes"], dumps_mock.call_count
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            traced = _fetch(os.path.join(tmpdir, "trace.jsonl"))
+        untraced = _fetch(None)
+
+        self.assertEqual(traced[0], len('[{"activityId": 0}]'))
+        # Without a trace file nothing is serialized at all.
+        self.assertEqual(untraced, (None, 0))
+
+    def test_gives_up_after_retries_and_fails_later_calls_fast(self) -> None:
+        governor = sync_garmin.RequestGovernor(max_retries=1, state_path=None)
+        flaky = _FlakyClient(failures=10)
+        client = sync_garmin._GovernedClient(flaky, governor)
+
+        with mock.patch("sync_garmin.time.sleep"):
+            with self.assertRaises(_TooManyRequests):
+                sync_garmin._fetch_page(client, 0, 1)
+            with self.assertRaises(_TooManyRequests):
+                sync_garmin._fetch_page(client, 1, 1)
+
+        self.assertEqual(flaky.calls, 2)
+
+    def test_learned_rate_paces_calls_and_persists(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            state_path = os.path.join(tmpdir, "governor.json")
+            sync_garmin.write_json(state_path, {"rate": 0.5, "fastest_latency": 0.2})
+            governor = sync_garmin.RequestGovernor(state_path=state_path)
+            client = sync_garmin._GovernedClient(_FlakyClient(failures=0), governor)
+
+            with mock.patch("sync_garmin.time.sleep") as sleep_mock:
+                client.get_activities(0, 1)
+                client.get_activities(1, 1)
+            governor.save()
+            persisted = sync_garmin.read_json(state_path)
+
+        self.assertTrue(governor.stats()["rate_restored"])
+        # The second call waits out the interval the restored rate allows.
+        sleep_mock.assert_called_once()
+        self.assertAlmostEqual(sleep_mock.call_args.args[0], 2.0, delta=0.2)
+        self.assertAlmostEqual(persisted["rate"], 0.5 + 2 * sync_garmin.GOVERNOR_RATE_STEP)
+
+    def test_rising_latency_eases_off_the_rate(self) -> None:
+        governor = sync_garmin.RequestGovernor(state_path=None)
+        governor.rate = 2.0
+        governor.fastest_latency = 0.1
+        governor.latency = 0.1
+
+        governor._record_success(2.0)
+
+        self.assertEqual(governor.slowdowns, 1)
+        self.assertAlmostEqual(governor.rate, 1.7)
+
+
+if __name__ == "__main__":
+    unittest.main()
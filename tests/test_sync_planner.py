@@ -0,0 +1,135 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from datetime import datetime, timezone
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_planner  # noqa: E402
+
+DAY = 86400
+
+
+def _ts(year: int, month: int = 1, day: int = 1) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+class SyncPlannerTests(unittest.TestCase):
+    def test_activities_per_day_prefers_last_year(self) -> None:
+        now_ts = _ts(2026, 1, 1)
+        old = [_ts(2015, 1, day) for day in range(1, 29)]
+        recent = [now_ts - 10 * DAY, now_ts - 5 * DAY]
+
+        self.assertAlmostEqual(sync_planner.activities_per_day(old + recent, now_ts), 0.2)
+        self.assertIsNone(sync_planner.activities_per_day([None], now_ts))
+
+    def test_estimate_range_uses_probe_then_density_then_default(self) -> None:
+        after, before = _ts(2025), _ts(2025) + 100 * DAY
+
+        exact = sync_planner.estimate_range(after, before, 2.0, {"count": 37, "full": False})
+        self.assertEqual(exact, {"activities": 37, "basis": "probe_exact"})
+
+        probed = sync_planner.estimate_range(
+            after,
+            before,
+            2.0,
+            {"count": 200, "full": True, "oldest_ts": before - 50 * DAY, "newest_ts": before},
+        )
+        self.assertEqual(probed, {"activities": 400, "basis": "probe_density"})
+        self.assertEqual(sync_planner.estimate_range(after, before, 0.5)["activities"], 50)
+        # Unbounded ranges are costed from the earliest possible history.
+        unbounded = sync_planner.estimate_range(0, sync_planner.EARLIEST_HISTORY_TS + 10 * DAY, None)
+        self.assertEqual(unbounded, {"activities": 10, "basis": "default"})
+
+    def test_estimate_eta_waits_for_windows_and_daily_reset(self) -> None:
+        limits = {"read_15": 100, "read_day": 1000, "safety_buffer": 2}
+        now_ts = _ts(2026, 1, 1)
+
+        quick = sync_planner.estimate_eta(50, limits, {}, now_ts)
+        self.assertEqual(quick["eta_seconds"], 50)
+        self.assertTrue(quick["fits_remaining_daily_budget"])
+
+        windows = sync_planner.estimate_eta(250, limits, {}, now_ts)
+        self.assertEqual(windows["days_spanned"], 1)
+        self.assertEqual(windows["eta_seconds"], 2 * 900 + 54)
+
+        days = sync_planner.estimate_eta(2500, limits, {"read_day": 900}, now_ts)
+        self.assertFalse(days["fits_remaining_daily_budget"])
+        self.assertEqual(days["days_spanned"], 4)
+
+    def test_estimate_eta_clamps_usage_above_the_cap_and_waits_for_reset(self) -> None:
+        limits = {"read_15": 100, "read_day": 1000, "safety_buffer": 2}
+        now_ts = _ts(2026, 1, 1) + 600
+
+        window = sync_planner.estimate_eta(10, limits, {"read_15": 140, "read_day": 140}, now_ts)
+        self.assertEqual(window["wait_seconds"], 300)
+        self.assertEqual(window["eta_seconds"], 300 + 10)
+        self.assertTrue(window["fits_remaining_daily_budget"])
+
+        day = sync_planner.estimate_eta(10, limits, {"read_15": 140, "read_day": 1200}, now_ts)
+        self.assertEqual(day["wait_seconds"], DAY - 600)
+        self.assertEqual(day["eta_seconds"], DAY - 600 + 10)
+        self.assertFalse(day["fits_remaining_daily_budget"])
+
+        plan = sync_planner.build_plan(
+            "strava",
+            [],
+            None,
+            200,
+            None,
+            now_ts,
+            overhead_requests=1,
+            limits=limits,
+            usage={"read_15": 140, "read_day": 1200},
+        )
+        self.assertEqual(plan["read_budget"]["remaining_15_min"], 0)
+        self.assertEqual(plan["read_budget"]["remaining_daily"], 0)
+        self.assertEqual(plan["wait_seconds"], DAY - 600)
+
+    def test_build_plan_totals_pages_and_budget(self) -> None:
+        now_ts = _ts(2026, 1, 1)
+        plan = sync_planner.build_plan(
+            "strava",
+            [
+                {"label": "2025", "after": _ts(2025), "before": now_ts},
+                {"label": "2024", "after": _ts(2024), "before": _ts(2025) + 1},
+            ],
+            {"after": now_ts - 7 * DAY, "before": now_ts},
+            200,
+            1.0,
+            now_ts,
+            overhead_requests=1,
+            limits={"read_15": 100, "read_day": 1000, "safety_buffer": 0},
+            usage={"read_15": 0, "read_day": 0},
+            probe={"label": "2024", "count": 12, "full": False},
+        )
+
+        self.assertEqual([item["estimated_pages"] for item in plan["pending_ranges"]], [2, 1])
+        self.assertEqual(plan["pending_ranges"][1]["basis"], "probe_exact")
+        self.assertEqual(plan["recent_pages"], 1)
+        self.assertEqual(plan["read_requests"], 5)
+        self.assertEqual(plan["read_budget"]["daily_share"], 0.005)
+        self.assertTrue(plan["probe_used"])
+
+    def test_normalized_start_times_reads_dates(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "activities_normalized.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('[{"id": "1", "date": "2026-01-02"}, {"id": "2"}, {"id": "3", "date": "bad"}]')
+
+            self.assertEqual(sync_planner.normalized_start_times(path), [_ts(2026, 1, 2)])
+            self.assertEqual(sync_planner.normalized_start_times(os.path.join(tmpdir, "missing")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
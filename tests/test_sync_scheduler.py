@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+import sync_scheduler  # noqa: E402
+
+
+class WorkSchedulerTests(unittest.TestCase):
+    def test_runs_by_priority_and_yields_to_work_queued_mid_item(self) -> None:
+        order = []
+        reserves = []
+        scheduler = sync_scheduler.WorkScheduler(
+            {"recent": 0.0, "enrichment": 0.0, "backfill": 0.1, "reconcile": 0.3},
+            reserves.append,
+        )
+
+        def _backfill() -> None:
+            for page in (1, 2):
+                order.append(f"page{page}")
+                scheduler.submit("enrichment", lambda page=page: order.append(f"enrich{page}"))
+                scheduler.yield_to("backfill")
+
+        scheduler.submit("reconcile", lambda: order.append("reconcile"))
+        scheduler.submit("backfill", _backfill)
+        scheduler.submit("recent", lambda: order.append("recent"))
+        scheduler.run()
+
+        self.assertEqual(
+            order, ["recent", "page1", "enrich1", "page2", "enrich2", "reconcile"]
+        )
+        # The reserve follows whichever item is running and is restored after yields.
+        self.assertEqual(reserves, [0.0, 0.1, 0.0, 0.1, 0.0, 0.1, 0.3])
+        self.assertEqual(
+            scheduler.stats()["completed"],
+            {"recent": 1, "enrichment": 2, "backfill": 1, "reconcile": 1},
+        )
+
+    def test_budget_reserve_from_config_overrides_and_validates(self) -> None:
+        reserve = sync_scheduler.budget_reserve_from_config(
+            {"sync": {"budget_reserve": {"backfill": 0.2, "reconcile": 2}}}
+        )
+        self.assertEqual(reserve["backfill"], 0.2)
+        self.assertEqual(reserve["reconcile"], sync_scheduler.MAX_BUDGET_RESERVE)
+        self.assertEqual(reserve["recent"], 0.0)
+
+        with self.assertRaises(ValueError):
+            sync_scheduler.budget_reserve_from_config({"sync": {"budget_reserve": {"photos": 0.1}}})
+
+
+if __name__ == "__main__":
+    unittest.main()
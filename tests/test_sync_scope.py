@@ -61,6 +61,64 @@ class SyncScopeTests(unittest.TestCase):
         self.assertEqual(ts, int(datetime(2026, 2, 17, 9, 30, tzinfo=timezone.utc).timestamp()))
         self.assertIsNone(sync_scope.activity_start_ts({"start_date": "bad"}))
 
+    def test_plan_recent_sync_uses_window_until_watermark_exists(self) -> None:
+        now_ts = 10_000_000
+        config = {"sync": {"recent_days": 7, "incremental": True}}
+
+        plan = sync_scope.plan_recent_sync(config, {}, now_ts)
+
+        self.assertEqual(plan["mode"], "window")
+        self.assertEqual(plan["after"], now_ts - 7 * 86400)
+        self.assertEqual(plan["reconciled"], ["7d"])
+
+    def test_plan_recent_sync_prefers_widest_due_reconcile_window(self) -> None:
+        now_ts = 100 * 86400
+        config = {"sync": {"recent_days": 7, "incremental": True}}
+        state = {
+            "watermark_ts": now_ts - 3600,
+            "reconciled_ts": {"7d": now_ts - 2 * 3600, "90d": now_ts - 8 * 86400},
+        }
+
+        plan = sync_scope.plan_recent_sync(config, state, now_ts)
+        self.assertEqual(plan["mode"], "reconcile")
+        self.assertEqual(plan["after"], now_ts - 90 * 86400)
+        self.assertEqual(plan["reconciled"], ["7d", "90d"])
+
+        state["reconciled_ts"]["90d"] = now_ts - 86400
+        plan = sync_scope.plan_recent_sync(config, state, now_ts)
+        self.assertEqual(plan["mode"], "incremental")
+        self.assertEqual(plan["after"], now_ts - 3600 - 1)
+
+    def test_plan_recent_sync_reconciles_a_daily_run_that_starts_early(self) -> None:
+        now_ts = 100 * 86400
+        config = {"sync": {"recent_days": 7, "incremental": True}}
+        state = {
+            "watermark_ts": now_ts - 3600,
+            # Yesterday's run finished a few minutes after today's one starts.
+            "reconciled_ts": {"7d": now_ts - 86400 + 300, "90d": now_ts - 86400},
+        }
+
+        plan = sync_scope.plan_recent_sync(config, state, now_ts)
+        self.assertEqual(plan["mode"], "reconcile")
+        self.assertEqual(plan["reconciled"], ["7d"])
+
+        state["reconciled_ts"]["7d"] = now_ts - 12 * 3600
+        self.assertEqual(sync_scope.plan_recent_sync(config, state, now_ts)["mode"], "incremental")
+
+    def test_advance_incremental_state_only_moves_after_complete_pass(self) -> None:
+        plan = {"mode": "reconcile", "after": 500, "reconciled": ["7d"]}
+        state = {"watermark_ts": 1000, "reconciled_ts": {"7d": 10}}
+
+        partial = sync_scope.advance_incremental_state(state, plan, 2000, 3000, completed=False)
+        self.assertEqual(partial, state)
+
+        updated = sync_scope.advance_incremental_state(state, plan, 900, 3000, completed=True)
+        self.assertEqual(updated["watermark_ts"], 1000)
+        self.assertEqual(updated["reconciled_ts"], {"7d": 3000})
+
+        seeded = sync_scope.advance_incremental_state({}, plan, None, 3000, completed=True)
+        self.assertEqual(seeded["watermark_ts"], 500)
+
 
 if __name__ == "__main__":
     unittest.main()
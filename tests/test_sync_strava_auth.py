@@ -1,6 +1,8 @@
 import os
 import sys
 import tempfile
+import threading
+import time
 import types
 import unittest
 from datetime import datetime, timezone
@@ -39,6 +41,7 @@ yaml_stub = types.ModuleType("yaml")
 yaml_stub.safe_load = lambda *_args, **_kwargs: {}
 sys.modules.setdefault("yaml", yaml_stub)
 
+import http_transport  # noqa: E402
 import sync_strava  # noqa: E402
 
 
@@ -59,15 +62,17 @@ class _MockResponse:
 class SyncStravaAuthTests(unittest.TestCase):
     def test_request_json_with_retry_non_transient_http_fails_fast(self) -> None:
         response = _MockResponse(400, {"message": "Bad Request"})
-        with mock.patch("sync_strava.requests.request", return_value=response) as request_mock:
-            with self.assertRaises(sync_strava.requests.HTTPError):
-                sync_strava._request_json_with_retry(
-                    "POST",
-                    "https://www.strava.com/oauth/token",
-                    limiter=None,
-                    request_kind="overall",
-                )
-        self.assertEqual(request_mock.call_count, 1)
+        transport = mock.Mock()
+        transport.request.return_value = response
+        with self.assertRaises(sync_strava.requests.HTTPError):
+            sync_strava._request_json_with_retry(
+                "POST",
+                "https://www.strava.com/oauth/token",
+                limiter=None,
+                request_kind="overall",
+                transport=transport,
+            )
+        self.assertEqual(transport.request.call_count, 1)
 
     def test_get_access_token_falls_back_to_configured_refresh_token(self) -> None:
         config = {
@@ -127,6 +132,179 @@ class SyncStravaAuthTests(unittest.TestCase):
                 payload = sync_strava._load_token_cache()
                 self.assertEqual(payload.get("refresh_token"), "r")
 
+    def test_get_access_token_binds_athlete_from_token_response(self) -> None:
+        config = {"strava": {"client_id": "id", "client_secret": "secret", "refresh_token": "r"}}
+        payload = {
+            "access_token": "fresh",
+            "expires_at": 9999999999,
+            "refresh_token": "r",
+            "athlete": {"id": 42},
+        }
+        saved_payloads: list[dict] = []
+        with (
+            mock.patch("sync_strava._load_token_cache", return_value={}),
+            mock.patch("sync_strava._request_json_with_retry", return_value=payload),
+            mock.patch("sync_strava._save_token_cache", side_effect=saved_payloads.append),
+        ):
+            sync_strava._get_access_token(config, limiter=None)
+
+        self.assertEqual(saved_payloads[0]["athlete_id"], 42)
+        self.assertEqual(
+            saved_payloads[0]["identity_fingerprint"], sync_strava._identity_fingerprint(config)
+        )
+
+    def test_maybe_reset_skips_athlete_lookup_once_identity_is_verified(self) -> None:
+        config = {"strava": {"client_id": "id", "client_secret": "secret", "refresh_token": "r"}}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                token_cache = os.path.join(tmpdir, ".strava_token.json")
+                with (
+                    mock.patch("sync_strava.TOKEN_CACHE", token_cache),
+                    mock.patch("sync_strava._fetch_athlete", return_value={"id": 7}) as fetch_athlete,
+                ):
+                    sync_strava._save_token_cache({"access_token": "a", "expires_at": 1})
+                    sync_strava._maybe_reset_for_new_athlete(config, "a", 200, None)
+                    self.assertEqual(fetch_athlete.call_count, 1)
+                    self.assertEqual(sync_strava._cached_athlete_id(config), 7)
+
+                    sync_strava._maybe_reset_for_new_athlete(config, "a", 200, None)
+                    self.assertEqual(fetch_athlete.call_count, 1)
+
+                    # A new configured refresh token must be verified again.
+                    rotated = {"strava": dict(config["strava"], refresh_token="other")}
+                    sync_strava._maybe_reset_for_new_athlete(rotated, "a", 200, None)
+                    self.assertEqual(fetch_athlete.call_count, 2)
+
+                stored = sync_strava.read_json(sync_strava.ATHLETE_PATH)
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(stored["fingerprint"], sync_strava._athlete_fingerprint(7, "secret"))
+        self.assertEqual(stored["identity_fingerprint"], sync_strava._identity_fingerprint(rotated))
+
+    def test_concurrent_401s_refresh_the_token_once(self) -> None:
+        rejected = sync_strava.requests.HTTPError("401 error", response=_MockResponse(401))
+        barrier = threading.Barrier(4)
+        used = []
+
+        def _call(access_token):
+            if access_token == "stale":
+                barrier.wait(timeout=5)
+                raise rejected
+            used.append(access_token)
+            return access_token
+
+        def _refresh(*_args, **_kwargs):
+            time.sleep(0.05)
+            return f"fresh-{refresh_mock.call_count}"
+
+        with (
+            mock.patch("sync_strava._get_access_token", side_effect=_refresh) as refresh_mock,
+            mock.patch("sync_strava._REFRESHED_TOKENS", {}),
+        ):
+            threads = [
+                threading.Thread(
+                    target=sync_strava._run_with_token_refresh, args=({}, "stale", None, "test", _call)
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(refresh_mock.call_count, 1)
+        self.assertEqual(used, ["fresh-1"] * 4)
+
+    def test_maybe_reset_never_wipes_data_for_an_offline_transport(self) -> None:
+        config = {"strava": {"client_id": "id", "client_secret": "secret", "refresh_token": "fake-refresh-1"}}
+        transport = http_transport.RebasedTransport("http://127.0.0.1:8788")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                sync_strava._write_activity({"id": 5, "start_date": "2025-01-01T00:00:00Z"})
+                sync_strava.close_store(sync_strava.RAW_DIR)
+                sync_strava._write_athlete_fingerprint("someone-else", None)
+                with mock.patch("sync_strava._fetch_athlete", return_value={"id": 1}) as fetch_athlete:
+                    sync_strava._maybe_reset_for_new_athlete(config, "fake-access-1", 200, None, transport)
+                remaining = sync_strava.shared_store(sync_strava.RAW_DIR).ids()
+                stored = sync_strava.read_json(sync_strava.ATHLETE_PATH)
+            finally:
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                os.chdir(old_cwd)
+
+        fetch_athlete.assert_not_called()
+        self.assertEqual(remaining, ["5"])
+        self.assertEqual(stored["fingerprint"], "someone-else")
+
+    def test_rebased_api_run_never_touches_checkout_data(self) -> None:
+        config = {"strava": {"client_id": "id", "client_secret": "secret", "refresh_token": "fake-refresh-1"}}
+
+        def _fake_sync(*_args, transport=None, **_kwargs):
+            # What a run against a different athlete would otherwise do.
+            token = sync_strava._maybe_reset_for_new_athlete(config, "fake-access-1", 200, None, transport)
+            self.assertEqual(token, "fake-access-1")
+            self.assertTrue(transport.offline)
+            sync_strava._write_activity({"id": 99, "start_date": "2026-01-01T00:00:00Z"})
+            sync_strava.ensure_dir("data")
+            sync_strava.write_json(sync_strava.STATE_PATH, {"completed": True})
+            sync_strava.close_store(sync_strava.RAW_DIR)
+            return {"new_or_updated": 1, "deleted": 0}
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            checkout = os.path.join(tmpdir, "checkout")
+            os.makedirs(checkout)
+            os.chdir(checkout)
+            try:
+                sync_strava._write_activity({"id": 1, "start_date": "2025-01-01T00:00:00Z"})
+                sync_strava.close_store(sync_strava.RAW_DIR)
+                sync_strava.ensure_dir("data")
+                sync_strava.write_json(sync_strava.STATE_PATH, {"completed": False})
+                sync_strava.write_json(sync_strava.ATHLETE_PATH, {"fingerprint": "someone-else"})
+                before = {
+                    os.path.join(root, name): open(os.path.join(root, name), encoding="utf-8").read()
+                    for root, _dirs, files in os.walk(checkout)
+                    for name in files
+                }
+
+                argv = ["sync_strava.py", "--api-base", "http://127.0.0.1:8788"]
+                with (
+                    mock.patch("utils.CONFIG_PATH", "config.yaml"),
+                    mock.patch("utils.CONFIG_LOCAL_PATH", "config.local.yaml"),
+                    mock.patch("sync_strava.load_config", return_value=config),
+                    mock.patch("sync_strava.sync_strava", side_effect=_fake_sync) as sync_mock,
+                    mock.patch("sys.stderr"),
+                    mock.patch("sys.stdout"),
+                ):
+                    with mock.patch.object(sys, "argv", argv), self.assertRaises(SystemExit):
+                        sync_strava.main()
+                    sync_mock.assert_not_called()
+
+                    with mock.patch.object(sys, "argv", argv + ["--data-dir", "../fake"]):
+                        sync_strava.main()
+                    sync_mock.assert_called_once()
+
+                fake_root = os.path.realpath(os.path.join(tmpdir, "fake"))
+                self.assertEqual(os.path.realpath(os.getcwd()), fake_root)
+                fake_state = sync_strava.read_json(sync_strava.STATE_PATH)
+                fake_ids = sync_strava.shared_store(sync_strava.RAW_DIR).ids()
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                after = {
+                    os.path.join(root, name): open(os.path.join(root, name), encoding="utf-8").read()
+                    for root, _dirs, files in os.walk(checkout)
+                    for name in files
+                }
+            finally:
+                os.chdir(old_cwd)
+
+        self.assertEqual(after, before)
+        self.assertEqual(fake_state, {"completed": True})
+        self.assertEqual(fake_ids, ["99"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,435 @@
+import copy
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+
+requests_stub = types.ModuleType("requests")
+
+
+class _RequestException(Exception):
+    pass
+
+
+class _HTTPError(_RequestException):
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def _default_request(*_args, **_kwargs):
+    raise NotImplementedError("requests.request stub was not patched")
+
+
+requests_stub.RequestException = _RequestException
+requests_stub.HTTPError = _HTTPError
+requests_stub.request = _default_request
+sys.modules.setdefault("requests", requests_stub)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import strava_events  # noqa: E402
+import sync_strava  # noqa: E402
+
+
+class SyncStravaBackfillTests(unittest.TestCase):
+    def test_iter_backfill_pages_yields_in_order_and_stops_at_empty_page(self) -> None:
+        pages = {
+            1: [{"id": 1}],
+            2: [{"id": 2}],
+            3: [{"id": 3}],
+            4: [],
+        }
+        requested: list[int] = []
+        lock = threading.Lock()
+
+        def _fake_fetch_page(_token, _per_page, page, _after, _before, _limiter, _transport=None):
+            with lock:
+                requested.append(page)
+            # Later pages finish first to prove results are re-ordered.
+            time.sleep(0.01 * max(0, 4 - page))
+            return pages.get(page, [])
+
+        with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+            token_ref = ["token"]
+            results = list(
+                sync_strava._iter_backfill_pages({}, token_ref, 1, 0, 100, None, workers=3)
+            )
+
+        self.assertEqual([page for page, _ in results], [1, 2, 3, 4])
+        self.assertEqual(results[-1][1], [])
+        self.assertEqual(sorted(set(requested))[:4], [1, 2, 3, 4])
+
+    def test_iter_backfill_pages_surfaces_rate_limit_after_earlier_pages(self) -> None:
+        def _fake_fetch_page(_token, _per_page, page, _after, _before, _limiter, _transport=None):
+            if page == 2:
+                raise sync_strava.RateLimitExceeded("daily limit")
+            return [{"id": page}]
+
+        yielded: list[int] = []
+        with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+            with self.assertRaises(sync_strava.RateLimitExceeded):
+                for page, _activities in sync_strava._iter_backfill_pages(
+                    {}, ["token"], 1, 0, 100, None, workers=4
+                ):
+                    yielded.append(page)
+
+        self.assertEqual(yielded, [1])
+
+
+
+def _ts(year: int, month: int = 1, day: int = 1) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+class SyncStravaShardTests(unittest.TestCase):
+    def test_build_backfill_shards_covers_range_with_yearly_shards_and_tail(self) -> None:
+        now_ts = _ts(2026, 3, 1)
+        shards = sync_strava._build_backfill_shards(0, now_ts, shard_years=3)
+
+        self.assertEqual([shard["label"] for shard in shards], ["2026", "2025", "2024", "before-2024"])
+        self.assertEqual(shards[0]["before"], now_ts)
+        self.assertEqual(shards[0]["after"], _ts(2026))
+        self.assertEqual(shards[1]["before"], _ts(2026) + 1)
+        self.assertEqual(shards[-1]["after"], 0)
+        self.assertEqual(shards[-1]["before"], _ts(2024) + 1)
+
+    def test_build_backfill_shards_stops_at_lower_bound(self) -> None:
+        shards = sync_strava._build_backfill_shards(_ts(2025, 6, 1), _ts(2026, 3, 1), shard_years=10)
+
+        self.assertEqual([shard["label"] for shard in shards], ["2026", "2025"])
+        self.assertEqual(shards[-1]["after"], _ts(2025, 6, 1))
+
+    def test_shards_from_legacy_state_resume_at_next_before(self) -> None:
+        now_ts = _ts(2026, 3, 1)
+        state = {"after": 0, "next_before": _ts(2025, 7, 1), "completed": False}
+
+        shards, resumed = sync_strava._shards_from_state(state, 0, now_ts, shard_years=3)
+
+        self.assertTrue(resumed)
+        by_label = {shard["label"]: shard for shard in shards}
+        self.assertTrue(by_label["2026"]["completed"])
+        self.assertEqual(by_label["2025"]["next_before"], _ts(2025, 7, 1))
+        self.assertFalse(by_label["2024"]["completed"])
+        self.assertIsNone(by_label["2024"]["next_before"])
+
+    def test_run_backfill_shards_keeps_partial_progress_in_each_shard(self) -> None:
+        now_ts = _ts(2026, 3, 1)
+        shards = sync_strava._build_backfill_shards(_ts(2024), now_ts, shard_years=3)
+        data = {
+            "2026": [[{"id": 1, "start_date": "2026-02-01T00:00:00Z"}], []],
+            "2025": [
+                [{"id": 2, "start_date": "2025-09-01T00:00:00Z"}],
+                [{"id": 3, "start_date": "2025-04-01T00:00:00Z"}],
+            ],
+            "2024": [[{"id": 4, "start_date": "2024-05-01T00:00:00Z"}], []],
+        }
+
+        def _fake_fetch_page(_token, _per_page, page, after, _before, _limiter, _transport=None):
+            label = str(datetime.fromtimestamp(after, tz=timezone.utc).year)
+            if label == "2025" and page == 3:
+                raise sync_strava.RateLimitExceeded("read daily limit")
+            return data[label][page - 1]
+
+        with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+            summary, token = sync_strava._run_backfill_shards(
+                {}, "token", shards, 1, None, workers=1, dry_run=True
+            )
+
+        by_label = {shard["label"]: shard for shard in shards}
+        self.assertEqual(token, "token")
+        self.assertTrue(summary["rate_limited"])
+        self.assertFalse(summary["exhausted"])
+        self.assertEqual(summary["activity_ids"], {"1", "2", "3", "4"})
+        self.assertTrue(by_label["2026"]["completed"])
+        self.assertTrue(by_label["2024"]["completed"])
+        self.assertFalse(by_label["2025"]["completed"])
+        self.assertEqual(by_label["2025"]["next_before"], _ts(2025, 4, 1) + 1)
+        self.assertEqual(by_label["2025"]["fetched"], 2)
+
+        state = sync_strava._backfill_state_from_shards(_ts(2024), shards, True)
+        resumed, used_resume = sync_strava._shards_from_state(state, _ts(2024), now_ts, 3)
+        self.assertTrue(used_resume)
+        self.assertEqual(
+            [shard["label"] for shard in resumed if not shard["completed"]], ["2025"]
+        )
+
+    def test_run_backfill_shards_reports_a_budget_reserve_stop_apart_from_rate_limits(self) -> None:
+        shards = [sync_strava._new_shard("2025", _ts(2025), _ts(2026) + 1)]
+
+        def _fake_fetch_page(_token, _per_page, page, _after, _before, _limiter, _transport=None):
+            if page == 2:
+                raise sync_strava.BudgetReserved("reserved for higher-priority sync work")
+            return [{"id": 1, "start_date": "2025-09-01T00:00:00Z"}]
+
+        with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+            summary, _token = sync_strava._run_backfill_shards(
+                {}, "token", shards, 1, None, workers=1, dry_run=True
+            )
+
+        self.assertFalse(summary["rate_limited"])
+        self.assertTrue(summary["budget_reserved"])
+        self.assertEqual(summary["budget_reserved_message"], "reserved for higher-priority sync work")
+        self.assertFalse(summary["exhausted"])
+        self.assertEqual(summary["activity_ids"], {"1"})
+
+    def test_shard_checkpointer_saves_state_after_each_page(self) -> None:
+        shard = sync_strava._new_shard("2025", _ts(2025), _ts(2026) + 1)
+        pages = [
+            [{"id": 1, "start_date": "2025-09-01T00:00:00Z"}],
+            [{"id": 2, "start_date": "2025-04-01T00:00:00Z"}],
+        ]
+
+        def _fake_fetch_page(_token, _per_page, page, _after, _before, _limiter, _transport=None):
+            if page > len(pages):
+                raise RuntimeError("connection reset")
+            return pages[page - 1]
+
+        saved = []
+        checkpoint = sync_strava._shard_checkpointer(
+            _ts(2025), [shard], {"activity_types": []}, persist=True
+        )
+        with (
+            mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page),
+            mock.patch("sync_strava._save_state", side_effect=lambda state: saved.append(copy.deepcopy(state))),
+        ):
+            with self.assertRaises(RuntimeError):
+                sync_strava._backfill_shard(
+                    {}, ["token"], shard, 1, None, 1, dry_run=True, checkpoint=checkpoint
+                )
+
+        self.assertEqual(len(saved), 2)
+        cursors = [state["shards"][0]["next_before"] for state in saved]
+        self.assertEqual(cursors, [_ts(2025, 9, 1) + 1, _ts(2025, 4, 1) + 1])
+        self.assertFalse(saved[-1]["completed"])
+        self.assertEqual(saved[-1]["activity_scope"], {"activity_types": []})
+        self.assertEqual(shard["fetched"], 2)
+
+    def test_reconcile_prune_spreads_shards_across_runs_and_deletes_mismatches(self) -> None:
+        after = _ts(2025)
+        now_ts = _ts(2026, 3, 1)
+        remote = {
+            "2026": [{"id": 1, "start_date": "2026-02-01T00:00:00Z"}],
+            "2025": [{"id": 2, "start_date": "2025-06-01T00:00:00Z"}],
+        }
+
+        def _fake_fetch_page(_token, _per_page, _page, shard_after, _before, _limiter, _transport=None):
+            label = str(datetime.fromtimestamp(shard_after + 1, tz=timezone.utc).year)
+            return remote[label]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = sync_strava.shared_store(sync_strava.RAW_DIR)
+                store.put("1", {"id": 1, "start_date": "2026-02-01T00:00:00Z"})
+                store.put("2", {"id": 2, "start_date": "2025-06-01T00:00:00Z"})
+                store.put("3", {"id": 3, "start_date": "2025-03-01T00:00:00Z"})
+                with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+                    first, _token = sync_strava._reconcile_prune(
+                        {}, "token", after, now_ts, 3, 2, None, max_requests=1
+                    )
+                    second, _token = sync_strava._reconcile_prune(
+                        {}, "token", after, now_ts, 3, 2, None, max_requests=1
+                    )
+                remaining = store.ids()
+            finally:
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                os.chdir(old_cwd)
+
+        self.assertEqual(first["shards_checked"], 1)
+        self.assertEqual(first["deleted"], 0)
+        self.assertEqual(first["next_shard"], "2025")
+        self.assertFalse(first["pass_completed"])
+        self.assertEqual(second["shards_mismatched"], 1)
+        self.assertEqual(second["deleted"], 1)
+        self.assertTrue(second["pass_completed"])
+        self.assertIsNone(second["next_shard"])
+        self.assertEqual(remaining, ["1", "2"])
+
+    def test_reconcile_prune_resumes_by_time_after_a_remote_deletion(self) -> None:
+        after = _ts(2025)
+        now_ts = _ts(2025, 12, 1)
+        remote = [
+            {"id": 3, "start_date": "2025-09-01T00:00:00Z"},
+            {"id": 2, "start_date": "2025-06-01T00:00:00Z"},
+            {"id": 1, "start_date": "2025-03-01T00:00:00Z"},
+        ]
+
+        def _fake_fetch_page(_token, per_page, page, shard_after, before, _limiter, _transport=None):
+            window = [
+                activity
+                for activity in remote
+                if shard_after < sync_strava.activity_start_ts(activity) < before
+            ]
+            return window[(page - 1) * per_page : page * per_page]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = sync_strava.shared_store(sync_strava.RAW_DIR)
+                for activity in remote:
+                    store.put(str(activity["id"]), dict(activity))
+                with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+                    first, _token = sync_strava._reconcile_prune(
+                        {}, "token", after, now_ts, 3, 2, None, max_requests=1
+                    )
+                    # Deleting the newest activity shifts the rest up a page.
+                    del remote[0]
+                    second, _token = sync_strava._reconcile_prune(
+                        {}, "token", after, now_ts, 3, 2, None, max_requests=2
+                    )
+                remaining = store.ids()
+                saved = sync_strava.read_json(sync_strava.PRUNE_RECONCILE_PATH)
+            finally:
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                os.chdir(old_cwd)
+
+        self.assertEqual(first["shards_checked"], 0)
+        self.assertEqual(second["requests"], 2)
+        self.assertTrue(second["pass_completed"])
+        self.assertEqual(second["deleted"], 0)
+        self.assertEqual(remaining, ["1", "2", "3"])
+        self.assertNotIn("digests", saved)
+
+    def test_reconcile_prune_keeps_activities_written_after_the_shard_scan_started(self) -> None:
+        after = _ts(2025)
+        now_ts = _ts(2025, 12, 1)
+        remote = [
+            {"id": 3, "start_date": "2025-09-01T00:00:00Z"},
+            {"id": 2, "start_date": "2025-06-01T00:00:00Z"},
+            {"id": 1, "start_date": "2025-03-01T00:00:00Z"},
+        ]
+
+        def _fake_fetch_page(_token, per_page, page, shard_after, before, _limiter, _transport=None):
+            window = [
+                activity
+                for activity in remote
+                if shard_after < sync_strava.activity_start_ts(activity) < before
+            ]
+            return window[(page - 1) * per_page : page * per_page]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                store = sync_strava.shared_store(sync_strava.RAW_DIR)
+                for activity in remote:
+                    store.put(str(activity["id"]), dict(activity))
+                store.put("9", {"id": 9, "start_date": "2025-10-01T00:00:00Z"})
+                with mock.patch("sync_strava._fetch_page", side_effect=_fake_fetch_page):
+                    sync_strava._reconcile_prune({}, "token", after, now_ts, 3, 2, None, max_requests=1)
+                    # A late upload lands in the range the scan already passed.
+                    store.put("4", {"id": 4, "start_date": "2025-08-01T00:00:00Z"})
+                    summary, _token = sync_strava._reconcile_prune(
+                        {}, "token", after, now_ts, 3, 2, None, max_requests=2
+                    )
+                remaining = store.ids()
+            finally:
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                os.chdir(old_cwd)
+
+        self.assertTrue(summary["pass_completed"])
+        self.assertEqual(summary["deleted"], 1)
+        self.assertEqual(remaining, ["1", "2", "3", "4"])
+
+    def test_sync_events_applies_changes_and_stops_cursor_at_rate_limit(self) -> None:
+        after = _ts(2020)
+        events = [
+            {"object_type": "activity", "object_id": 1, "aspect_type": "create"},
+            {"object_type": "activity", "object_id": 2, "aspect_type": "delete"},
+            {"object_type": "activity", "object_id": 1, "aspect_type": "update"},
+            {"object_type": "activity", "object_id": 3, "aspect_type": "create"},
+        ]
+
+        def _fake_fetch_activity(_token, activity_id, _limiter, _transport=None):
+            if activity_id == "3":
+                raise sync_strava.RateLimitExceeded("read limit")
+            return {"id": int(activity_id), "start_date": "2026-02-01T00:00:00Z"}
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                log_path = os.path.join("data", "strava_events.jsonl")
+                for event in events:
+                    strava_events.append_event(log_path, event)
+                store = sync_strava.shared_store(sync_strava.RAW_DIR)
+                store.put("2", {"id": 2, "start_date": "2025-06-01T00:00:00Z"})
+                with mock.patch("sync_strava._fetch_activity", side_effect=_fake_fetch_activity) as fetch:
+                    summary, cursor, _token = sync_strava._sync_events(
+                        {}, "token", log_path, after, None, dry_run=False
+                    )
+                offsets = [
+                    offset for offset, _event in strava_events.read_events(log_path, None)[0]
+                ]
+                remaining = store.ids()
+            finally:
+                sync_strava.close_store(sync_strava.RAW_DIR, flush=False)
+                os.chdir(old_cwd)
+
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(summary["activities"], 3)
+        self.assertEqual(summary["new_or_updated"], 1)
+        self.assertEqual(summary["deleted"], 1)
+        self.assertTrue(summary["rate_limited"])
+        self.assertEqual(summary["gap"], "no event cursor yet")
+        self.assertEqual(remaining, ["1"])
+        # Events 1-3 are handled; the cursor stops before the unfetched activity 3.
+        self.assertEqual(cursor["offset"], offsets[2])
+
+    def test_plan_strava_uses_state_and_at_most_one_probe_request(self) -> None:
+        now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        config = {"sync": {"start_date": "2025-01-01", "per_page": 200, "backfill_shard_years": 3}}
+        fetch = mock.Mock(return_value=[{"id": 1, "start_date": "2025-05-01T00:00:00Z"}])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                sync_strava.write_json(
+                    sync_strava.TOKEN_CACHE,
+                    {"access_token": "token", "expires_at": int(now.timestamp()) + 3600},
+                )
+                with (
+                    mock.patch("sync_strava.load_config", return_value=config),
+                    mock.patch("sync_strava.utc_now", return_value=now),
+                    mock.patch("sync_strava._get_access_token") as get_token,
+                    mock.patch("sync_strava._fetch_page", fetch),
+                ):
+                    plan = sync_strava.plan_strava(probe=True)
+                    os.remove(sync_strava.TOKEN_CACHE)
+                    unprobed = sync_strava.plan_strava(probe=True)
+                written = sorted(os.listdir(tmpdir))
+            finally:
+                os.chdir(old_cwd)
+
+        # Planning neither refreshes the token nor writes the ledger.
+        get_token.assert_not_called()
+        self.assertEqual(written, [])
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(fetch.call_args.args[0], "token")
+        self.assertNotEqual(unprobed["pending_ranges"][1].get("basis"), "probe_exact")
+        self.assertEqual([item["label"] for item in plan["pending_ranges"]], ["2026", "2025"])
+        self.assertEqual(plan["pending_ranges"][1]["basis"], "probe_exact")
+        self.assertEqual(plan["pending_ranges"][1]["estimated_activities"], 1)
+        self.assertEqual(plan["recent_mode"], "window")
+        self.assertIn("finishes_utc", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
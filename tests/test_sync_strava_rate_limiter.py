@@ -0,0 +1,319 @@
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+
+requests_stub = types.ModuleType("requests")
+
+
+class _RequestException(Exception):
+    pass
+
+
+class _HTTPError(_RequestException):
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def _default_request(*_args, **_kwargs):
+    raise NotImplementedError("requests.request stub was not patched")
+
+
+requests_stub.RequestException = _RequestException
+requests_stub.HTTPError = _HTTPError
+requests_stub.request = _default_request
+sys.modules.setdefault("requests", requests_stub)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_strava  # noqa: E402
+import sync_telemetry  # noqa: E402
+
+
+def _limiter(**overrides) -> "sync_strava.RateLimiter":
+    kwargs = {
+        "overall_15_limit": 200,
+        "overall_day_limit": 2000,
+        "read_15_limit": 100,
+        "read_day_limit": 1000,
+        "safety_buffer": 0,
+        "min_interval_seconds": 0,
+    }
+    kwargs.update(overrides)
+    return sync_strava.RateLimiter(**kwargs)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_rate_limiter_counts_in_flight_requests_against_daily_budget(self) -> None:
+        limiter = _limiter(read_day_limit=2)
+        limiter.before_request("read")
+        limiter.before_request("read")
+        with self.assertRaises(sync_strava.RateLimitExceeded):
+            limiter.before_request("read")
+
+        limiter.release_request("read")
+        limiter.before_request("read")
+        limiter.record_request("read")
+        self.assertEqual(limiter.read_day, 1)
+        self.assertEqual(limiter.in_flight_read, 1)
+
+    def test_reserve_holds_back_daily_budget_for_higher_priority_work(self) -> None:
+        limiter = _limiter(read_day_limit=10, read_15_limit=100)
+        limiter.read_day = 8
+        limiter.set_reserve(0.25)
+        with self.assertRaises(sync_strava.BudgetReserved):
+            limiter.before_request("read")
+
+        limiter.set_reserve(0.0)
+        limiter.before_request("read")
+        self.assertEqual(limiter.in_flight_read, 1)
+
+    def test_adaptive_pacing_bursts_with_headroom(self) -> None:
+        limiter = _limiter(pacing="adaptive", min_interval_seconds=10)
+        limiter.last_request_at = time.time()
+
+        wait_seconds, window_wait = limiter._wait_seconds("read")
+
+        self.assertEqual(wait_seconds, 0.0)
+        self.assertFalse(window_wait)
+
+    def test_adaptive_pacing_slows_down_near_safety_buffer(self) -> None:
+        limiter = _limiter(pacing="adaptive", read_15_limit=100, safety_buffer=2)
+        limiter.apply_headers(
+            {
+                "X-RateLimit-Limit": "200,2000",
+                "X-RateLimit-Usage": "10,10",
+                "X-ReadRateLimit-Limit": "100,1000",
+                "X-ReadRateLimit-Usage": "90,90",
+            }
+        )
+        limiter.last_request_at = time.time()
+
+        with mock.patch.object(limiter, "_window_wait_seconds", return_value=600.0):
+            busy_wait, window_wait = limiter._wait_seconds("read")
+            limiter.read_15 = 40
+            relaxed_wait, _ = limiter._wait_seconds("read")
+
+        self.assertFalse(window_wait)
+        # 8 reads left for 600 s at ~92% usage -> roughly even spacing.
+        self.assertGreater(busy_wait, 50.0)
+        self.assertLess(busy_wait, 75.0)
+        self.assertLess(relaxed_wait, busy_wait / 5)
+
+    def test_window_exhaustion_waits_for_reset_and_is_reported(self) -> None:
+        limiter = _limiter(pacing="adaptive", read_15_limit=3, safety_buffer=1)
+        limiter.read_15 = 2
+
+        wait_seconds, window_wait = limiter._wait_seconds("read")
+
+        self.assertTrue(window_wait)
+        self.assertGreater(wait_seconds, 0.0)
+        self.assertLessEqual(wait_seconds, sync_strava.RATE_WINDOW_SECONDS)
+
+    def test_fixed_pacing_keeps_min_interval_and_stats_track_throttle(self) -> None:
+        limiter = _limiter(pacing="fixed", min_interval_seconds=5)
+        limiter.before_request("read")
+        limiter.record_request("read")
+
+        with mock.patch("sync_strava.time.sleep") as sleep_mock:
+            limiter.last_request_at = time.time()
+            with mock.patch.object(
+                limiter, "_wait_seconds", side_effect=[(4.0, False), (0.0, False)]
+            ):
+                limiter.before_request("read")
+
+        sleep_mock.assert_called_once_with(4.0)
+        stats = limiter.stats()
+        self.assertEqual(stats["pacing"], "fixed")
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["throttled_seconds"], 4.0)
+
+
+    def test_ledger_restores_counters_for_same_window_and_day(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ledger_path = os.path.join(tmpdir, "ledger.json")
+            first = _limiter(ledger_path=ledger_path)
+            for _ in range(3):
+                first.before_request("read")
+                first.record_request("read")
+            first.flush_ledger()
+
+            second = _limiter(ledger_path=ledger_path)
+
+        self.assertTrue(second.ledger_restored)
+        self.assertEqual(second.read_15, 3)
+        self.assertEqual(second.read_day, 3)
+        self.assertEqual(second.overall_15, 3)
+
+    def test_in_flight_slot_is_released_when_the_transport_fails(self) -> None:
+        class _BrokenTransport(sync_strava.HttpTransport):
+            def request(self, method, url, **kwargs):
+                raise ValueError("bad transport")
+
+        limiter = _limiter()
+        with self.assertRaises(ValueError):
+            sync_strava._request_json_with_retry(
+                "GET",
+                "https://www.strava.com/api/v3/athlete",
+                limiter=limiter,
+                request_kind="read",
+                transport=_BrokenTransport(),
+            )
+
+        self.assertEqual((limiter.in_flight_overall, limiter.in_flight_read), (0, 0))
+        self.assertEqual(limiter.requests_made, 0)
+
+    def test_ledger_is_written_every_few_requests_outside_the_lock(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ledger_path = os.path.join(tmpdir, "ledger.json")
+            limiter = _limiter(ledger_path=ledger_path)
+            writes = []
+
+            def _write(path, payload):
+                self.assertFalse(limiter._lock.locked())
+                writes.append(payload["read_day"])
+
+            with mock.patch("sync_strava.write_json", side_effect=_write):
+                for _ in range(sync_strava.LEDGER_FLUSH_REQUESTS * 2 + 3):
+                    limiter.before_request("read")
+                    limiter.record_request("read")
+                limiter.flush_ledger()
+                limiter.flush_ledger()
+
+        flush_at = sync_strava.LEDGER_FLUSH_REQUESTS
+        self.assertEqual(writes, [flush_at, flush_at * 2, flush_at * 2 + 3])
+
+    def test_read_only_ledger_restores_counters_without_writing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ledger_path = os.path.join(tmpdir, "ledger.json")
+            first = _limiter(ledger_path=ledger_path)
+            first.before_request("read")
+            first.record_request("read")
+            first.flush_ledger()
+            with open(ledger_path, "rb") as f:
+                before = f.read()
+
+            planner = _limiter(ledger_path=ledger_path, ledger_read_only=True)
+            for _ in range(sync_strava.LEDGER_FLUSH_REQUESTS + 1):
+                planner.before_request("read")
+                planner.record_request("read")
+            planner.flush_ledger()
+            with open(ledger_path, "rb") as f:
+                after = f.read()
+
+        self.assertTrue(planner.ledger_restored)
+        self.assertEqual(planner.read_day, sync_strava.LEDGER_FLUSH_REQUESTS + 2)
+        self.assertEqual(after, before)
+
+    def test_ledger_ignores_expired_window_and_day(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ledger_path = os.path.join(tmpdir, "ledger.json")
+            sync_strava.write_json(
+                ledger_path,
+                {
+                    "window_start": 0,
+                    "day": "2000-01-01",
+                    "overall_15": 150,
+                    "read_15": 90,
+                    "overall_day": 1500,
+                    "read_day": 900,
+                    "limits": {"read_15_limit": 300},
+                },
+            )
+            limiter = _limiter(ledger_path=ledger_path)
+
+        self.assertFalse(limiter.ledger_restored)
+        self.assertEqual(limiter.read_15, 0)
+        self.assertEqual(limiter.read_day, 0)
+        self.assertEqual(limiter.read_15_limit, 300)
+
+    def test_first_headers_after_restore_replace_ledger_estimate(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ledger_path = os.path.join(tmpdir, "ledger.json")
+            first = _limiter(ledger_path=ledger_path)
+            for _ in range(50):
+                first.before_request("read")
+                first.record_request("read")
+            first.flush_ledger()
+
+            limiter = _limiter(ledger_path=ledger_path)
+            headers = {
+                "X-RateLimit-Limit": "200,2000",
+                "X-RateLimit-Usage": "12,40",
+                "X-ReadRateLimit-Limit": "100,1000",
+                "X-ReadRateLimit-Usage": "12,40",
+            }
+            limiter.apply_headers(headers)
+            self.assertEqual(limiter.read_15, 12)
+            self.assertEqual(limiter.read_day, 40)
+
+            limiter.read_15 = 20
+            limiter.apply_headers(headers)
+            self.assertEqual(limiter.read_15, 20)
+
+            limiter.flush_ledger()
+            persisted = sync_strava.read_json(ledger_path)
+        self.assertEqual(persisted["read_day"], 40)
+
+    def test_requests_are_traced_with_retry_sleep_and_remaining_budget(self) -> None:
+        class _Response:
+            def __init__(self, status_code, payload, content):
+                self.status_code = status_code
+                self.headers = {"Retry-After": "2"} if status_code == 503 else {}
+                self.content = content
+                self._payload = payload
+
+            def raise_for_status(self):
+                return None
+
+            def json(self):
+                return self._payload
+
+        transport = mock.Mock()
+        transport.request.side_effect = [
+            _Response(503, None, b"busy"),
+            _Response(200, [{"id": 1}], b'[{"id": 1}]'),
+        ]
+        limiter = _limiter(read_15_limit=10, read_day_limit=100)
+        trace = sync_telemetry.start_trace("strava")
+        try:
+            with mock.patch("sync_strava.time.sleep"):
+                payload = sync_strava._request_json_with_retry(
+                    "GET",
+                    "https://www.strava.com/api/v3/athlete/activities",
+                    limiter=limiter,
+                    request_kind="read",
+                    transport=transport,
+                    params={"page": 3},
+                )
+        finally:
+            stats = sync_telemetry.finish_trace(trace)
+
+        self.assertEqual(payload, [{"id": 1}])
+        first, second = trace.events
+        self.assertEqual(first["endpoint"], "GET /api/v3/athlete/activities")
+        self.assertEqual((first["status"], first["attempt"], first["bytes"]), (503, 1, 4))
+        self.assertEqual(first["retry_sleep_seconds"], 2)
+        self.assertEqual(first["budget_remaining"], {"15_min": 9, "daily": 99})
+        self.assertEqual((second["status"], second["attempt"], second["params"]), (200, 2, {"page": 3}))
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["statuses"], {"200": 1, "503": 1})
+        self.assertEqual(stats["retry_sleep_seconds"], 2)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+yaml_stub = types.ModuleType("yaml")
+yaml_stub.safe_load = lambda *_args, **_kwargs: {}
+sys.modules.setdefault("yaml", yaml_stub)
+
+import sync_telemetry  # noqa: E402
+
+
+class RequestTraceTests(unittest.TestCase):
+    def test_trace_writes_jsonl_and_rolls_up_percentiles(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace", "run.jsonl")
+            trace = sync_telemetry.start_trace("strava", path)
+            self.assertIs(sync_telemetry.active_trace(), trace)
+            for page in range(1, 101):
+                trace.record(
+                    sync_telemetry.endpoint_label(
+                        "get", "https://www.strava.com/api/v3/athlete/activities?page=1"
+                    ),
+                    started=1000.0 + page,
+                    latency_seconds=page / 1000.0,
+                    status=200,
+                    params={"page": page},
+                    size=10,
+                    wait_seconds=0.5,
+                )
+            trace.record(
+                sync_telemetry.endpoint_label("GET", "https://www.strava.com/api/v3/activities/123"),
+                started=2000.0,
+                latency_seconds=0.5,
+                error="timed out",
+            )
+            stats = sync_telemetry.finish_trace(trace)
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertIsNone(sync_telemetry.active_trace())
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(lines[0]["endpoint"], "GET /api/v3/athlete/activities")
+        self.assertEqual(lines[-1]["endpoint"], "GET /api/v3/activities/{id}")
+        self.assertEqual(stats["attempts"], 101)
+        self.assertEqual(stats["statuses"], {"200": 100, "error": 1})
+        self.assertEqual(stats["bytes"], 1000)
+        self.assertEqual(stats["wait_seconds"], 50.0)
+        listing = stats["endpoints"]["GET /api/v3/athlete/activities"]
+        self.assertEqual((listing["p50_ms"], listing["p90_ms"], listing["p99_ms"]), (50.0, 90.0, 99.0))
+        self.assertEqual(stats["latency"]["max_ms"], 500.0)
+        self.assertEqual(stats["slowest"][1]["params"], {"page": 100})
+
+
+if __name__ == "__main__":
+    unittest.main()